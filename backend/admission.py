@@ -0,0 +1,238 @@
+"""
+Admission Control
+Bounds the expensive work a worker takes on so a burst of requests is shed
+instead of running the instance out of memory. Each heavy endpoint gets a
+concurrency limit with a short, bounded wait queue, and each client a token
+bucket per endpoint. A request that would wait too long is rejected at once
+with 503, a client over its rate with 429; both carry a Retry-After.
+
+A client's rate is charged on its own request, before it joins an
+identical in-flight job (single_flight), so one client over its limit never
+fails the requests of others that coalesced onto its job. Slots are taken
+only where new work starts, inside the single-flight leader after the job
+store's finished-result check.
+
+Environment:
+    ADMISSION_CONCURRENCY    Pipelines running at once per endpoint, e.g.
+                             "process-free:2,process-complete:8" (see DEFAULT_CONCURRENCY)
+    ADMISSION_QUEUE          Requests allowed to wait for a slot per endpoint (default 16)
+    ADMISSION_WAIT_SECONDS   Longest wait for a slot before 503 (default 30)
+    RATE_LIMIT_PER_MINUTE    Sustained requests per client per endpoint (default 10, 0 disables)
+    RATE_LIMIT_BURST         Requests a client may send back to back (default 5)
+    TRUSTED_PROXIES          Reverse proxies in front of the app whose X-Forwarded-For
+                             hop is trusted for the client address (default 0; 1 on Render)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from metrics import ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+
+# Downloads + Whisper + LLM calls per endpoint; local Whisper is the heaviest.
+# 'metadata' covers yt-dlp extractions from /api/validate-url and pre-flight checks
+DEFAULT_CONCURRENCY = {
+    'metadata': 8,
+    'transcribe': 8,
+    'process-complete': 8,
+    'process-multi': 4,
+    'process-free': 2,
+    'create-flashcards': 16,
+}
+
+QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE', 16))
+WAIT_SECONDS = float(os.getenv('ADMISSION_WAIT_SECONDS', 30))
+RATE_PER_MINUTE = float(os.getenv('RATE_LIMIT_PER_MINUTE', 10))
+RATE_BURST = int(os.getenv('RATE_LIMIT_BURST', 5))
+
+# Token buckets kept for this many recent clients
+MAX_CLIENTS = 10000
+EWMA_ALPHA = 0.2
+
+
+def _concurrency_from_env():
+    limits = dict(DEFAULT_CONCURRENCY)
+    for item in os.getenv('ADMISSION_CONCURRENCY', '').split(','):
+        name, _, value = item.partition(':')
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class Overloaded(Exception):
+    """Request shed by admission control"""
+
+    def __init__(self, message, status, retry_after, reason):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class ConcurrencyLimit:
+    """Counting semaphore with a bounded wait queue and a wait deadline"""
+
+    def __init__(self, name, limit, queue_size=QUEUE_SIZE, wait_seconds=WAIT_SECONDS):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.wait_seconds = wait_seconds
+        self.running = 0
+        self.waiting = 0
+        self.service_seconds = None  # EWMA of how long a slot is held
+        self.condition = threading.Condition()
+
+    def retry_after(self):
+        """Seconds until a slot is likely free for a request joining the queue now"""
+        per_slot = self.service_seconds or self.wait_seconds
+        return max(1, math.ceil(per_slot * (self.waiting + 1) / self.limit))
+
+    def _reject(self, reason, message):
+        ADMISSION_REJECTED.inc(endpoint=self.name, reason=reason)
+        print(f"🚦 Shedding {self.name} request ({reason}): {self.running} running, {self.waiting} waiting")
+        raise Overloaded(message, 503, self.retry_after(), reason)
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot for the duration of the block (raises Overloaded)"""
+        start = time.monotonic()
+        with self.condition:
+            if self.running >= self.limit:
+                if self.waiting >= self.queue_size:
+                    self._reject('queue_full', f"Server busy: too many {self.name} jobs queued")
+                # Reject early if the queue won't drain before the deadline
+                if self.service_seconds and self.retry_after() > self.wait_seconds:
+                    self._reject('queue_slow', f"Server busy: {self.name} queue is too long")
+
+                self.waiting += 1
+                try:
+                    deadline = start + self.wait_seconds
+                    while self.running >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start, endpoint=self.name)
+                            self._reject('timeout', f"Server busy: no {self.name} slot within {self.wait_seconds:.0f}s")
+                        self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.running += 1
+
+        admitted = time.monotonic()
+        ADMISSION_WAIT_SECONDS.observe(admitted - start, endpoint=self.name)
+        try:
+            yield
+        finally:
+            held = time.monotonic() - admitted
+            with self.condition:
+                self.running -= 1
+                if self.service_seconds is None:
+                    self.service_seconds = held
+                else:
+                    self.service_seconds = EWMA_ALPHA * held + (1 - EWMA_ALPHA) * self.service_seconds
+                self.condition.notify()
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'limit': self.limit,
+                'running': self.running,
+                'waiting': self.waiting,
+                'avg_seconds': round(self.service_seconds, 1) if self.service_seconds else None,
+            }
+
+
+class RateLimiter:
+    """Token bucket per client (least recently seen clients are forgotten)"""
+
+    def __init__(self, name, per_minute=RATE_PER_MINUTE, burst=RATE_BURST):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.buckets = OrderedDict()  # client -> (tokens, updated)
+        self.lock = threading.Lock()
+
+    def check(self, client):
+        """Take one token for a client (raises Overloaded with 429 when empty)"""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[client] = (tokens, now)
+            if len(self.buckets) > MAX_CLIENTS:
+                self.buckets.popitem(last=False)
+
+        if not allowed:
+            ADMISSION_REJECTED.inc(endpoint=self.name, reason='rate_limited')
+            retry_after = max(1, math.ceil((1 - tokens) / self.rate))
+            raise Overloaded(f"Rate limit exceeded for {self.name}, retry in {retry_after}s", 429, retry_after,
+                             'rate_limited')
+
+
+class AdmissionController:
+    """Concurrency limits and rate limiters for every heavy endpoint"""
+
+    def __init__(self, concurrency=None):
+        concurrency = concurrency or _concurrency_from_env()
+        self.limits = {name: ConcurrencyLimit(name, limit) for name, limit in concurrency.items()}
+        self.rate_limiters = {name: RateLimiter(name) for name in concurrency}
+
+    def slot(self, name):
+        """Context manager holding a slot of an endpoint's concurrency limit"""
+        return self.limits[name].slot()
+
+    def check_rate(self, name, client):
+        self.rate_limiters[name].check(client)
+
+    def snapshot(self):
+        return {name: limit.snapshot() for name, limit in self.limits.items()}
+
+
+def check_rate(name, client):
+    """
+    Charge one request to a client's rate limit for an endpoint
+    Raises:
+        Overloaded: 429 over the rate limit
+    """
+    get_admission().check_rate(name, client)
+
+
+@contextmanager
+def admitted(name, client=None):
+    """
+    Optionally charge a client's rate limit, then hold a slot of the endpoint's limit
+    Enter only where new work starts, not for coalesced or cached requests
+    Args:
+        name: Endpoint name (e.g. 'process-complete')
+        client: Client address; None skips the rate limit (a resumed job, or
+                one already charged with check_rate before joining a flight)
+    Raises:
+        Overloaded: 429 over the rate limit, 503 no slot in time
+    """
+    admission = get_admission()
+    if client is not None:
+        admission.check_rate(name, client)
+    with admission.slot(name):
+        yield
+
+
+# Global instance
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission():
+    """Get or create the global admission controller"""
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = AdmissionController()
+        return _admission
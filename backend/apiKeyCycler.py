@@ -5,6 +5,7 @@ Rotates through multiple API keys to distribute load and avoid rate limits
 
 import threading
 import os
+from metrics import API_KEY_USES
 
 
 class APIKeyCycler:
@@ -38,9 +39,11 @@ class APIKeyCycler:
     def get_next_key(self):
         """Get next API key in rotation (thread-safe)"""
         with self.lock:
-            key = self.api_keys[self.current_index]
+            index = self.current_index
+            key = self.api_keys[index]
             self.current_index = (self.current_index + 1) % len(self.api_keys)
-            return key
+        API_KEY_USES.inc(key_index=index)
+        return key
     
     def get_key_count(self):
         """Return total number of keys"""
@@ -3,77 +3,262 @@ FastScribe Flask API Server
 Provides REST API endpoints for YouTube transcription and flashcard generation
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, has_request_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import tempfile
 import base64
+import json
+import threading
+import time
 from urlScraper import YouTubeURLScraper
 from transcriber import YouTubeTranscriber
-from createNotes import NotesCreator
+from createNotes import STYLE_PROMPTS, NotesCreator
+from cloze_generator import cards_to_notes, generate_cloze_cards
 from formatNotes import NotesFormatter
 from apiKeyCycler import get_api_key_cycler, get_next_api_key
+from model_policy import get_model_policy
+from metrics import ERRORS, REQUEST_SECONDS, render_metrics, server_timing_header
+import tracing
+from single_flight import SingleFlight
+from admission import Overloaded, admitted, check_rate, get_admission
+import responses
+from job_store import get_job_store
+from video_metadata import VideoRejected, get_metadata_service
+from player_clients import get_client_strategy
+from model_router import get_model_router
+from concurrency import run_cpu_bound
+from segments import SegmentStore, link_cards
+from transcript_compactor import NOTES_PROMPT_TOKENS, compact_transcript
+import warmup
 
 # Import free solution components
 try:
     from local_whisper import LocalWhisperTranscriber
     from copilot_flashcard_generator import CopilotFlashcardGenerator
-    COPILOT_AVAILABLE = True
-except ImportError:
+    from whisper_engines import engine_available
+    COPILOT_AVAILABLE = engine_available()
+except (ImportError, ValueError):
     COPILOT_AVAILABLE = False
+
+if not COPILOT_AVAILABLE:
     print("⚠ Copilot API integration not available (missing dependencies)")
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['Server-Timing', 'X-Trace-Id', 'ETag', 'Retry-After'])
 
-# Setup YouTube cookies for production
-COOKIES_PATH = None
+# Client addresses for rate limiting come from the proxies' X-Forwarded-For
+# hops only; a header set by the client itself is never trusted
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+COPILOT_API_URL = os.getenv('COPILOT_API_URL', 'http://localhost:8080/api')
+
+# YouTube cookies and the API key cycler are set up on first use so that
+# importing the app (and lightweight endpoints) stays fast
+_cookies_lock = threading.Lock()
+_cookies_path = None
+_cookies_loaded = False
 
-if os.getenv('YOUTUBE_COOKIES_BASE64'):
-    # Decode base64 cookies from environment variable
-    try:
-        cookies_b64 = os.getenv('YOUTUBE_COOKIES_BASE64')
-        cookies_data = base64.b64decode(cookies_b64).decode('utf-8')
-        
-        # Write to temp file
-        temp_cookies = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
-        temp_cookies.write(cookies_data)
-        temp_cookies.close()
-        COOKIES_PATH = temp_cookies.name
-        print(f"✓ Using cookies from environment variable")
-    except Exception as e:
-        print(f"⚠ Failed to decode cookies from environment: {e}")
 
-elif os.path.exists('/etc/secrets/cookies.txt'):
-    # Copy Render secret file to temp location (secret files are read-only)
+def _write_temp_cookies(cookies_data):
+    """Write cookies to a writable temp file and return its path"""
+    temp_cookies = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
+    temp_cookies.write(cookies_data)
+    temp_cookies.close()
+    return temp_cookies.name
+
+
+def get_cookies_path():
+    """Path to the production YouTube cookies file, or None"""
+    global _cookies_path, _cookies_loaded
+    with _cookies_lock:
+        if _cookies_loaded:
+            return _cookies_path
+        _cookies_loaded = True
+        
+        if os.getenv('YOUTUBE_COOKIES_BASE64'):
+            # Decode base64 cookies from environment variable
+            try:
+                cookies_data = base64.b64decode(os.getenv('YOUTUBE_COOKIES_BASE64')).decode('utf-8')
+                _cookies_path = _write_temp_cookies(cookies_data)
+                print(f"✓ Using cookies from environment variable")
+            except Exception as e:
+                print(f"⚠ Failed to decode cookies from environment: {e}")
+        
+        elif os.path.exists('/etc/secrets/cookies.txt'):
+            # Copy Render secret file to temp location (secret files are read-only)
+            try:
+                with open('/etc/secrets/cookies.txt', 'r') as f:
+                    _cookies_path = _write_temp_cookies(f.read())
+                print(f"✓ Using cookies from secret file (copied to {_cookies_path})")
+            except Exception as e:
+                print(f"⚠ Failed to copy cookies from secret file: {e}")
+        
+        elif os.path.exists('cookies.txt'):
+            # Use local cookies.txt for development
+            _cookies_path = 'cookies.txt'
+            print(f"✓ Using local cookies.txt")
+        
+        else:
+            print("⚠ Warning: No cookies configured - YouTube downloads may fail")
+        
+        return _cookies_path
+
+
+def _api_key_count():
+    """Number of OpenAI keys in rotation (0 if none are configured)"""
     try:
-        with open('/etc/secrets/cookies.txt', 'r') as f:
-            cookies_data = f.read()
-        
-        # Write to writable temp file
-        temp_cookies = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
-        temp_cookies.write(cookies_data)
-        temp_cookies.close()
-        COOKIES_PATH = temp_cookies.name
-        print(f"✓ Using cookies from secret file (copied to {COOKIES_PATH})")
+        return get_api_key_cycler().get_key_count()
     except Exception as e:
-        print(f"⚠ Failed to copy cookies from secret file: {e}")
+        print(f"Warning: API key cycler initialization: {e}")
+        return 0
 
-elif os.path.exists('cookies.txt'):
-    # Use local cookies.txt for development
-    COOKIES_PATH = 'cookies.txt'
-    print(f"✓ Using local cookies.txt")
+# Local Whisper jobs currently running (used by the model size policy)
+_local_jobs_lock = threading.Lock()
+_local_jobs_in_flight = 0
 
-else:
-    print("⚠ Warning: No cookies configured - YouTube downloads may fail")
+# Identical concurrent jobs (e.g. a whole class opening the same link) share one run
+_transcribe_flights = SingleFlight('transcribe')
+_complete_flights = SingleFlight('process-complete')
+_free_flights = SingleFlight('process-free')
+_multi_flights = SingleFlight('process-multi')
+
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started and open its trace"""
+    g.request_start = time.perf_counter()
+    g.trace_span, g.trace_token = tracing.start_trace(
+        f"{request.method} {request.path}", request.headers, endpoint=request.endpoint or 'unknown'
+    )
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request latency and expose stage timings as Server-Timing"""
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unknown', status=response.status_code)
+    
+    timings = g.get('stage_timings', []) + [('total', elapsed)]
+    response.headers['Server-Timing'] = server_timing_header(timings)
+    if g.get('trace_span'):
+        g.trace_span.set_attribute('status', response.status_code)
+        response.headers['X-Trace-Id'] = g.trace_span.trace_id
+    return response
+
+
+@app.after_request
+def shape_response(response):
+    """Field selection, ETag / If-None-Match and gzip or brotli compression"""
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    
+    if response.status_code == 200 and response.is_json:
+        # The body may be any JSON value (a list, a string); only an object can carry 'fields'
+        body = request.get_json(silent=True) if request.is_json else None
+        fields = request.args.get('fields')
+        if not fields and isinstance(body, dict):
+            fields = body.get('fields')
+        fields = responses.parse_fields(fields)
+        if fields:
+            data = responses.select_fields(response.get_json(), fields)
+            response.set_data(json.dumps(data, ensure_ascii=False))
+        
+        # Only GETs are revalidated (e.g. GET /api/jobs/<job_id>); POSTs always run
+        if request.method in ('GET', 'HEAD'):
+            etag = responses.etag_for(response.get_data())
+            response.set_etag(etag, weak=True)
+            if responses.etag_matches(etag, request.headers.get('If-None-Match')):
+                response.status_code = 304
+                response.set_data(b'')
+                return response
+    
+    response.vary.add('Accept-Encoding')
+    size = response.calculate_content_length() or 0
+    encoding = responses.choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding and responses.should_compress(response.mimetype, size):
+        response.set_data(responses.compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@app.teardown_request
+def end_request_trace(exc):
+    """Finish the request's root span"""
+    if g.get('trace_span'):
+        tracing.end_trace(g.pop('trace_span'), g.pop('trace_token'))
+
+
+def _error_response(e, status=500):
+    """Count the error by type and return it as JSON"""
+    ERRORS.inc(endpoint=request.endpoint or 'unknown', type=type(e).__name__)
+    return jsonify({'error': str(e)}), status
+
+
+def _rejected_response(e):
+    """A video that failed the pre-flight check"""
+    ERRORS.inc(endpoint=request.endpoint or 'unknown', type='VideoRejected')
+    return jsonify({'error': str(e), 'reason': e.reason}), 422
+
+
+def _overloaded_response(e):
+    """A request shed by admission control (503 busy, 429 rate limited)"""
+    ERRORS.inc(endpoint=request.endpoint or 'unknown', type='Overloaded')
+    response = jsonify({'error': str(e), 'reason': e.reason, 'retry_after': e.retry_after})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, e.status
+
+
+def _charge(name):
+    """
+    Charge the requesting client's rate limit for an endpoint
+    Call before joining a single flight, so a 429 is never shared with other
+    clients' requests; a no-op outside a request (resumed jobs)
+    """
+    if has_request_context():
+        check_rate(name, request.remote_addr or 'unknown')
+
+
+def _admitted(name):
+    """Slot for work that is about to start (the rate is charged by _charge)"""
+    return admitted(name)
+
+
+def _admit_metadata():
+    """Slot for a yt-dlp metadata extraction (cache misses only, leader only)"""
+    return _admitted('metadata')
+
+
+def _charge_metadata():
+    """Rate limit for a metadata lookup that missed the cache"""
+    _charge('metadata')
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics (per worker process)"""
+    return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
 
-# Initialize API key cycler
-try:
-    cycler = get_api_key_cycler()
-    print(f"Using {cycler.get_key_count()} API keys in rotation")
-except Exception as e:
-    print(f"Warning: API key cycler initialization: {e}")
-    cycler = None
+
+@app.route('/api/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """Spans this worker recorded for a trace (recent traces only)"""
+    spans = tracing.get_trace(trace_id)
+    if not spans:
+        return jsonify({'error': 'Trace not found'}), 404
+    return jsonify({'trace_id': trace_id, 'spans': spans})
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, completed stages and (once done) the result of a pipeline job"""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
 
 
 @app.route('/api/health', methods=['GET'])
@@ -82,16 +267,27 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'service': 'FastScribe API',
-        'api_keys_available': cycler.get_key_count() if cycler else 0
+        'api_keys_available': _api_key_count(),
+        'player_clients': get_client_strategy().snapshot(),
+        'notes_models': get_model_router().snapshot(),
+        'admission': get_admission().snapshot()
     })
 
 
+@app.route('/api/ready', methods=['GET'])
+def ready_check():
+    """Readiness probe: 503 until this worker has preloaded and warmed its models"""
+    state = warmup.start_warmup()  # Starts warming if the server didn't already
+    return jsonify(state), 200 if state['ready'] else 503
+
+
 @app.route('/api/validate-url', methods=['POST'])
 def validate_url():
-    """Validate YouTube URL and extract video ID"""
+    """Validate YouTube URL, extract video ID and (optionally) fetch video metadata"""
     try:
         data = request.get_json()
         url = data.get('url')
+        include_metadata = data.get('metadata', True)
         
         if not url:
             return jsonify({'error': 'URL is required'}), 400
@@ -99,19 +295,43 @@ def validate_url():
         scraper = YouTubeURLScraper()
         video_id = scraper.extract_video_id(url)
         
-        return jsonify({
+        result = {
             'valid': True,
             'video_id': video_id,
             'standard_url': scraper.get_standard_url()
-        })
+        }
+        
+        # Metadata is cached, so a later pipeline request won't extract it again
+        if include_metadata:
+            service = get_metadata_service()
+            try:
+                metadata = service.get(video_id, get_cookies_path(), admit=_admit_metadata, charge=_charge_metadata)
+                reason, message = service.rejection(metadata)
+                result.update({
+                    'metadata': metadata,
+                    'accepted': reason is None,
+                    'reason': reason,
+                    'message': message
+                })
+            except Overloaded:
+                raise
+            except VideoRejected as e:
+                result.update({'metadata': None, 'accepted': False, 'reason': e.reason, 'message': str(e)})
+            except Exception as e:
+                # The URL itself is fine; metadata is best-effort here
+                result.update({'metadata': None, 'metadata_error': str(e)})
+        
+        return jsonify(result)
     
     except ValueError as e:
         return jsonify({
             'valid': False,
             'error': str(e)
         }), 400
+    except Overloaded as e:
+        return _overloaded_response(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(e)
 
 
 @app.route('/api/transcribe', methods=['POST'])
@@ -130,27 +350,33 @@ def transcribe_video():
         scraper = YouTubeURLScraper()
         video_id = scraper.extract_video_id(url)
         
-        # Get transcript using Whisper (cycler handles API key)
-        transcriber = YouTubeTranscriber()
-        
         # Use production cookies if available, otherwise use browser cookies from request
-        cookies_file = COOKIES_PATH if COOKIES_PATH else data.get('cookies_file')
+        cookies_path = get_cookies_path()
+        cookies_file = cookies_path if cookies_path else data.get('cookies_file')
         
-        transcript_text = transcriber.get_transcript(
-            video_id, 
-            language=language,
-            cookies_from_browser=cookies_from_browser if not COOKIES_PATH else None,
-            cookies_file=cookies_file
+        # Pre-flight: reject live, private and over-limit videos before downloading
+        _charge('transcribe')
+        metadata = get_metadata_service().check(video_id, cookies_file, admit=_admit_metadata, charge=_charge_metadata)
+        
+        # Get transcript using Whisper (cycler handles API key)
+        result, _ = _transcribe_flights.do(
+            (video_id, language or 'auto'),
+            _run_transcribe_pipeline,
+            video_id,
+            language,
+            cookies_from_browser if not cookies_path else None,
+            cookies_file,
+            metadata
         )
         
-        return jsonify({
-            'video_id': video_id,
-            'transcript': transcript_text,
-            'language': language or 'auto'
-        })
+        return jsonify(result)
     
+    except VideoRejected as e:
+        return _rejected_response(e)
+    except Overloaded as e:
+        return _overloaded_response(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(e)
 
 
 @app.route('/api/create-flashcards', methods=['POST'])
@@ -164,9 +390,20 @@ def create_flashcards():
         if not transcript:
             return jsonify({'error': 'Transcript is required'}), 400
         
+        # Instant offline draft, no API calls
+        if data.get('draft'):
+            return jsonify(_draft_result(transcript))
+        
         # Create notes (cycler handles API key)
         creator = NotesCreator()
-        notes = creator.create_notes(transcript, style=style)
+        _charge('create-flashcards')
+        try:
+            with _admitted('create-flashcards'):
+                notes = creator.create_notes(transcript, style=style)
+        except Overloaded:
+            raise
+        except Exception as e:
+            return jsonify(_draft_result(transcript, error=e))
         
         # Parse flashcards
         formatter = NotesFormatter()
@@ -178,8 +415,27 @@ def create_flashcards():
             'count': len(flashcards)
         })
     
+    except Overloaded as e:
+        return _overloaded_response(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(e)
+
+
+@app.route('/api/rank-transcript', methods=['POST'])
+def rank_transcript():
+    """Show which parts of a transcript would be sent to the LLM under a token budget"""
+    try:
+        data = request.get_json()
+        transcript = data.get('transcript')
+        max_tokens = int(data.get('max_tokens') or NOTES_PROMPT_TOKENS)
+        
+        if not transcript:
+            return jsonify({'error': 'Transcript is required'}), 400
+        
+        return jsonify(compact_transcript(transcript, max_tokens, consumer='inspect'))
+    
+    except Exception as e:
+        return _error_response(e)
 
 
 @app.route('/api/export-anki', methods=['POST'])
@@ -218,7 +474,7 @@ def export_anki():
         })
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(e)
 
 
 @app.route('/api/process-complete', methods=['POST'])
@@ -238,38 +494,241 @@ def process_complete():
         scraper = YouTubeURLScraper()
         video_id = scraper.extract_video_id(url)
         
-        # Step 2: Get transcript using Whisper (cycler handles API key)
+        # Use production cookies if available, otherwise use browser cookies from request
+        cookies_path = get_cookies_path()
+        cookies_file = cookies_path if cookies_path else data.get('cookies_file')
+        
+        # Pre-flight: reject live, private and over-limit videos before downloading
+        _charge('process-complete')
+        metadata = get_metadata_service().check(video_id, cookies_file, admit=_admit_metadata, charge=_charge_metadata)
+        
+        # Steps 2-4 run once for identical concurrent requests
+        result, _ = _complete_flights.do(
+            (video_id, language or 'auto', style),
+            _run_complete_pipeline,
+            video_id,
+            language,
+            style,
+            cookies_from_browser if not cookies_path else None,
+            cookies_file,
+            metadata
+        )
+        
+        return jsonify(result)
+    
+    except VideoRejected as e:
+        return _rejected_response(e)
+    except Overloaded as e:
+        return _overloaded_response(e)
+    except Exception as e:
+        return _error_response(e)
+
+
+def _metadata_stage(job, video_id, cookies_file, metadata=None):
+    """Checkpoint the preflight metadata (looked up again when resuming)"""
+    return job.stage('metadata', lambda: metadata or get_metadata_service().check(video_id, cookies_file))
+
+
+def _transcript_stage(job, video_id, language, cookies_from_browser, cookies_file):
+    """
+    Download and transcribe with the Whisper API (cycler handles API key)
+    Returns:
+        (transcript text, timestamped segments in SegmentStore.to_dict() form)
+    """
+    def transcribe():
         transcriber = YouTubeTranscriber()
+        try:
+            # A checkpointed audio path is only reused while the cache still has the file
+            audio_path = job.stage(
+                'audio',
+                transcriber.download_audio,
+                video_id,
+                cookies_from_browser,
+                cookies_file,
+                validate=os.path.exists
+            )
+            text = transcriber.transcribe_file(audio_path, language)
+            return {'text': text, 'segments': transcriber.segments.to_dict()}
+        except Exception as e:
+            raise Exception(f"Error transcribing video: {str(e)}")
+    
+    # Segments are checkpointed with the text so later stages never need another ASR pass
+    transcription = job.stage('transcript', transcribe)
+    return transcription['text'], transcription['segments']
+
+
+def _run_transcribe_pipeline(video_id, language, cookies_from_browser, cookies_file, metadata=None):
+    """Audio -> transcript for /api/transcribe, checkpointed per stage"""
+    with get_job_store().open('transcribe', {'video_id': video_id, 'language': language}) as job:
+        if job.result is not None:
+            return job.result
+        job.hold(_admitted('transcribe'))
         
-        # Use production cookies if available, otherwise use browser cookies from request
-        cookies_file = COOKIES_PATH if COOKIES_PATH else data.get('cookies_file')
+        _metadata_stage(job, video_id, cookies_file, metadata)
+        transcript, segments = _transcript_stage(job, video_id, language, cookies_from_browser, cookies_file)
         
-        formatted_text = transcriber.get_transcript(
-            video_id, 
-            language=language,
-            cookies_from_browser=cookies_from_browser if not COOKIES_PATH else None,
-            cookies_file=cookies_file
-        )
+        return job.finish({
+            'video_id': video_id,
+            'transcript': transcript,
+            'segments': list(SegmentStore.from_dict(segments)),
+            'language': language or 'auto',
+            'job_id': job.job_id
+        })
+
+
+def _run_complete_pipeline(video_id, language, style, cookies_from_browser, cookies_file, metadata=None):
+    """Transcript -> notes -> flashcards for /api/process-complete, checkpointed per stage"""
+    params = {'video_id': video_id, 'language': language, 'style': style}
+    with get_job_store().open('process-complete', params) as job:
+        if job.result is not None:
+            return job.result
+        job.hold(_admitted('process-complete'))
         
-        # Step 3: Create flashcards (cycler handles API key)
-        creator = NotesCreator()
-        notes = creator.create_notes(formatted_text, style=style)
+        _metadata_stage(job, video_id, cookies_file, metadata)
         
-        # Step 4: Parse flashcards
-        formatter = NotesFormatter()
-        flashcards = formatter.parse_flashcards(notes)
+        # Step 2: Get transcript using Whisper
+        formatted_text, segments = _transcript_stage(job, video_id, language, cookies_from_browser, cookies_file)
         
-        return jsonify({
+        # Step 3: Create flashcards (cycler handles API key)
+        try:
+            notes = job.stage('notes', lambda: NotesCreator().create_notes(formatted_text, style=style))
+        except Exception as e:
+            return _draft_result(
+                formatted_text,
+                segments,
+                error=e,
+                job=job,
+                video_id=video_id,
+                language=language or 'auto'
+            )
+        
+        # Step 4: Parse flashcards (each linked to its moment in the video)
+        flashcards = job.stage('flashcards', lambda: link_cards(NotesFormatter().parse_flashcards(notes), segments))
+        
+        return job.finish({
             'video_id': video_id,
             'transcript': formatted_text,
             'notes': notes,
             'flashcards': flashcards,
             'count': len(flashcards),
-            'language': language or 'auto'
+            'language': language or 'auto',
+            'job_id': job.job_id
         })
+
+
+def _draft_result(transcript, segments=None, keys=('question', 'answer'), error=None, job=None, **fields):
+    """
+    Offline cloze cards for when the LLM step is skipped or fails
+    The job is marked failed rather than done, so a retry still runs the LLM
+    stage (earlier checkpoints are reused).
+    """
+    if error is not None:
+        print(f"⚠️  LLM flashcards failed ({error}), answering with offline cloze cards")
+        ERRORS.inc(endpoint='offline_fallback', type=type(error).__name__)
+    if job is not None:
+        job.fail(error)
+    
+    flashcards = generate_cloze_cards(transcript, keys=keys)
+    if segments:
+        link_cards(flashcards, segments)
+    
+    result = dict(fields, transcript=transcript, flashcards=flashcards, count=len(flashcards))
+    if keys[0] == 'question':
+        result['notes'] = cards_to_notes(flashcards)
+    result.update(draft=True, method='offline-cloze')
+    if error is not None:
+        result['error'] = str(error)
+    if job is not None:
+        result['job_id'] = job.job_id
+    return result
+
+
+@app.route('/api/process-multi', methods=['POST'])
+def process_multi():
+    """Several note styles (e.g. flashcards and a summary) of one video or transcript in one call"""
+    try:
+        data = request.get_json()
+        url = data.get('url')
+        transcript = data.get('transcript')
+        styles = data.get('styles') or ['flashcards', 'summary']
+        language = data.get('language')  # Optional language code
+        cookies_from_browser = data.get('cookies_from_browser')  # Optional
+        
+        if not url and not transcript:
+            return jsonify({'error': 'URL or transcript is required'}), 400
+        unknown = [s for s in styles if s not in STYLE_PROMPTS]
+        if unknown:
+            return jsonify({'error': f"Unknown styles: {', '.join(unknown)}. Choose from {', '.join(STYLE_PROMPTS)}"}), 400
+        styles = sorted(set(styles))
+        
+        _charge('process-multi')
+        if transcript:
+            with _admitted('process-multi'):
+                notes = NotesCreator().create_notes_multi(transcript, styles)
+            return jsonify(_multi_result(notes, transcript=transcript))
+        
+        scraper = YouTubeURLScraper()
+        video_id = scraper.extract_video_id(url)
+        
+        # Use production cookies if available, otherwise use browser cookies from request
+        cookies_path = get_cookies_path()
+        cookies_file = cookies_path if cookies_path else data.get('cookies_file')
+        
+        # Pre-flight: reject live, private and over-limit videos before downloading
+        metadata = get_metadata_service().check(video_id, cookies_file, admit=_admit_metadata, charge=_charge_metadata)
+        
+        result, _ = _multi_flights.do(
+            (video_id, language or 'auto', tuple(styles)),
+            _run_multi_pipeline,
+            video_id,
+            language,
+            styles,
+            cookies_from_browser if not cookies_path else None,
+            cookies_file,
+            metadata
+        )
+        
+        return jsonify(result)
     
+    except VideoRejected as e:
+        return _rejected_response(e)
+    except Overloaded as e:
+        return _overloaded_response(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(e)
+
+
+def _multi_result(notes, segments=None, **fields):
+    """Response for /api/process-multi: notes per style, plus parsed cards if flashcards were asked for"""
+    result = dict(fields, notes=notes)
+    if 'flashcards' in notes:
+        flashcards = NotesFormatter().parse_flashcards(notes['flashcards'])
+        if segments:
+            link_cards(flashcards, segments)
+        result.update(flashcards=flashcards, count=len(flashcards))
+    return result
+
+
+def _run_multi_pipeline(video_id, language, styles, cookies_from_browser, cookies_file, metadata=None):
+    """Transcript -> section digests -> one set of notes per style, checkpointed per stage"""
+    params = {'video_id': video_id, 'language': language, 'styles': styles}
+    with get_job_store().open('process-multi', params) as job:
+        if job.result is not None:
+            return job.result
+        job.hold(_admitted('process-multi'))
+        
+        _metadata_stage(job, video_id, cookies_file, metadata)
+        transcript, segments = _transcript_stage(job, video_id, language, cookies_from_browser, cookies_file)
+        notes = job.stage('notes', NotesCreator().create_notes_multi, transcript, styles)
+        
+        return job.finish(_multi_result(
+            notes,
+            segments,
+            video_id=video_id,
+            transcript=transcript,
+            language=language or 'auto',
+            job_id=job.job_id
+        ))
 
 
 @app.route('/api/process-free', methods=['POST'])
@@ -295,39 +754,192 @@ def process_free():
         scraper = YouTubeURLScraper()
         video_id = scraper.extract_video_id(url)
         
-        # Step 2: Download audio
-        from urlScraper import download_audio
-        temp_dir = tempfile.mkdtemp()
-        audio_path = download_audio(url, output_dir=temp_dir)
+        # Pre-flight: reject live, private and over-limit videos before downloading
+        _charge('process-free')
+        metadata = get_metadata_service().check(video_id, get_cookies_path(), admit=_admit_metadata,
+                                                charge=_charge_metadata)
+        
+        # Steps 2-4 run once for identical concurrent requests
+        result, _ = _free_flights.do(
+            (video_id, language),
+            _run_free_pipeline,
+            video_id,
+            language,
+            metadata
+        )
         
-        # Step 3: Transcribe with local Whisper
-        whisper = LocalWhisperTranscriber(model_size="base")
+        return jsonify(result)
+    
+    except VideoRejected as e:
+        return _rejected_response(e)
+    except Overloaded as e:
+        return _overloaded_response(e)
+    except Exception as e:
+        return _error_response(e)
+
+
+def _run_free_pipeline(video_id, language, metadata=None):
+    """Download -> local Whisper -> Copilot flashcards for /api/process-free, checkpointed per stage"""
+    with get_job_store().open('process-free', {'video_id': video_id, 'language': language}) as job:
+        if job.result is not None:
+            return job.result
+        job.hold(_admitted('process-free'))
+        
+        metadata = _metadata_stage(job, video_id, get_cookies_path(), metadata)
         lang_code = _language_to_code(language)
-        transcript = whisper.transcribe(audio_path, language=lang_code)
+        
+        # Step 2-3: Download and transcribe with local Whisper
+        transcription = job.stage(
+            'transcript',
+            _local_transcribe,
+            job,
+            video_id,
+            lang_code,
+            metadata.get('duration')
+        )
         
         # Step 4: Generate flashcards with Copilot API
-        copilot = CopilotFlashcardGenerator(copilot_api_url="http://localhost:8080/api")
-        flashcards = copilot.generate_flashcards(transcript, language=language)
+        copilot = CopilotFlashcardGenerator(copilot_api_url=COPILOT_API_URL)
         
-        # Cleanup
-        try:
-            os.remove(audio_path)
-            os.rmdir(temp_dir)
-        except:
-            pass
+        def copilot_cards():
+            cards = copilot.generate_flashcards(transcription['text'], language=language)
+            return {
+                'flashcards': link_cards(cards, transcription['segments']),
+                'sections': copilot.total_sections,
+                'failed_sections': copilot.failed_sections,
+                'summarised': copilot.summarised
+            }
         
-        return jsonify({
+        try:
+            # Older checkpoints hold a bare card list without section counts
+            cards = job.stage('flashcards', copilot_cards, validate=lambda output: isinstance(output, dict))
+        except Exception as e:
+            return _draft_result(
+                transcription['text'],
+                transcription['segments'],
+                keys=('front', 'back'),
+                error=e,
+                job=job,
+                video_id=video_id,
+                language=language,
+                cost='$0.00',
+                model_size=transcription['model_size']
+            )
+        
+        flashcards = cards['flashcards']
+        return job.finish({
             'video_id': video_id,
-            'transcript': transcript,
+            'transcript': transcription['text'],
             'flashcards': flashcards,
             'count': len(flashcards),
+            'partial': cards['failed_sections'] > 0 or cards['summarised'],
+            'sections': cards['sections'],
+            'failed_sections': cards['failed_sections'],
             'language': language,
             'cost': '$0.00',
-            'method': 'local-whisper + copilot-api'
+            'method': 'local-whisper + copilot-api',
+            'model_size': transcription['model_size'],
+            'job_id': job.job_id
         })
+
+
+def _local_transcribe(job, video_id, lang_code, duration):
+    """Local Whisper transcription for the free pipeline (model size picked per job)"""
+    global _local_jobs_in_flight
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # Audio is served from the audio cache when already downloaded
+    from urlScraper import download_audio
+    audio_path = job.stage(
+        'audio',
+        download_audio,
+        f"https://www.youtube.com/watch?v={video_id}",
+        cookies_file=get_cookies_path(),
+        validate=os.path.exists
+    )
+    
+    with _local_jobs_lock:
+        queue_depth = _local_jobs_in_flight
+        _local_jobs_in_flight += 1
+    try:
+        model_size = get_model_policy().select(
+            duration=duration,
+            language=lang_code,
+            queue_depth=queue_depth,
+            job_id=video_id
+        )
+        # CPU-bound (and a cold model load for a new size): runs on a native
+        # thread so other requests keep flowing
+        text, segments = run_cpu_bound(_whisper_transcribe, model_size, audio_path, lang_code)
+    finally:
+        with _local_jobs_lock:
+            _local_jobs_in_flight -= 1
+    
+    return {'text': text, 'model_size': model_size, 'segments': segments}
+
+
+def _whisper_transcribe(model_size, audio_path, lang_code):
+    """Load (or reuse) a local Whisper model and transcribe; returns (text, segments)"""
+    whisper = LocalWhisperTranscriber(model_size=model_size)
+    text = whisper.transcribe(audio_path, language=lang_code)
+    return text, whisper.segments.to_dict()
+
+
+def _resume_transcribe(params):
+    _transcribe_flights.do(
+        (params['video_id'], params['language'] or 'auto'),
+        _run_transcribe_pipeline,
+        params['video_id'],
+        params['language'],
+        None,
+        get_cookies_path()
+    )
+
+
+def _resume_complete(params):
+    _complete_flights.do(
+        (params['video_id'], params['language'] or 'auto', params['style']),
+        _run_complete_pipeline,
+        params['video_id'],
+        params['language'],
+        params['style'],
+        None,
+        get_cookies_path()
+    )
+
+
+def _resume_multi(params):
+    _multi_flights.do(
+        (params['video_id'], params['language'] or 'auto', tuple(params['styles'])),
+        _run_multi_pipeline,
+        params['video_id'],
+        params['language'],
+        params['styles'],
+        None,
+        get_cookies_path()
+    )
+
+
+def _resume_free(params):
+    if COPILOT_AVAILABLE:
+        _free_flights.do(
+            (params['video_id'], params['language']),
+            _run_free_pipeline,
+            params['video_id'],
+            params['language']
+        )
+
+
+JOB_RESUMERS = {
+    'transcribe': _resume_transcribe,
+    'process-complete': _resume_complete,
+    'process-multi': _resume_multi,
+    'process-free': _resume_free,
+}
+
+
+def resume_interrupted_jobs():
+    """Pick up jobs abandoned by a crashed or recycled worker (called per worker at startup)"""
+    get_job_store().resume_stale(JOB_RESUMERS)
 
 
 def _language_to_code(language):
@@ -343,4 +955,6 @@ def _language_to_code(language):
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
+    warmup.start_warmup()
+    resume_interrupted_jobs()
     app.run(host='0.0.0.0', port=port, debug=os.getenv('FLASK_ENV') == 'development')
@@ -0,0 +1,205 @@
+"""
+Audio Cache
+Keeps downloaded audio on disk keyed by video id and format so that
+re-transcribing a video (another language, model size or engine) skips
+the download. Entries are evicted least-recently-used once the cache
+grows past its byte budget.
+
+Safe to share between gunicorn workers: downloads for the same entry are
+serialized with a file lock and files are moved into place atomically.
+
+Environment:
+    AUDIO_CACHE_DIR        Cache directory (default ~/.cache/fastscribe/audio)
+    AUDIO_CACHE_MAX_BYTES  Byte budget (default 2 GB)
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import record_cache, stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'fastscribe', 'audio')
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Leftover download directories from crashed workers are removed after this long
+STALE_TMP_SECONDS = 3600
+
+
+class AudioCache:
+    """Content cache of downloaded audio files"""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        """
+        Args:
+            cache_dir: Directory for cached audio (default from AUDIO_CACHE_DIR)
+            max_bytes: Byte budget before LRU eviction (default from AUDIO_CACHE_MAX_BYTES)
+        """
+        self.cache_dir = cache_dir or os.getenv('AUDIO_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.max_bytes = int(max_bytes if max_bytes is not None else os.getenv('AUDIO_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.lock_dir = os.path.join(self.cache_dir, '.locks')
+        self.thread_locks = {}
+        self.thread_locks_guard = threading.Lock()
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    def _entry_prefix(self, video_id, fmt):
+        return f"{video_id}-{fmt}"
+
+    def lookup(self, video_id, fmt):
+        """Path of a cached entry (marked as recently used), or None"""
+        pattern = os.path.join(self.cache_dir, glob.escape(self._entry_prefix(video_id, fmt)) + '.*')
+        for path in glob.glob(pattern):
+            try:
+                os.utime(path)  # mtime is the LRU clock
+                return path
+            except FileNotFoundError:
+                continue  # Evicted by another worker
+        return None
+
+    @contextmanager
+    def _locked(self, key):
+        """Exclusive lock on one entry across threads and processes"""
+        with self.thread_locks_guard:
+            thread_lock = self.thread_locks.setdefault(key, threading.Lock())
+
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.lock_dir, f"{key}.lock"), 'w') as lock_file:
+                # Poll instead of blocking so a gevent worker keeps serving other requests
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        time.sleep(0.1)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_or_download(self, video_id, fmt, download):
+        """
+        Return the cached audio for a video, downloading it on a miss
+        Args:
+            video_id: YouTube video ID
+            fmt: Format label the entry is keyed by (e.g. 'mp3', 'bestaudio')
+            download: Callable(output_dir) that downloads into output_dir and
+                      returns the path of the audio file
+        Returns:
+            Path to the cached audio file (do not delete it)
+        """
+        key = self._entry_prefix(video_id, fmt)
+
+        path = self.lookup(video_id, fmt)
+        if path:
+            record_cache('audio', True)
+            print(f"💾 Audio cache hit: {os.path.basename(path)}")
+            return path
+
+        with self._locked(key):
+            # Another worker may have finished the download while we waited
+            path = self.lookup(video_id, fmt)
+            if path:
+                record_cache('audio', True)
+                print(f"💾 Audio cache hit: {os.path.basename(path)}")
+                return path
+
+            record_cache('audio', False)
+            temp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+            try:
+                downloaded = download(temp_dir)
+                if not downloaded or not os.path.exists(downloaded):
+                    raise Exception("Failed to download audio")
+
+                ext = os.path.splitext(downloaded)[1] or '.audio'
+                path = os.path.join(self.cache_dir, key + ext)
+                os.replace(downloaded, path)  # Atomic within the cache directory
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.evict(keep=path)
+        return path
+
+    def entries(self):
+        """[(path, size, mtime), ...] for every cached file"""
+        result = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                result.append((entry.path, st.st_size, st.st_mtime))
+        return result
+
+    def size(self):
+        """Total bytes currently cached"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Remove least-recently-used entries until the cache fits its budget
+        Args:
+            keep: Path that must not be evicted (the entry just returned to a caller)
+        Returns:
+            Number of bytes freed
+        """
+        with stage('audio_cache_evict'):
+            self._remove_stale_downloads()
+
+            entries = sorted(self.entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            freed = 0
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # Already evicted by another worker
+                total -= size
+                freed += size
+
+        if freed:
+            print(f"🧹 Audio cache evicted {freed / 1024 ** 2:.1f} MB ({total / 1024 ** 2:.1f} MB kept)")
+        return freed
+
+    def _remove_stale_downloads(self):
+        """Delete temp download dirs left behind by crashed workers"""
+        cutoff = time.time() - STALE_TMP_SECONDS
+        for path in glob.glob(os.path.join(self.cache_dir, '.tmp-*')):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+
+
+# Global instance
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Get or create the global audio cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache()
+        return _cache
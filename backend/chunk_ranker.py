@@ -0,0 +1,163 @@
+"""
+Chunk Ranking
+Ranks transcript chunks by salience with a vectorized NumPy TF-IDF over
+words and two-word keyphrases, then picks the top chunks that fit a token
+budget. Each chunk's score is its cosine similarity to the whole
+transcript, the centroid of all chunk vectors. Picks are diversified MMR
+style, so near-duplicate chunks don't crowd out the rest of the video.
+Ranking a 3-hour transcript takes milliseconds on CPU.
+
+Used by transcript_compactor when a transcript is still over budget after
+cleanup; the returned ranking says which chunks were kept and why.
+
+Environment:
+    RANK_CHUNK_TOKENS  Target tokens per chunk (default 250)
+    RANK_MAX_TERMS     Vocabulary cap, most important terms first (default 4096)
+    RANK_DIVERSITY     0-1, penalty for chunks similar to ones already picked (default 0.3)
+"""
+
+import os
+import re
+
+import numpy as np
+
+from metrics import stage
+
+
+CHUNK_TOKENS = int(os.getenv('RANK_CHUNK_TOKENS', 250))
+MAX_TERMS = int(os.getenv('RANK_MAX_TERMS', 4096))
+DIVERSITY = float(os.getenv('RANK_DIVERSITY', 0.3))
+
+# Keyphrases reported per chunk in the ranking
+TOP_KEYPHRASES = 5
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def group_chunks(token_counts, chunk_tokens=None):
+    """
+    Group consecutive sentences into chunks of about chunk_tokens
+    Returns:
+        [(first_sentence, end_sentence), ...] (end exclusive)
+    """
+    chunk_tokens = chunk_tokens or CHUNK_TOKENS
+    chunks = []
+    first = 0
+    used = 0
+    for i, tokens in enumerate(token_counts):
+        if i > first and used + tokens > chunk_tokens:
+            chunks.append((first, i))
+            first, used = i, 0
+        used += tokens
+    if first < len(token_counts):
+        chunks.append((first, len(token_counts)))
+    return chunks
+
+
+def _term_matrix(texts, stopwords):
+    """
+    Sparse chunk x term counts for words and adjacent content-word pairs
+    Returns:
+        (rows, cols, counts, vocabulary)
+    """
+    vocabulary = {}
+    rows = []
+    cols = []
+    for row, text in enumerate(texts):
+        words = [w for w in WORD_RE.findall(text.lower()) if len(w) > 2 and w not in stopwords]
+        terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        rows.extend([row] * len(terms))
+        cols.extend(vocabulary.setdefault(t, len(vocabulary)) for t in terms)
+
+    if not cols:
+        return None
+    # Collapse repeated (chunk, term) pairs into counts
+    keys = np.asarray(rows, dtype=np.int64) * len(vocabulary) + np.asarray(cols, dtype=np.int64)
+    unique, counts = np.unique(keys, return_counts=True)
+    return unique // len(vocabulary), unique % len(vocabulary), counts, vocabulary
+
+
+def rank_chunks(texts, token_counts, max_tokens, diversity=None, stopwords=frozenset()):
+    """
+    Rank chunks by salience and pick the best ones that fit a budget
+    Args:
+        texts: Chunk texts in transcript order
+        token_counts: Tokens per chunk
+        max_tokens: Budget for the selected chunks
+        diversity: MMR penalty weight (RANK_DIVERSITY)
+        stopwords: Words ignored as terms
+    Returns:
+        Dict with 'selected' (chunk indices in transcript order), 'chunks'
+        ([{index, tokens, score, selected, keyphrases}, ...]) and 'keyphrases'
+        (top terms of the whole transcript)
+    """
+    diversity = DIVERSITY if diversity is None else diversity
+    n = len(texts)
+
+    with stage('rank_chunks'):
+        matrix = _term_matrix(texts, stopwords)
+        if matrix is None:
+            # Nothing but stopwords: keep chunks in order while they fit
+            selected, used = [], 0
+            for i, tokens in enumerate(token_counts):
+                if used + tokens <= max_tokens:
+                    selected.append(i)
+                    used += tokens
+            return {'selected': selected, 'chunks': [], 'keyphrases': []}
+        rows, cols, counts, vocabulary = matrix
+
+        # TF-IDF with sublinear term frequency
+        document_frequency = np.bincount(cols, minlength=len(vocabulary))
+        idf = np.log((1 + n) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(counts)) * idf[cols]
+
+        # Keep the most important terms as dense columns (chunks x terms stays small)
+        importance = np.bincount(cols, weights=weights, minlength=len(vocabulary))
+        kept_terms = np.argsort(-importance)[:MAX_TERMS]
+        column = np.full(len(vocabulary), -1, dtype=np.int64)
+        column[kept_terms] = np.arange(len(kept_terms))
+        mask = column[cols] >= 0
+        dense = np.zeros((n, len(kept_terms)), dtype=np.float32)
+        dense[rows[mask], column[cols[mask]]] = weights[mask]  # (chunk, term) pairs are unique
+
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        unit = dense / np.maximum(norms, 1e-9)
+        centroid = unit.sum(axis=0)
+        centroid /= max(np.linalg.norm(centroid), 1e-9)
+        salience = unit @ centroid
+
+        # Greedy MMR under the token budget
+        tokens = np.asarray(token_counts, dtype=np.int64)
+        max_similarity = np.zeros(n, dtype=np.float32)
+        available = salience > 0
+        selected = []
+        used = 0
+        while available.any():
+            mmr = np.where(available, (1 - diversity) * salience - diversity * max_similarity, -np.inf)
+            best = int(np.argmax(mmr))
+            available[best] = False
+            if used + tokens[best] > max_tokens:
+                continue
+            selected.append(best)
+            used += int(tokens[best])
+            max_similarity = np.maximum(max_similarity, unit @ unit[best])
+            available &= tokens <= max_tokens - used
+
+    terms = np.array(list(vocabulary), dtype=object)[kept_terms]
+    chosen = set(selected)
+    chunks = []
+    for i in range(n):
+        top = np.argsort(-dense[i])[:TOP_KEYPHRASES]
+        chunks.append({
+            'index': i,
+            'tokens': int(tokens[i]),
+            'score': round(float(salience[i]), 4),
+            'selected': i in chosen,
+            'keyphrases': [str(terms[t]) for t in top if dense[i, t] > 0],
+        })
+
+    return {
+        'selected': sorted(selected),
+        'chunks': chunks,
+        'keyphrases': [str(t) for t in terms[:TOP_KEYPHRASES * 2]],
+    }
@@ -0,0 +1,177 @@
+"""
+Offline Cloze Flashcards
+Builds fill-in-the-blank cards straight from a transcript with no network
+calls: key terms are scored from term statistics (frequency, how many
+sentences use them and how widely they are spread through the video), and
+each term is blanked out of the best sentence that mentions it, preferring
+definitions ("X is ...", "X refers to ...", "called X"). Runs in well under a
+second, so it serves as an instant draft and as the fallback when OpenAI or
+copilot-api is unavailable.
+
+Cards use the NotesFormatter.parse_flashcards format ('question'/'answer').
+"""
+
+import math
+import re
+
+from metrics import timed
+from transcript_compactor import STOPWORDS, dedupe_sentences, split_sentences, strip_disfluencies
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MAX_CARDS = 20
+MIN_SENTENCE_WORDS = 6
+MAX_SENTENCE_WORDS = 45
+
+# Terms used in more than this share of sentences are too generic to test
+MAX_SENTENCE_SHARE = 0.3
+
+BLANK = '_____'
+
+DEFINITION_PATTERNS = [
+    r"\b{term}\s+(?:is|are|was|were)\s+(?:a|an|the|defined as|known as|called)\b",
+    r"\b{term}\s+(?:refers to|means|describes|represents|consists of)\b",
+    r"\b(?:called|known as|termed|named)\s+(?:an?\s+|the\s+)?{term}\b",
+    r"\bdefine\s+{term}\b",
+]
+
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9'-]*")
+
+# Common spoken-language verbs and adverbs that make poor answers
+WEAK_WORDS = frozenset({
+    'happen', 'happens', 'happened', 'going', 'gonna', 'want', 'wants', 'need', 'needs',
+    'make', 'makes', 'made', 'take', 'takes', 'give', 'gives', 'look', 'looks', 'looking',
+    'thing', 'things', 'stuff', 'kind', 'sort', 'lot', 'lots', 'able', 'uses', 'used', 'using',
+    'called', 'means', 'said', 'says', 'talk', 'talking', 'remember', 'next', 'first', 'also',
+    'actually', 'basically', 'really', 'right', 'okay', 'today', 'example', 'time', 'times',
+})
+
+
+def _terms(sentence):
+    """Content words and adjacent content-word pairs of a sentence (lowercase)"""
+    words = [w.lower() for w in WORD_RE.findall(sentence)]
+    content = [
+        w if len(w) > 3 and w not in STOPWORDS and w not in WEAK_WORDS and not w.endswith('ly') else None
+        for w in words
+    ]
+    terms = {w for w in content if w}
+    terms.update(f"{a} {b}" for a, b in zip(content, content[1:]) if a and b)
+    return terms
+
+
+def score_terms(sentence_terms):
+    """
+    Score candidate terms
+    score = frequency x idf x spread, with two-word phrases boosted; terms
+    that occur once or in too many sentences are dropped
+    Args:
+        sentence_terms: List of term sets, one per sentence in order
+    Returns:
+        {term: score}
+    """
+    n = len(sentence_terms)
+    vocabulary = {}
+    positions = []
+    for i, terms in enumerate(sentence_terms):
+        for term in terms:
+            positions.append((i, vocabulary.setdefault(term, len(vocabulary))))
+    if not positions:
+        return {}
+
+    names = list(vocabulary)
+    phrase = [1.5 if ' ' in t else 1.0 for t in names]
+
+    if np is not None:
+        rows, cols = np.array(positions, dtype=np.int64).T
+        df = np.bincount(cols, minlength=len(names)).astype(np.float64)
+        first = np.full(len(names), n, dtype=np.int64)
+        last = np.zeros(len(names), dtype=np.int64)
+        np.minimum.at(first, cols, rows)
+        np.maximum.at(last, cols, rows)
+        spread = (last - first + 1) / n
+        scores = df * np.log(1 + n / df) * (0.5 + spread) * np.array(phrase)
+        keep = (df >= 2) & (df <= max(2, MAX_SENTENCE_SHARE * n))
+        return {names[i]: float(scores[i]) for i in np.flatnonzero(keep)}
+
+    df = [0] * len(names)
+    first = [n] * len(names)
+    last = [0] * len(names)
+    for row, col in positions:
+        df[col] += 1
+        first[col] = min(first[col], row)
+        last[col] = max(last[col], row)
+    scores = {}
+    for i, term in enumerate(names):
+        if 2 <= df[i] <= max(2, MAX_SENTENCE_SHARE * n):
+            spread = (last[i] - first[i] + 1) / n
+            scores[term] = df[i] * math.log(1 + n / df[i]) * (0.5 + spread) * phrase[i]
+    return scores
+
+
+def _is_definition(sentence, term):
+    escaped = re.escape(term).replace(r'\ ', r'\s+')
+    return any(re.search(p.format(term=escaped), sentence, re.IGNORECASE) for p in DEFINITION_PATTERNS)
+
+
+def _blank(sentence, term):
+    pattern = r"\b" + re.escape(term).replace(r'\ ', r'\s+') + r"\b"
+    return re.sub(pattern, BLANK, sentence, flags=re.IGNORECASE)
+
+
+@timed('cloze_cards')
+def generate_cloze_cards(transcript, max_cards=MAX_CARDS, keys=('question', 'answer')):
+    """
+    Generate fill-in-the-blank flashcards from a transcript, offline
+    Args:
+        transcript: Transcript text
+        max_cards: Maximum number of cards
+        keys: Field names for the front and back of a card
+              (('front', 'back') for the copilot card format)
+    Returns:
+        List of cards in transcript order
+    """
+    sentences = dedupe_sentences(split_sentences(strip_disfluencies(transcript)))
+    sentence_terms = [_terms(s) for s in sentences]
+    scores = score_terms(sentence_terms)
+
+    # Longer terms first so "neural network" wins over "network" in the same sentence
+    ranked = sorted(scores, key=lambda t: (-scores[t], -len(t)))
+    used_sentences = set()
+    covered = set()
+    cards = []
+    for term in ranked:
+        if len(cards) >= max_cards:
+            break
+        if any(term in c or c in term for c in covered):
+            continue
+
+        best = None
+        for i, terms in enumerate(sentence_terms):
+            if i in used_sentences or term not in terms:
+                continue
+            words = len(sentences[i].split())
+            if not MIN_SENTENCE_WORDS <= words <= MAX_SENTENCE_WORDS:
+                continue
+            # Definitions first, then sentences rich in other key terms
+            rank = (_is_definition(sentences[i], term), sum(scores.get(t, 0) for t in terms))
+            if best is None or rank > best[0]:
+                best = (rank, i)
+        if best is None:
+            continue
+
+        i = best[1]
+        used_sentences.add(i)
+        covered.add(term)
+        cards.append((i, {keys[0]: f"Fill in the blank: {_blank(sentences[i], term)}", keys[1]: term}))
+
+    print(f"🃏 Generated {len(cards)} cloze cards offline from {len(sentences)} sentences")
+    return [card for _, card in sorted(cards, key=lambda c: c[0])]
+
+
+def cards_to_notes(cards):
+    """Render cards as Q:/A: text, the format NotesFormatter.parse_flashcards reads"""
+    return '\n\n'.join(f"Q: {card['question']}\nA: {card['answer']}" for card in cards)
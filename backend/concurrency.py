@@ -0,0 +1,133 @@
+"""
+Concurrency Helpers
+The API runs on gevent workers in production (see start.sh): every request
+is a greenlet, so a request waiting on OpenAI, copilot-api or a home Whisper
+server costs a few KB instead of an OS thread. This module provides:
+- pooled HTTP clients (requests.Session, OpenAI/httpx) shared by all greenlets
+- run_cpu_bound() to move CPU-heavy work (local Whisper) onto real OS
+  threads so it doesn't stall the event loop
+- run_blocking() for calls that block in C without yielding to gevent
+  (sqlite3 lock waits, fcntl.flock)
+- copilot_slot(), one cap on copilot-api calls shared by every request
+
+Environment:
+    HTTP_POOL_SIZE    Keep-alive connections per upstream host (default 200)
+    CPU_WORKERS       Native threads for CPU-bound work (default: CPU count)
+    BLOCKING_WORKERS  Native threads for blocking file and database calls (default 16)
+    COPILOT_PARALLELISM  copilot-api calls in flight per worker, across all
+                      requests (default 4; the server is a single local process)
+"""
+
+import contextvars
+import os
+import threading
+
+
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 200))
+
+_lock = threading.Lock()
+_session = None
+_openai_clients = {}
+_openai_http = None
+_cpu_pool = None
+_blocking_pool = None
+_copilot_semaphore = threading.BoundedSemaphore(int(os.getenv('COPILOT_PARALLELISM', 4)))
+
+
+def gevent_active():
+    """True when running under a monkey-patched gevent worker"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def get_http_session():
+    """Shared requests.Session with a connection pool sized for many in-flight calls"""
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def get_openai_client(api_key):
+    """
+    OpenAI client for an API key, reused across requests
+    All clients share one httpx connection pool
+    """
+    global _openai_http
+    with _lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            import httpx
+            from openai import OpenAI
+
+            if _openai_http is None:
+                _openai_http = httpx.Client(
+                    limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+                    timeout=httpx.Timeout(600.0, connect=10.0)
+                )
+            client = _openai_clients[api_key] = OpenAI(api_key=api_key, http_client=_openai_http)
+        return client
+
+
+def _get_cpu_pool():
+    global _cpu_pool
+    with _lock:
+        if _cpu_pool is None:
+            from gevent.threadpool import ThreadPool
+            _cpu_pool = ThreadPool(int(os.getenv('CPU_WORKERS', os.cpu_count() or 2)))
+        return _cpu_pool
+
+
+def run_cpu_bound(fn, *args, **kwargs):
+    """
+    Run CPU-heavy work without blocking other requests
+    Under gevent the call runs on a native thread and this greenlet waits
+    cooperatively; with plain threaded workers it runs inline
+    The request/trace context is carried over, so stages still show up in
+    Server-Timing and traces
+    """
+    if not gevent_active():
+        return fn(*args, **kwargs)
+
+    ctx = contextvars.copy_context()
+    return _get_cpu_pool().apply(ctx.run, (fn,) + args, kwargs)
+
+
+def _get_blocking_pool():
+    global _blocking_pool
+    with _lock:
+        if _blocking_pool is None:
+            from gevent.threadpool import ThreadPool
+            _blocking_pool = ThreadPool(int(os.getenv('BLOCKING_WORKERS', 16)))
+        return _blocking_pool
+
+
+def run_blocking(fn, *args, **kwargs):
+    """
+    Run a call that blocks without yielding (sqlite3, fcntl.flock)
+    Under gevent a lock wait inside such a call would freeze every request
+    on the worker, so it runs on a separate native thread pool (kept apart
+    from run_cpu_bound so a long transcription can't starve it); inline
+    otherwise
+    """
+    if not gevent_active():
+        return fn(*args, **kwargs)
+
+    ctx = contextvars.copy_context()
+    return _get_blocking_pool().apply(ctx.run, (fn,) + args, kwargs)
+
+
+def copilot_slot():
+    """Semaphore to hold around a copilot-api call (shared by all requests)"""
+    return _copilot_semaphore
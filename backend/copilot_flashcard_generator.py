@@ -1,12 +1,34 @@
 """
 Fully Automated Flashcard Generator using GitHub Copilot API
 Uses the copilot-api library to generate flashcards programmatically.
+
+The transcript is split into prompt-sized sections that are sent to
+copilot-api concurrently over the pooled HTTP session, and the cards are
+merged back in transcript order. All requests share one cap on calls in
+flight (concurrency.copilot_slot, COPILOT_PARALLELISM).
+
+Up to COPILOT_MAX_SECTIONS sections the whole transcript is covered. Longer
+transcripts are summarised: they get fewer, longer sections, each compacted
+to the prompt budget, so less important sentences are left out.
+
+Environment:
+    COPILOT_MAX_SECTIONS  Most sections per transcript before sections are
+                          compacted (default 32)
 """
 
-import requests
-import json
+import contextvars
+import math
 import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from metrics import stage, timed
+from concurrency import copilot_slot, get_http_session
+from note_digests import split_sections
+from transcript_compactor import COPILOT_PROMPT_TOKENS, compact_transcript
+
+MAX_SECTIONS = int(os.getenv('COPILOT_MAX_SECTIONS', 32))
+PARALLELISM = int(os.getenv('COPILOT_PARALLELISM', 4))
 
 class CopilotFlashcardGenerator:
     """Generate flashcards using GitHub Copilot API (free for students)"""
@@ -19,6 +41,9 @@ class CopilotFlashcardGenerator:
             copilot_api_url: URL of the copilot-api server
         """
         self.api_url = copilot_api_url
+        self.failed_sections = 0  # Sections of the last transcript that produced no cards
+        self.total_sections = 0
+        self.summarised = False   # True if the last transcript was compacted to fit MAX_SECTIONS
     
     def generate_flashcards(self, transcript, language="English"):
         """
@@ -31,30 +56,88 @@ class CopilotFlashcardGenerator:
         Returns:
             List of flashcard dictionaries with 'front' and 'back' keys
         """
-        prompt = self._create_flashcard_prompt(transcript, language)
+        import requests
         
-        try:
-            # Send the prompt to Copilot API
-            flashcards_text = self._call_copilot_api(prompt, language="markdown")
-            
-            # Parse the generated flashcards
-            flashcards = self._parse_flashcards(flashcards_text)
-            
-            return flashcards
-            
-        except requests.exceptions.ConnectionError:
-            raise Exception(
-                "Could not connect to Copilot API. "
-                "Please make sure the copilot-api server is running:\n"
-                "python copilot-api/api.py 8080"
-            )
+        sections = self._split_sections(transcript)
+        self.total_sections = len(sections)
+        
+        with stage('copilot_sections'):
+            with ThreadPoolExecutor(max_workers=max(1, min(PARALLELISM, len(sections)))) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, self._section_flashcards, section, i, len(sections), language)
+                    for i, section in enumerate(sections)
+                ]
+                results = []
+                errors = []
+                for i, future in enumerate(futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        print(f"⚠️  Copilot section {i + 1}/{len(sections)} failed: {e}")
+                        errors.append(e)
+        self.failed_sections = len(errors)
+        
+        # One bad section loses its cards; only fail if nothing came back
+        if errors and not results:
+            if isinstance(errors[0], requests.exceptions.ConnectionError):
+                raise Exception(
+                    "Could not connect to Copilot API. "
+                    "Please make sure the copilot-api server is running:\n"
+                    "python copilot-api/api.py 8080"
+                )
+            raise errors[0]
+        
+        flashcards = self._merge_flashcards(results)
+        print(f"🧩 Copilot: {len(flashcards)} flashcards from {len(sections)} sections "
+              f"({len(errors)} failed)")
+        return flashcards
+    
+    def _split_sections(self, transcript):
+        """Prompt-sized sections covering the whole transcript, at most MAX_SECTIONS"""
+        sections = split_sections(transcript, COPILOT_PROMPT_TOKENS)
+        self.summarised = len(sections) > MAX_SECTIONS
+        if self.summarised:
+            # Fewer, longer sections, each compacted back to the prompt budget
+            scale = math.ceil(len(sections) / MAX_SECTIONS)
+            print(f"📉 Copilot: {len(sections)} sections over the {MAX_SECTIONS} limit, summarising the transcript")
+            sections = [
+                compact_transcript(section, COPILOT_PROMPT_TOKENS, consumer='copilot')['text']
+                for section in split_sections(transcript, COPILOT_PROMPT_TOKENS * scale)
+            ]
+        return sections or [transcript]
+    
+    def _section_flashcards(self, section, index, total, language):
+        """Flashcards for one section of the transcript"""
+        prompt = self._create_flashcard_prompt(section, language, index, total)
+        
+        # Send the prompt to Copilot API
+        with copilot_slot():
+            flashcards_text = self._call_copilot_api(prompt, language="markdown", min_cards=10 if total == 1 else 5)
+        
+        # Parse the generated flashcards
+        return self._parse_flashcards(flashcards_text)
+    
+    def _merge_flashcards(self, card_lists):
+        """Concatenate per-section cards in order, dropping repeated questions"""
+        seen = set()
+        merged = []
+        for cards in card_lists:
+            for card in cards:
+                key = re.sub(r'\W+', ' ', card['front'].lower()).strip()
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(card)
+        return merged
     
-    def _create_flashcard_prompt(self, transcript, language):
-        """Create a detailed prompt for flashcard generation"""
+    def _create_flashcard_prompt(self, transcript, language, index=0, total=1):
+        """Create a detailed prompt for flashcard generation (one section of the transcript)"""
+        part = f" (part {index + 1} of {total})" if total > 1 else ""
+        count = "15-25" if total == 1 else "5-8"
         prompt = f"""# Task: Convert this {language} transcript into Anki flashcards
 
-## Transcript:
-{transcript[:3000]}  # Limit to avoid token issues
+## Transcript{part}:
+{transcript}
 
 ## Instructions:
 Create comprehensive Anki flashcards following these rules:
@@ -67,7 +150,7 @@ Create comprehensive Anki flashcards following these rules:
 
 2. Content Guidelines:
    - Extract ALL key concepts, definitions, and important facts
-   - Create 15-25 flashcards covering the main topics
+   - Create {count} flashcards covering the main topics
    - Questions should be clear and specific
    - Answers should be concise but complete
    - Use simple language, avoid jargon unless defined
@@ -91,7 +174,8 @@ Create comprehensive Anki flashcards following these rules:
 """
         return prompt
     
-    def _call_copilot_api(self, prompt, language="python", max_iterations=5):
+    @timed('llm')
+    def _call_copilot_api(self, prompt, language="python", max_iterations=5, min_cards=10):
         """
         Call the Copilot API iteratively to build the complete response
         
@@ -102,7 +186,7 @@ Create comprehensive Anki flashcards following these rules:
         current_prompt = prompt
         
         for i in range(max_iterations):
-            response = requests.post(
+            response = get_http_session().post(
                 self.api_url,
                 json={
                     "prompt": current_prompt,
@@ -124,11 +208,12 @@ Create comprehensive Anki flashcards following these rules:
             current_prompt += completion
             
             # Check if we have enough flashcards (looking for multiple Q: patterns)
-            if result.count("Q:") >= 10:  # Stop after getting at least 10 flashcards
+            if result.count("Q:") >= min_cards:  # Stop after getting enough flashcards
                 break
         
         return result
     
+    @timed('parse')
     def _parse_flashcards(self, flashcards_text):
         """
         Parse the generated text into structured flashcard format
@@ -3,9 +3,49 @@ Create Formatted Notes using GPT
 Takes transcript and creates structured notes
 """
 
+import contextvars
 import os
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 from apiKeyCycler import get_next_api_key
+from model_router import get_model_router
+from concurrency import get_openai_client
+from transcript_compactor import NOTES_PROMPT_TOKENS, compact_transcript, count_tokens
+from note_digests import cached_digests, section_digests
+
+
+STYLE_PROMPTS = {
+    "detailed": """
+    Create detailed, well-organized notes from this video transcript. 
+    Include:
+    - Main topics and subtopics
+    - Key concepts and definitions
+    - Important examples
+    - Action items or takeaways
+    Format with clear headers and bullet points.
+    """,
+    
+    "summary": """
+    Create a concise summary of this video transcript.
+    Focus on the main ideas and key takeaways.
+    Keep it brief but comprehensive.
+    """,
+    
+    "bullet_points": """
+    Convert this transcript into clear bullet points.
+    Organize by main topics.
+    Each point should be concise and informative.
+    """,
+    
+    "flashcards": """
+    Create flashcard-style Q&A pairs from this transcript.
+    Format each as:
+    Q: [Question]
+    A: [Answer]
+    
+    Focus on key concepts, definitions, and important facts.
+    Make questions clear and answers concise.
+    """
+}
 
 
 class NotesCreator:
@@ -19,8 +59,10 @@ class NotesCreator:
         """
         # Use provided key or get next from cycler
         self.api_key = api_key or get_next_api_key()
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = get_openai_client(self.api_key)
         self.notes = None
+        self.compaction = None
+        self.model = None
     
     def create_notes(self, transcript_text, style="detailed"):
         """
@@ -31,55 +73,90 @@ class NotesCreator:
         Returns:
             Formatted notes
         """
-        prompts = {
-            "detailed": """
-            Create detailed, well-organized notes from this video transcript. 
-            Include:
-            - Main topics and subtopics
-            - Key concepts and definitions
-            - Important examples
-            - Action items or takeaways
-            Format with clear headers and bullet points.
-            """,
-            
-            "summary": """
-            Create a concise summary of this video transcript.
-            Focus on the main ideas and key takeaways.
-            Keep it brief but comprehensive.
-            """,
-            
-            "bullet_points": """
-            Convert this transcript into clear bullet points.
-            Organize by main topics.
-            Each point should be concise and informative.
-            """,
-            
-            "flashcards": """
-            Create flashcard-style Q&A pairs from this transcript.
-            Format each as:
-            Q: [Question]
-            A: [Answer]
-            
-            Focus on key concepts, definitions, and important facts.
-            Make questions clear and answers concise.
-            """
-        }
+        # A long transcript whose other styles were already made: reuse their section digests
+        digests = None
+        if self._uses_digests(style) and count_tokens(transcript_text) > NOTES_PROMPT_TOKENS:
+            digests = cached_digests(transcript_text)
+        self.notes, self.model, self.compaction = self._generate(transcript_text, style, digests)
+        return self.notes
+    
+    def create_notes_multi(self, transcript_text, styles):
+        """
+        Create several note styles from one transcript
+        Transcripts over the prompt budget are summarized section by section
+        once (digests are cached) and every style but 'detailed' is derived
+        from the digests, so the full transcript is not re-sent for each style.
+        Transcripts so long that their digests wouldn't fit the budget
+        either are compacted per style instead
+        Args:
+            transcript_text: Raw transcript text
+            styles: List of note styles
+        Returns:
+            Dict of style -> formatted notes
+        """
+        styles = list(dict.fromkeys(styles))
+        digests = None
+        if any(self._uses_digests(s) for s in styles) and count_tokens(transcript_text) > NOTES_PROMPT_TOKENS:
+            try:
+                # Only worth paying for if the joined digests will fit the notes prompt
+                digests = section_digests(self.client, transcript_text, max_tokens=NOTES_PROMPT_TOKENS)
+            except Exception as e:
+                raise Exception(f"Error creating notes with GPT: {e}")
+        
+        with ThreadPoolExecutor(max_workers=len(styles)) as pool:
+            futures = {
+                style: pool.submit(contextvars.copy_context().run, self._generate, transcript_text, style, digests)
+                for style in styles
+            }
+            results = {style: future.result() for style, future in futures.items()}
+        
+        self.notes = results[styles[0]][0]
+        return {style: result[0] for style, result in results.items()}
+    
+    @staticmethod
+    def _uses_digests(style):
+        """Detailed notes always read the transcript itself; digests would lose detail"""
+        return style in STYLE_PROMPTS and style != "detailed"
+    
+    def _generate(self, transcript_text, style, digests=None):
+        """
+        One notes call for a style, from the section digests or the transcript
+        Returns:
+            (notes, model, compaction)
+        """
+        prompt = STYLE_PROMPTS.get(style, STYLE_PROMPTS["detailed"])
+        
+        compaction = None
+        if digests and self._uses_digests(style):
+            # Digests keep their bullet formatting; they are sent as they are
+            source = '\n\n'.join(digests)
+            tokens = count_tokens(source)
+            if tokens <= NOTES_PROMPT_TOKENS:
+                compaction = {'text': source, 'original_tokens': tokens, 'tokens': tokens, 'tokens_saved': 0}
+                label = "Summaries of consecutive sections of the transcript"
+        
+        if compaction is None:
+            # Strip filler and fit the budget with the densest sentences of the whole video
+            compaction = compact_transcript(transcript_text, NOTES_PROMPT_TOKENS, model="gpt-4", consumer="notes")
+            label = "Transcript"
         
-        prompt = prompts.get(style, prompts["detailed"])
+        system = "You are a helpful assistant that creates clear, well-structured study notes."
+        user = f"{prompt}\n\n{label}:\n{compaction['text']}"
+        prompt_tokens = count_tokens(system + user)
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates clear, well-structured study notes."},
-                    {"role": "user", "content": f"{prompt}\n\nTranscript:\n{transcript_text}"}
+            # Model and max_tokens are routed per request (style, size, measured latency)
+            notes, model = get_model_router().complete(
+                self.client,
+                [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user}
                 ],
-                temperature=0.7,
-                max_tokens=3000
+                prompt_tokens,
+                style,
+                transcript_tokens=compaction['tokens']
             )
-            
-            self.notes = response.choices[0].message.content
-            return self.notes
+            return notes, model, compaction
         
         except Exception as e:
             raise Exception(f"Error creating notes with GPT: {e}")
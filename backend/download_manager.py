@@ -0,0 +1,287 @@
+"""
+Download Manager
+Runs every yt-dlp audio download through one policy:
+- a global cap on concurrent downloads (shared by all gunicorn workers)
+- per-host pacing so bursts don't trip YouTube's "not a bot" check
+- concurrent fragment downloads
+- exponential backoff on throttling, with a host-wide cooldown
+- resume: partial files live in a stable per-video directory, so a retry
+  (or the next request for the same video) continues where it stopped
+
+Environment:
+    DOWNLOAD_MAX_CONCURRENT   Downloads running at once (default 3)
+    DOWNLOAD_HOST_INTERVAL    Seconds between download starts per host (default 2)
+    DOWNLOAD_FRAGMENTS        yt-dlp concurrent_fragment_downloads (default 4)
+    DOWNLOAD_RETRIES          Attempts after the first failure (default 4)
+    DOWNLOAD_BACKOFF_SECONDS  First backoff delay, doubled per attempt (default 10)
+    DOWNLOAD_STATE_DIR        Slot locks, pacing state and partial files
+                              (default ~/.cache/fastscribe/downloads)
+    DOWNLOAD_PARTIAL_MAX_AGE  Partial downloads untouched this long are deleted
+                              (seconds, default 86400)
+    DOWNLOAD_PARTIAL_MAX_BYTES  Byte budget for partial downloads, oldest
+                              pruned first (default 1 GB)
+"""
+
+import hashlib
+import json
+import os
+import random
+import shutil
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlparse
+
+from concurrency import run_blocking
+from metrics import DOWNLOAD_RETRIES, record_stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: limits apply per process only
+    fcntl = None
+
+
+DEFAULT_STATE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'fastscribe', 'downloads')
+DEFAULT_PARTIAL_MAX_BYTES = 1024 ** 3
+
+# Partial downloads touched more recently than this may still be in progress
+PARTIAL_ACTIVE_SECONDS = 600
+
+# Error text that means YouTube is rate limiting us
+THROTTLE_MARKERS = ('HTTP Error 429', 'Too Many Requests', 'not a bot', 'Sign in to confirm')
+
+# Error text worth a plain retry (network hiccups, server errors)
+TRANSIENT_MARKERS = ('timed out', 'Connection reset', 'Connection aborted', 'Read timed out',
+                     'HTTP Error 500', 'HTTP Error 502', 'HTTP Error 503', 'IncompleteRead')
+
+
+def _host(url):
+    """Host a download is paced by (www./m. variants share one budget)"""
+    host = (urlparse(url).hostname or 'unknown').lower()
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return 'youtube.com' if host == 'youtu.be' else host
+
+
+def classify_error(error_msg):
+    """'throttled', 'transient' or None (not worth retrying)"""
+    if any(marker in error_msg for marker in THROTTLE_MARKERS):
+        return 'throttled'
+    if any(marker in error_msg for marker in TRANSIENT_MARKERS):
+        return 'transient'
+    return None
+
+
+class DownloadManager:
+    """Shared download policy for yt-dlp"""
+
+    def __init__(self, max_concurrent=None, host_interval=None, fragments=None,
+                 max_retries=None, backoff_seconds=None, state_dir=None):
+        self.max_concurrent = int(max_concurrent or os.getenv('DOWNLOAD_MAX_CONCURRENT', 3))
+        self.host_interval = float(host_interval if host_interval is not None else os.getenv('DOWNLOAD_HOST_INTERVAL', 2))
+        self.fragments = int(fragments or os.getenv('DOWNLOAD_FRAGMENTS', 4))
+        self.max_retries = int(max_retries if max_retries is not None else os.getenv('DOWNLOAD_RETRIES', 4))
+        self.backoff_seconds = float(backoff_seconds if backoff_seconds is not None else os.getenv('DOWNLOAD_BACKOFF_SECONDS', 10))
+        self.state_dir = state_dir or os.getenv('DOWNLOAD_STATE_DIR', DEFAULT_STATE_DIR)
+        self.partial_dir = os.path.join(self.state_dir, 'partial')
+        self.partial_max_age = float(os.getenv('DOWNLOAD_PARTIAL_MAX_AGE', 86400))
+        self.partial_max_bytes = int(os.getenv('DOWNLOAD_PARTIAL_MAX_BYTES', DEFAULT_PARTIAL_MAX_BYTES))
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+        # In-process fallbacks when fcntl isn't available
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrent)
+        self.host_lock = threading.Lock()
+        self.host_next = {}
+
+    @contextmanager
+    def _slot(self):
+        """Hold one of max_concurrent download slots (across processes)"""
+        if fcntl is None:
+            with self.semaphore:
+                yield
+            return
+
+        while True:
+            for i in range(self.max_concurrent):
+                slot_file = open(os.path.join(self.state_dir, f"slot-{i}.lock"), 'w')
+                try:
+                    fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    slot_file.close()
+                    continue
+                try:
+                    yield
+                finally:
+                    fcntl.flock(slot_file, fcntl.LOCK_UN)
+                    slot_file.close()
+                return
+            time.sleep(0.2)
+
+    @contextmanager
+    def _host_state(self, host):
+        """Locked access to a host's next allowed start time"""
+        if fcntl is None:
+            with self.host_lock:
+                state = {'next_at': self.host_next.get(host, 0.0)}
+                yield state
+                self.host_next[host] = state['next_at']
+            return
+
+        with open(os.path.join(self.state_dir, f"host-{host}.json"), 'a+') as f:
+            run_blocking(fcntl.flock, f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or '{}')
+                except ValueError:
+                    state = {}
+                state.setdefault('next_at', 0.0)
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _wait_for_host(self, host):
+        """Reserve the host's next start time and sleep until it"""
+        with self._host_state(host) as state:
+            now = time.time()
+            start_at = max(now, state['next_at'])
+            state['next_at'] = start_at + self.host_interval
+        wait = start_at - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _cooldown(self, host, seconds):
+        """Hold back every worker's downloads from a throttling host"""
+        with self._host_state(host) as state:
+            state['next_at'] = max(state['next_at'], time.time() + seconds)
+
+    def _resumable_opts(self, ydl_opts, key):
+        """
+        Download options with fragments and a stable temp dir for .part files
+        The output directory of 'outtmpl' becomes the final 'home' path; yt-dlp
+        moves the finished file there
+        """
+        opts = dict(ydl_opts)
+        template = opts.get('outtmpl', '%(id)s.%(ext)s')
+        home, template = os.path.split(template)
+
+        opts['outtmpl'] = template
+        opts['paths'] = {'home': home or '.', 'temp': os.path.join(self.partial_dir, key)}
+        opts['continuedl'] = True
+        opts.setdefault('concurrent_fragment_downloads', self.fragments)
+        opts.setdefault('retries', 3)
+        opts.setdefault('fragment_retries', 3)
+        return opts
+
+    def download(self, url, ydl_opts, action, key=None, timer=None):
+        """
+        Run a yt-dlp download under the shared policy
+        Args:
+            url: Video URL (used for per-host pacing)
+            ydl_opts: yt-dlp options; 'outtmpl' decides where the final file goes
+            action: Callable(ydl) that performs the download, e.g.
+                    lambda ydl: ydl.extract_info(url, download=True)
+            key: Stable id for resuming partial files (default: hash of the URL)
+            timer: Optional metrics.DownloadTimer to measure each attempt
+        Returns:
+            Whatever action returned
+        """
+        import yt_dlp
+
+        key = key or hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        host = _host(url)
+        opts = self._resumable_opts(ydl_opts, key)
+        if timer is not None:
+            timer.install(opts)
+
+        attempt = 0
+        try:
+            while True:
+                # The slot is held per attempt, never during a backoff sleep
+                wait_start = time.perf_counter()
+                with self._slot():
+                    self._wait_for_host(host)
+                    record_stage('download_wait', time.perf_counter() - wait_start)
+                    try:
+                        with timer.measure() if timer is not None else nullcontext():
+                            with yt_dlp.YoutubeDL(opts) as ydl:
+                                result = action(ydl)
+                        break
+                    except yt_dlp.utils.DownloadError as e:
+                        kind = classify_error(str(e))
+                        if kind is None or attempt >= self.max_retries:
+                            raise
+
+                delay = self.backoff_seconds * (2 ** attempt) * random.uniform(0.8, 1.2)
+                attempt += 1
+                DOWNLOAD_RETRIES.inc(reason=kind)
+                print(f"⏳ Download {kind} ({host}), retry {attempt}/{self.max_retries} in {delay:.0f}s")
+                if kind == 'throttled':
+                    self._cooldown(host, delay)
+                time.sleep(delay)
+        finally:
+            self.prune_partials(keep=key)
+
+        shutil.rmtree(opts['paths']['temp'], ignore_errors=True)
+        return result
+
+    def prune_partials(self, keep=None):
+        """
+        Delete abandoned partial downloads: any older than the max age, then
+        the oldest idle ones until the partial dir fits its byte budget
+        Args:
+            keep: Key whose partial files must stay (the download just attempted)
+        Returns:
+            Number of bytes freed
+        """
+        entries = []
+        with os.scandir(self.partial_dir) as it:
+            for entry in it:
+                if entry.name == keep or not entry.is_dir():
+                    continue
+                size, mtime = 0, 0.0
+                for root, _, files in os.walk(entry.path):
+                    for name in files:
+                        try:
+                            st = os.stat(os.path.join(root, name))
+                        except FileNotFoundError:
+                            continue
+                        size += st.st_size
+                        mtime = max(mtime, st.st_mtime)
+                entries.append((entry.path, size, mtime or entry.stat().st_mtime))
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for path, size, mtime in sorted(entries, key=lambda e: e[2]):
+            expired = now - mtime > self.partial_max_age
+            over_budget = total > self.partial_max_bytes and now - mtime > PARTIAL_ACTIVE_SECONDS
+            if not (expired or over_budget):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            freed += size
+
+        if freed:
+            print(f"🧹 Pruned {freed / 1024 ** 2:.1f} MB of partial downloads ({total / 1024 ** 2:.1f} MB kept)")
+        return freed
+
+
+# Global instance
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_download_manager():
+    """Get or create the global download manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DownloadManager()
+        return _manager
@@ -4,6 +4,7 @@ Format Notes for Anki and Google Docs Export
 
 import os
 import csv
+from metrics import timed
 
 
 class NotesFormatter:
@@ -13,6 +14,7 @@ class NotesFormatter:
         self.flashcards = []
         self.google_creds = None
     
+    @timed('parse')
     def parse_flashcards(self, notes_text):
         """
         Parse Q&A format notes into flashcard list
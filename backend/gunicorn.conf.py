@@ -0,0 +1,52 @@
+"""
+Gunicorn configuration for the FastScribe API
+Run from backend/: gunicorn -c gunicorn.conf.py app:app
+
+- The app (and the Whisper weights) are loaded once in the master and
+  shared with forked workers copy-on-write
+- Each worker warms up in the background; /api/ready returns 503 until done
+
+Environment:
+    PORT                   Port to bind (default 5000)
+    GUNICORN_WORKERS       Worker processes (default 2)
+    GUNICORN_WORKER_CLASS  gevent (default), gthread or sync
+    GUNICORN_THREADS       Threads per worker for gthread (default 4)
+    WORKER_CONNECTIONS     Concurrent requests per gevent worker (default 500)
+    GUNICORN_TIMEOUT       Worker timeout in seconds (default 300)
+    GUNICORN_PRELOAD       Set to 0 to load the app in each worker instead
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', 500))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+accesslog = '-'
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded so sockets and locks created at
+    # import time are cooperative in the workers
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def on_starting(server):
+    """Master, after the app is preloaded and before workers fork"""
+    import warmup
+    warmup.preload_imports()
+    warmup.preload_models()
+
+
+def post_worker_init(worker):
+    """Each worker: warm up and pick up abandoned jobs in the background"""
+    import warmup
+    warmup.start_warmup()
+
+    from app import resume_interrupted_jobs
+    resume_interrupted_jobs()
@@ -0,0 +1,426 @@
+"""
+Job Store
+Persists pipeline jobs and the output of each completed stage in SQLite
+(WAL mode). A job interrupted by a crash, deploy or instance recycle resumes
+from its last completed stage, either when the client retries (job ids are
+derived from the request, so a retry maps to the same job) or when a worker
+starts and picks up jobs whose owner stopped sending heartbeats.
+
+Environment:
+    JOB_STORE_PATH     SQLite file (default ~/.cache/fastscribe/jobs.db);
+                       on Render put it on a persistent disk
+    JOB_RESULT_TTL     Seconds a finished job's result is served again (default 86400)
+    JOB_STALE_SECONDS  Running jobs without a heartbeat for this long are
+                       considered abandoned (default 120)
+    JOB_WAIT_SECONDS   Longest a request waits on the same job running in
+                       another worker before giving up with 503 (default 900)
+
+SQLite calls (and their lock waits) run on a native thread pool via
+concurrency.run_blocking, so a busy database never stalls a gevent worker.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from admission import Overloaded
+from concurrency import run_blocking
+from metrics import record_cache
+
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'fastscribe', 'jobs.db')
+
+# Finished and failed jobs are deleted after this long
+RETENTION_SECONDS = 7 * 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    heartbeat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, heartbeat);
+"""
+
+
+def _blocking(method):
+    """Run a JobStore method through run_blocking"""
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        return run_blocking(method, *args, **kwargs)
+    return wrapper
+
+
+def job_id_for(pipeline, params):
+    """Deterministic job id: the same request always maps to the same job"""
+    key = json.dumps([pipeline, params], sort_keys=True)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+class Job:
+    """Handle for one running job; stages are skipped if already checkpointed"""
+
+    def __init__(self, store, job_id, checkpoints, result=None):
+        self.store = store
+        self.job_id = job_id
+        self.checkpoints = checkpoints
+        self.result = result
+        self.held = ExitStack()
+
+    def stage(self, name, fn, *args, validate=None, **kwargs):
+        """
+        Run a pipeline stage once
+        Args:
+            name: Stage name (e.g. 'transcript')
+            fn: Callable producing the stage output (must be JSON serializable)
+            validate: Optional check that a stored output is still usable
+                      (e.g. os.path.exists for a cached audio path)
+        Returns:
+            The checkpointed output, or fn's output
+        """
+        if name in self.checkpoints and (validate is None or validate(self.checkpoints[name])):
+            record_cache('job_checkpoint', True)
+            print(f"⏭️  Job {self.job_id}: reusing '{name}' checkpoint")
+            return self.checkpoints[name]
+
+        record_cache('job_checkpoint', False)
+        output = fn(*args, **kwargs)
+        self.store.checkpoint(self.job_id, name, output)
+        self.checkpoints[name] = output
+        return output
+
+    def finish(self, result):
+        self.result = result
+        self.store.finish(self.job_id, result)
+        return result
+
+    def fail(self, error):
+        """Mark failed without raising (e.g. when answering with a fallback)"""
+        self.store.fail(self.job_id, error)
+
+    def hold(self, context):
+        """Enter a context manager (e.g. an admission slot) until the job is closed"""
+        return self.held.enter_context(context)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.held.close()
+        if exc is not None:
+            self.store.fail(self.job_id, exc)
+        else:
+            self.store.release(self.job_id)
+        return False
+
+
+class JobStore:
+    """SQLite-backed jobs and stage checkpoints, shared by all workers"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('JOB_STORE_PATH', DEFAULT_PATH)
+        self.result_ttl = float(os.getenv('JOB_RESULT_TTL', 86400))
+        self.stale_seconds = float(os.getenv('JOB_STALE_SECONDS', 120))
+        self.wait_seconds = float(os.getenv('JOB_WAIT_SECONDS', 900))
+        self.local = threading.local()
+        self.active = set()
+        self.active_lock = threading.Lock()
+        self.heartbeat_pid = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE job_id IN "
+                         "(SELECT job_id FROM jobs WHERE status != 'running' AND updated_at < ?)",
+                         (time.time() - RETENTION_SECONDS,))
+            conn.execute("DELETE FROM jobs WHERE status != 'running' AND updated_at < ?",
+                         (time.time() - RETENTION_SECONDS,))
+            conn.execute('DELETE FROM artifacts WHERE created_at < ?', (time.time() - RETENTION_SECONDS,))
+
+    @property
+    def owner(self):
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _conn(self):
+        """One connection per thread (and per process - never reuse one across fork)"""
+        pid, conn = getattr(self.local, 'conn', (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = (os.getpid(), conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def open(self, pipeline, params):
+        """
+        Start or resume the job for a request
+        Args:
+            pipeline: Pipeline name (e.g. 'process-complete')
+            params: JSON-serializable request parameters that identify the job
+        Returns:
+            Job - job.result is set if a finished result can be reused
+        Raises:
+            Overloaded: 503 if another worker still holds the job after
+                        JOB_WAIT_SECONDS
+        """
+        job_id = job_id_for(pipeline, params)
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+            job = self._try_open(job_id, pipeline, params)
+            if job is not None:
+                break
+            # Another worker is running this job right now: wait for its result.
+            # If that worker dies its heartbeat goes stale and the next attempt
+            # takes the job over; if it is alive but stuck, stop waiting
+            if time.monotonic() >= deadline:
+                print(f"⚠ Job {job_id} ({pipeline}) still running elsewhere after {self.wait_seconds:.0f}s")
+                raise Overloaded(f"This {pipeline} job is still running, try again later", 503,
+                                 max(1, int(self.stale_seconds)), 'job_busy')
+            time.sleep(1)
+
+        if job.result is not None:
+            record_cache('job_result', True)
+            return job
+
+        record_cache('job_result', False)
+        if job.checkpoints:
+            print(f"🔁 Resuming job {job_id} ({pipeline}) after: {', '.join(job.checkpoints)}")
+        self._track(job_id)
+        return job
+
+    @_blocking
+    def _try_open(self, job_id, pipeline, params):
+        """One attempt to take a job; None while another live worker owns it"""
+        now = time.time()
+        marked = False
+        try:
+            with self._transaction() as conn:
+                row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+
+                if row and row['status'] == 'done' and now - row['updated_at'] < self.result_ttl:
+                    return Job(self, job_id, {}, json.loads(row['result']))
+
+                if row and row['status'] == 'running' and self._owned_elsewhere(row, now):
+                    return None
+
+                if row and row['status'] == 'done':
+                    # Result expired: start over
+                    conn.execute('DELETE FROM checkpoints WHERE job_id = ?', (job_id,))
+                elif row and row['status'] == 'running' and row['owner'] != self.owner:
+                    print(f"🔁 Taking over job {job_id}: no heartbeat from {row['owner']} "
+                          f"for {now - row['heartbeat']:.0f}s")
+                conn.execute(
+                    "INSERT INTO jobs (job_id, pipeline, params, status, owner, attempts, created_at, updated_at, heartbeat) "
+                    "VALUES (?, ?, ?, 'running', ?, 1, ?, ?, ?) "
+                    "ON CONFLICT(job_id) DO UPDATE SET status = 'running', error = NULL, result = NULL, "
+                    "owner = excluded.owner, attempts = attempts + 1, updated_at = excluded.updated_at, "
+                    "heartbeat = excluded.heartbeat",
+                    (job_id, pipeline, json.dumps(params), self.owner, now, now, now)
+                )
+                # Marked active before the row commits, so no other thread of this
+                # process can see the job unowned and run it a second time
+                with self.active_lock:
+                    self.active.add(job_id)
+                marked = True
+                checkpoints = self._load_checkpoints(conn, job_id)
+        except BaseException:
+            if marked:
+                self.release(job_id)
+            raise
+        return Job(self, job_id, checkpoints)
+
+    def _owned_elsewhere(self, row, now):
+        """True if another live thread or process is running this job"""
+        if now - row['heartbeat'] >= self.stale_seconds:
+            return False
+        if row['owner'] == self.owner:
+            with self.active_lock:
+                return row['job_id'] in self.active
+        return True
+
+    @_blocking
+    def checkpoints(self, job_id):
+        """{stage: output} for a job's completed stages"""
+        return self._load_checkpoints(self._conn(), job_id)
+
+    @staticmethod
+    def _load_checkpoints(conn, job_id):
+        rows = conn.execute(
+            'SELECT stage, output FROM checkpoints WHERE job_id = ? ORDER BY created_at', (job_id,)
+        ).fetchall()
+        return {row['stage']: json.loads(row['output']) for row in rows}
+
+    @_blocking
+    def checkpoint(self, job_id, stage, output):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO checkpoints (job_id, stage, output, created_at) VALUES (?, ?, ?, ?)',
+                         (job_id, stage, json.dumps(output), now))
+            conn.execute('UPDATE jobs SET updated_at = ?, heartbeat = ? WHERE job_id = ?', (now, now, job_id))
+
+    def finish(self, job_id, result):
+        self._set_status(job_id, 'done', result=json.dumps(result))
+        self.release(job_id)
+
+    def fail(self, job_id, error):
+        """Mark a job failed; its checkpoints are kept so a retry resumes"""
+        self._set_status(job_id, 'failed', error=str(error))
+        self.release(job_id)
+
+    @_blocking
+    def _set_status(self, job_id, status, result=None, error=None):
+        with self._transaction() as conn:
+            conn.execute('UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ?',
+                         (status, result, error, time.time(), job_id))
+
+    def release(self, job_id):
+        with self.active_lock:
+            self.active.discard(job_id)
+
+    @_blocking
+    def get(self, job_id):
+        """Job status and completed stages (None if unknown)"""
+        row = self._conn().execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        stages = [r['stage'] for r in self._conn().execute(
+            'SELECT stage FROM checkpoints WHERE job_id = ? ORDER BY created_at', (job_id,))]
+        return {
+            'job_id': job_id,
+            'pipeline': row['pipeline'],
+            'params': json.loads(row['params']),
+            'status': row['status'],
+            'stages': stages,
+            'attempts': row['attempts'],
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'result': json.loads(row['result']) if row['result'] else None,
+        }
+
+    @_blocking
+    def get_artifact(self, key):
+        """Content-addressed intermediate shared between jobs (e.g. a section digest), or None"""
+        row = self._conn().execute('SELECT value FROM artifacts WHERE key = ?', (key,)).fetchone()
+        return json.loads(row['value']) if row else None
+
+    @_blocking
+    def put_artifact(self, key, value):
+        with self._transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO artifacts (key, value, created_at) VALUES (?, ?, ?)',
+                         (key, json.dumps(value), time.time()))
+
+    def _track(self, job_id):
+        """Keep a heartbeat going for jobs this process is running (on the request's thread)"""
+        with self.active_lock:
+            self.active.add(job_id)
+            if self.heartbeat_pid != os.getpid():
+                self.heartbeat_pid = os.getpid()
+                threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True).start()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.stale_seconds / 4)
+            with self.active_lock:
+                job_ids = list(self.active)
+            if not job_ids:
+                continue
+            try:
+                self._beat(job_ids)
+            except sqlite3.Error as e:
+                print(f"⚠ Job heartbeat failed: {e}")
+
+    @_blocking
+    def _beat(self, job_ids):
+        with self._transaction() as conn:
+            conn.executemany('UPDATE jobs SET heartbeat = ? WHERE job_id = ? AND owner = ?',
+                             [(time.time(), job_id, self.owner) for job_id in job_ids])
+
+    @_blocking
+    def claim_stale(self):
+        """
+        Take over running jobs whose owner stopped sending heartbeats
+        Returns:
+            [(pipeline, params), ...] for the jobs this process now owns
+        """
+        now = time.time()
+        claimed = []
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT job_id, pipeline, params FROM jobs WHERE status = 'running' AND heartbeat < ?",
+                                (now - self.stale_seconds,)).fetchall()
+            for row in rows:
+                conn.execute('UPDATE jobs SET owner = ?, heartbeat = ? WHERE job_id = ?', (self.owner, now, row['job_id']))
+                claimed.append((row['pipeline'], json.loads(row['params'])))
+        return claimed
+
+    def resume_stale(self, resumers):
+        """
+        Re-run abandoned jobs in the background
+        Args:
+            resumers: {pipeline: callable(params)} that run a pipeline again
+        """
+        for pipeline, params in self.claim_stale():
+            resume = resumers.get(pipeline)
+            if resume is None:
+                continue
+            print(f"🔁 Picking up abandoned {pipeline} job for {params}")
+            threading.Thread(target=self._resume, args=(resume, params), daemon=True).start()
+
+    def _resume(self, resume, params):
+        try:
+            resume(params)
+        except Exception as e:
+            print(f"⚠ Resumed job failed: {e}")
+
+
+# Global instance
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """Get or create the global job store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
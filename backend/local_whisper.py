@@ -1,16 +1,19 @@
 """
 Local Whisper Transcriber using OpenAI's open-source Whisper
 No API keys required - runs entirely locally
+Backend is chosen with WHISPER_ENGINE ('whisper' or 'faster-whisper')
 """
 
-import whisper
 import os
+from whisper_engines import get_engine
+from metrics import stage
+from segments import SegmentStore
 
 
 class LocalWhisperTranscriber:
     """Transcribe audio using local Whisper model"""
     
-    def __init__(self, model_size='base'):
+    def __init__(self, model_size='base', engine=None):
         """
         Initialize local Whisper model
         Args:
@@ -20,11 +23,12 @@ class LocalWhisperTranscriber:
                        small: better quality (244 MB)
                        medium: high quality (769 MB)
                        large: best quality (1550 MB) - may be too large for Render
+            engine: 'whisper' or 'faster-whisper' (defaults to WHISPER_ENGINE)
         """
         self.model_size = model_size
-        print(f"Loading Whisper {model_size} model...")
-        self.model = whisper.load_model(model_size)
-        print(f"✓ Whisper model loaded")
+        self.engine = get_engine(model_size, engine)
+        self.result = None
+        self.segments = None
     
     def transcribe(self, audio_file, language=None):
         """
@@ -34,7 +38,7 @@ class LocalWhisperTranscriber:
             language: Optional language code (e.g., 'en', 'es', 'fr')
                      If None, auto-detects language
         Returns:
-            Transcript text
+            Transcript text (timestamped segments are kept in self.segments)
         """
         if not os.path.exists(audio_file):
             raise FileNotFoundError(f"Audio file not found: {audio_file}")
@@ -50,11 +54,14 @@ class LocalWhisperTranscriber:
         if language:
             options['language'] = language
         
-        # Transcribe
-        result = self.model.transcribe(audio_file, **options)
+        # Transcribe (result also holds 'language' and 'segments')
+        with stage('transcription'):
+            result = self.engine.transcribe(audio_file, **options)
+        self.result = result
         
         transcript = result['text']
-        detected_language = result.get('language', 'unknown')
+        detected_language = result.get('language') or 'unknown'
+        self.segments = SegmentStore.from_segments(result.get('segments'), result.get('language'))
         
         print(f"✓ Transcription complete ({detected_language})")
         
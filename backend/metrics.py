@@ -0,0 +1,219 @@
+"""
+Pipeline Metrics
+Stage timing histograms and counters exported in Prometheus text format,
+plus per-request stage timings for the Server-Timing response header
+Every stage is also recorded as a trace span
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import tracing
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _label_str(labelnames, values):
+    """Render {name="value",...} for a label tuple"""
+    if not labelnames:
+        return ''
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _label_str(self.labelnames + ('le',), key + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _label_str(self.labelnames + ('le',), key + ('+Inf',))
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                labels = _label_str(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series[-2]}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'fastscribe_stage_seconds', 'Time spent in each pipeline stage', ['stage'])
+REQUEST_SECONDS = Histogram(
+    'fastscribe_request_seconds', 'HTTP request latency', ['endpoint', 'status'])
+CACHE_REQUESTS = Counter(
+    'fastscribe_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+API_KEY_USES = Counter(
+    'fastscribe_api_key_uses_total', 'OpenAI API key uses by rotation index', ['key_index'])
+ERRORS = Counter(
+    'fastscribe_errors_total', 'Errors by endpoint and exception type', ['endpoint', 'type'])
+COALESCED_REQUESTS = Counter(
+    'fastscribe_coalesced_requests_total', 'Requests that joined an identical in-flight job', ['endpoint'])
+DOWNLOAD_RETRIES = Counter(
+    'fastscribe_download_retries_total', 'yt-dlp download retries by cause', ['reason'])
+EXTRACT_ATTEMPTS = Counter(
+    'fastscribe_extract_attempts_total', 'yt-dlp extractions by player client and result', ['client', 'result'])
+PROMPT_TOKENS = Counter(
+    'fastscribe_prompt_tokens_total', 'Transcript tokens before (original) and after (sent) compaction', ['consumer', 'kind'])
+
+LLM_CALLS = Counter(
+    'fastscribe_llm_calls_total', 'Notes model calls by model and result', ['model', 'result'])
+ADMISSION_WAIT_SECONDS = Histogram(
+    'fastscribe_admission_wait_seconds', 'Time requests waited for a pipeline slot', ['endpoint'])
+ADMISSION_REJECTED = Counter(
+    'fastscribe_admission_rejected_total', 'Requests shed by admission control', ['endpoint', 'reason'])
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, CACHE_REQUESTS, API_KEY_USES, ERRORS, COALESCED_REQUESTS,
+            DOWNLOAD_RETRIES, EXTRACT_ATTEMPTS, PROMPT_TOKENS, LLM_CALLS, ADMISSION_WAIT_SECONDS, ADMISSION_REJECTED]
+
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def record_stage(name, seconds):
+    """Record a stage duration (also kept for Server-Timing inside a Flask request)"""
+    STAGE_SECONDS.observe(seconds, stage=name)
+
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return
+    if has_request_context():
+        timings = g.setdefault('stage_timings', [])
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        with tracing.span(name):
+            yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator version of stage()"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache, hit):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def server_timing_header(timings):
+    """Format [(stage, seconds), ...] as a Server-Timing header value"""
+    totals = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+class DownloadTimer:
+    """
+    yt-dlp hooks that split one ydl.download() call into the
+    'download' and 'audio_conversion' (FFmpeg post-processing) stages
+    """
+
+    def __init__(self):
+        self.start = None
+        self.download_done = None
+        self.pp_started = None
+        self.conversion_seconds = 0.0
+
+    def progress_hook(self, status):
+        if status.get('status') == 'finished' and self.download_done is None:
+            self.download_done = time.perf_counter()
+
+    def postprocessor_hook(self, status):
+        if status.get('status') == 'started':
+            self.pp_started = time.perf_counter()
+        elif status.get('status') == 'finished' and self.pp_started is not None:
+            self.conversion_seconds += time.perf_counter() - self.pp_started
+            self.pp_started = None
+
+    def install(self, ydl_opts):
+        """Add the hooks to a yt-dlp options dict"""
+        ydl_opts.setdefault('progress_hooks', []).append(self.progress_hook)
+        ydl_opts.setdefault('postprocessor_hooks', []).append(self.postprocessor_hook)
+        return ydl_opts
+
+    @contextmanager
+    def measure(self):
+        """Wrap the ydl.download()/extract_info(download=True) call"""
+        self.start = time.perf_counter()
+        with tracing.span('download') as download_span:
+            try:
+                yield
+            finally:
+                end = time.perf_counter()
+                record_stage('download', (self.download_done or end) - self.start)
+                if self.conversion_seconds:
+                    record_stage('audio_conversion', self.conversion_seconds)
+                    if download_span is not None:
+                        download_span.set_attribute('audio_conversion_seconds', round(self.conversion_seconds, 3))
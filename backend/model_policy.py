@@ -0,0 +1,127 @@
+"""
+Whisper Model Size Policy
+Picks a Whisper model size per job from video duration, language,
+queue depth and a target completion time
+"""
+
+import os
+import threading
+
+
+# Ordered smallest to largest
+MODEL_TIERS = ['tiny', 'base', 'small', 'medium', 'large']
+
+# Seconds of CPU processing per second of audio (see home-server/OPTIMIZATION.md)
+DEFAULT_SPEED_FACTORS = {
+    'tiny': 0.1,
+    'base': 0.2,
+    'small': 0.5,
+    'medium': 1.2,
+    'large': 2.5,
+}
+
+# Sizes that have an English-only ('.en') variant
+ENGLISH_ONLY_TIERS = {'tiny', 'base', 'small', 'medium'}
+
+
+class ModelSizePolicy:
+    """Choose the largest Whisper model that still meets the completion-time target"""
+
+    def __init__(self, target_seconds=None, tiers=None, speed_factors=None, default_size=None):
+        """
+        Initialize policy
+        Args:
+            target_seconds: Target completion time for a job (WHISPER_TARGET_SECONDS, default 600)
+            tiers: Allowed model sizes (WHISPER_MODEL_TIERS, default 'tiny,base,small')
+            speed_factors: Dict of size -> processing seconds per audio second
+                          (WHISPER_SPEED_FACTORS, e.g. 'tiny=0.1,base=0.2')
+            default_size: Size used when the duration is unknown (WHISPER_MODEL, default 'base')
+        """
+        self.target_seconds = float(target_seconds or os.getenv('WHISPER_TARGET_SECONDS', 600))
+
+        if tiers is None:
+            tiers_str = os.getenv('WHISPER_MODEL_TIERS', 'tiny,base,small')
+            tiers = [t.strip() for t in tiers_str.split(',') if t.strip()]
+        self.tiers = [t for t in MODEL_TIERS if t in tiers]
+        if not self.tiers:
+            raise ValueError(f"No valid Whisper model tiers in {tiers}. Choose from {MODEL_TIERS}")
+
+        self.speed_factors = dict(DEFAULT_SPEED_FACTORS)
+        if speed_factors is None:
+            factors_str = os.getenv('WHISPER_SPEED_FACTORS', '')
+            speed_factors = {}
+            for item in factors_str.split(','):
+                if '=' in item:
+                    size, factor = item.split('=', 1)
+                    speed_factors[size.strip()] = float(factor)
+        self.speed_factors.update(speed_factors)
+
+        self.default_size = default_size or os.getenv('WHISPER_MODEL', 'base')
+
+    def estimate_seconds(self, model_size, duration, queue_depth=0):
+        """
+        Estimate completion time for a job
+        Jobs already in the queue share the same CPU, so each one ahead
+        of this job stretches its processing time
+        """
+        base_size = model_size.split('.')[0]
+        factor = self.speed_factors.get(base_size, DEFAULT_SPEED_FACTORS['large'])
+        return duration * factor * (1 + max(queue_depth, 0))
+
+    def select(self, duration=None, language=None, queue_depth=0, job_id=None):
+        """
+        Pick a model size for a job
+        Args:
+            duration: Audio duration in seconds (None if unknown)
+            language: Requested language code or name (None for auto-detect)
+            queue_depth: Number of other transcription jobs currently running
+            job_id: Optional identifier used in the log line
+        Returns:
+            Whisper model name (e.g. 'base', 'tiny.en')
+        """
+        if duration:
+            size = self.tiers[0]
+            for tier in self.tiers:
+                if self.estimate_seconds(tier, duration, queue_depth) <= self.target_seconds:
+                    size = tier
+            estimate = self.estimate_seconds(size, duration, queue_depth)
+        else:
+            size = self.default_size
+            estimate = None
+
+        if _is_english(language) and size in ENGLISH_ONLY_TIERS:
+            size = f"{size}.en"
+
+        estimate_msg = f"{estimate:.0f}s" if estimate is not None else "unknown"
+        duration_msg = f"{duration:.0f}s" if duration else "unknown"
+        print(f"🎚️  Whisper tier for {job_id or 'job'}: {size} "
+              f"(duration={duration_msg}, queue={queue_depth}, "
+              f"est={estimate_msg}, target={self.target_seconds:.0f}s)")
+
+        return size
+
+    def is_allowed(self, model_name):
+        """Check a client-requested model name against the configured tiers"""
+        size, dot, variant = (model_name or '').partition('.')
+        if dot and (variant != 'en' or size not in ENGLISH_ONLY_TIERS):
+            return False
+        return size in self.tiers or size == self.default_size
+
+
+def _is_english(language):
+    """Check if a language code or name means English"""
+    return bool(language) and language.strip().lower() in ('en', 'english')
+
+
+# Global instance
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_model_policy():
+    """Get or create global model size policy"""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = ModelSizePolicy()
+        return _policy
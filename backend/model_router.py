@@ -0,0 +1,230 @@
+"""
+Notes Model Router
+Picks the GPT model and output token budget for each notes request from
+the transcript size, the note style and each model's measured speed.
+Summaries, bullet points and short transcripts go to the fast model; the
+rest go to the quality model unless it is expected to miss the latency
+target. A model that errors or times out falls back to the next one, and
+repeated failures bench a model for a while. Each choice is logged.
+
+Environment:
+    NOTES_FAST_MODELS       Fast models, in order (default gpt-4o-mini)
+    NOTES_QUALITY_MODELS    Quality models, in order (default gpt-4)
+    NOTES_LATENCY_TARGET    Target seconds per notes call (default 120)
+    NOTES_SHORT_TOKENS      Transcripts up to this many tokens use the fast
+                            model (default 1500)
+"""
+
+import os
+import threading
+import time
+
+from metrics import LLM_CALLS, stage
+
+
+# Context window (tokens) and prior seconds per output token for known models
+MODEL_SPECS = {
+    'gpt-4o-mini': (128000, 0.012),
+    'gpt-4o': (128000, 0.02),
+    'gpt-4-turbo': (128000, 0.03),
+    'gpt-4': (8192, 0.035),
+    'gpt-3.5-turbo': (16385, 0.012),
+}
+DEFAULT_SPEC = (8192, 0.035)
+
+# Styles that need a short answer and go to the fast model
+FAST_STYLES = {'summary', 'bullet_points', 'digest'}
+
+# Output budget per style: (fraction of transcript tokens, minimum, maximum)
+OUTPUT_BUDGETS = {
+    'digest': (0.25, 300, 600),
+    'summary': (0.15, 300, 800),
+    'bullet_points': (0.3, 500, 1500),
+    'flashcards': (0.5, 800, 2500),
+    'detailed': (0.6, 800, 3000),
+}
+
+# Fixed per-call overhead (queueing, time to first token) in the estimate
+OVERHEAD_SECONDS = 2.0
+EWMA_ALPHA = 0.3
+
+# Consecutive failures before a model is benched, and for how long
+FAILURE_LIMIT = 2
+BENCH_SECONDS = 120
+
+
+def _models_from_env(name, default):
+    return [m.strip() for m in os.getenv(name, default).split(',') if m.strip()]
+
+
+class ModelStats:
+    """Measured speed and recent failures of one model"""
+
+    def __init__(self, model):
+        self.context, self.seconds_per_token = MODEL_SPECS.get(model, DEFAULT_SPEC)
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.benched_until = 0.0
+
+    def record(self, ok, seconds, output_tokens=None):
+        if ok:
+            self.calls += 1
+            self.consecutive_failures = 0
+            if output_tokens:
+                per_token = max(seconds - OVERHEAD_SECONDS, 0.1) / output_tokens
+                self.seconds_per_token = EWMA_ALPHA * per_token + (1 - EWMA_ALPHA) * self.seconds_per_token
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= FAILURE_LIMIT:
+                self.benched_until = time.time() + BENCH_SECONDS
+
+    def estimate_seconds(self, output_tokens):
+        return OVERHEAD_SECONDS + output_tokens * self.seconds_per_token
+
+    def benched(self):
+        return time.time() < self.benched_until
+
+
+class NotesModelRouter:
+    """Route notes generation across fast and quality models"""
+
+    def __init__(self, fast_models=None, quality_models=None, latency_target=None, short_tokens=None):
+        """
+        Args:
+            fast_models: Fast model names (NOTES_FAST_MODELS)
+            quality_models: Quality model names (NOTES_QUALITY_MODELS)
+            latency_target: Target seconds per call (NOTES_LATENCY_TARGET)
+            short_tokens: Transcript tokens below which the fast model is used (NOTES_SHORT_TOKENS)
+        """
+        self.fast_models = fast_models or _models_from_env('NOTES_FAST_MODELS', 'gpt-4o-mini')
+        self.quality_models = quality_models or _models_from_env('NOTES_QUALITY_MODELS', 'gpt-4')
+        self.latency_target = float(latency_target or os.getenv('NOTES_LATENCY_TARGET', 120))
+        self.short_tokens = int(short_tokens or os.getenv('NOTES_SHORT_TOKENS', 1500))
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _stats(self, model):
+        if model not in self.stats:
+            self.stats[model] = ModelStats(model)
+        return self.stats[model]
+
+    def output_budget(self, style, transcript_tokens):
+        """max_tokens for a style, scaled with the transcript"""
+        fraction, low, high = OUTPUT_BUDGETS.get(style, OUTPUT_BUDGETS['detailed'])
+        return int(min(high, max(low, transcript_tokens * fraction)))
+
+    def plan(self, prompt_tokens, style, transcript_tokens=None, job_id=None):
+        """
+        Order the models to try for a request
+        Args:
+            prompt_tokens: Tokens in the full prompt
+            style: Note style
+            transcript_tokens: Tokens in the transcript part (default prompt_tokens)
+            job_id: Optional identifier used in the log line
+        Returns:
+            [(model, max_tokens, timeout_seconds), ...] - first entry is the pick
+        """
+        transcript_tokens = prompt_tokens if transcript_tokens is None else transcript_tokens
+        max_tokens = self.output_budget(style, transcript_tokens)
+        fast = style in FAST_STYLES or transcript_tokens <= self.short_tokens
+        preferred = self.fast_models + self.quality_models if fast else self.quality_models + self.fast_models
+
+        with self.lock:
+            candidates = []
+            for model in dict.fromkeys(preferred):
+                stats = self._stats(model)
+                budget = min(max_tokens, stats.context - prompt_tokens - 50)
+                if budget < OUTPUT_BUDGETS['summary'][1] or stats.benched():
+                    continue
+                candidates.append((model, budget, stats.estimate_seconds(budget)))
+
+            if not candidates:
+                # Everything benched or too small: try the preferred order anyway
+                candidates = [(m, max_tokens, self._stats(m).estimate_seconds(max_tokens))
+                              for m in dict.fromkeys(preferred)]
+
+        # First model (in preference order) expected to meet the target, else the fastest
+        on_target = [c for c in candidates if c[2] <= self.latency_target]
+        pick = on_target[0] if on_target else min(candidates, key=lambda c: c[2])
+        ordered = [pick] + [c for c in candidates if c is not pick]
+
+        model, budget, estimate = pick
+        print(f"🧭 Notes model for {job_id or 'job'}: {model} "
+              f"(style={style}, transcript={transcript_tokens} tok, max_tokens={budget}, "
+              f"est={estimate:.0f}s, target={self.latency_target:.0f}s)")
+
+        # Slower than twice the target counts as a failure and falls back
+        timeout = max(2 * self.latency_target, 1.5 * estimate)
+        return [(m, b, timeout) for m, b, _ in ordered]
+
+    def record(self, model, ok, seconds, output_tokens=None):
+        with self.lock:
+            self._stats(model).record(ok, seconds, output_tokens)
+        LLM_CALLS.inc(model=model, result='ok' if ok else 'error')
+
+    def complete(self, client, messages, prompt_tokens, style, transcript_tokens=None,
+                 temperature=0.7, job_id=None):
+        """
+        Run a chat completion on the routed model, falling back on errors
+        Args:
+            client: OpenAI client
+            messages: Chat messages
+            prompt_tokens: Tokens in the full prompt
+            style: Note style
+            transcript_tokens: Tokens in the transcript part of the prompt
+        Returns:
+            (content, model)
+        """
+        last_error = None
+        for model, max_tokens, timeout in self.plan(prompt_tokens, style, transcript_tokens, job_id):
+            start = time.perf_counter()
+            try:
+                with stage('llm'):
+                    response = client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=timeout
+                    )
+            except Exception as e:
+                self.record(model, False, time.perf_counter() - start)
+                print(f"⚠ Notes model {model} failed ({type(e).__name__}), falling back")
+                last_error = e
+                continue
+
+            usage = getattr(response, 'usage', None)
+            self.record(model, True, time.perf_counter() - start,
+                        getattr(usage, 'completion_tokens', None))
+            return response.choices[0].message.content, model
+
+        raise Exception(f"All notes models failed: {last_error}")
+
+    def snapshot(self):
+        """Per-model speed and failure counts for /api/health"""
+        with self.lock:
+            return {
+                model: {
+                    'calls': s.calls,
+                    'failures': s.failures,
+                    'seconds_per_token': round(s.seconds_per_token, 4),
+                    'benched': s.benched(),
+                }
+                for model, s in self.stats.items()
+            }
+
+
+# Global instance
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_model_router():
+    """Get or create the global notes model router"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = NotesModelRouter()
+        return _router
@@ -0,0 +1,137 @@
+"""
+Section Digests
+Summarizes a transcript once, section by section, so several note styles
+can be derived from the short digests instead of re-sending the whole
+transcript for every style. Digests are cached by section content in the
+job store, so asking for another style of the same video later skips the
+digest calls entirely.
+
+Environment:
+    DIGEST_SECTION_TOKENS  Transcript tokens per section (default 1500)
+    DIGEST_PARALLELISM     Sections digested concurrently (default 4)
+"""
+
+import contextvars
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from job_store import get_job_store
+from metrics import record_cache, stage
+from model_router import OUTPUT_BUDGETS, get_model_router
+from transcript_compactor import count_tokens, dedupe_sentences, split_sentences, strip_disfluencies
+
+
+SECTION_TOKENS = int(os.getenv('DIGEST_SECTION_TOKENS', 1500))
+PARALLELISM = int(os.getenv('DIGEST_PARALLELISM', 4))
+
+# Bump when the digest prompt changes so cached digests are not reused
+DIGEST_VERSION = 1
+
+DIGEST_PROMPT = """
+Summarize this section of a video transcript for a student.
+Keep every key concept, definition, example, number and name; drop filler.
+Write compact bullet points.
+"""
+
+
+def split_sections(transcript_text, section_tokens=None):
+    """
+    Split a cleaned transcript into consecutive sections of about section_tokens
+    Returns:
+        List of section texts (one section for short transcripts)
+    """
+    section_tokens = section_tokens or SECTION_TOKENS
+    sections = []
+    current = []
+    used = 0
+    for sentence in dedupe_sentences(split_sentences(strip_disfluencies(transcript_text))):
+        tokens = count_tokens(' ' + sentence)
+        if current and used + tokens > section_tokens:
+            sections.append(' '.join(current))
+            current, used = [], 0
+        current.append(sentence)
+        used += tokens
+    if current:
+        sections.append(' '.join(current))
+    return sections
+
+
+def _digest_key(section):
+    return 'digest:' + hashlib.sha1(f"{DIGEST_VERSION}:{section}".encode('utf-8')).hexdigest()
+
+
+def cached_digests(transcript_text):
+    """Digests of every section if all are cached, else None (no LLM calls)"""
+    sections = split_sections(transcript_text)
+    if len(sections) < 2:
+        return None
+    store = get_job_store()
+    digests = [store.get_artifact(_digest_key(section)) for section in sections]
+    return digests if all(d is not None for d in digests) else None
+
+
+def _digest_section(client, section, index, total):
+    key = _digest_key(section)
+    store = get_job_store()
+    digest = store.get_artifact(key)
+    record_cache('section_digest', digest is not None)
+    if digest is not None:
+        return digest
+
+    system = "You are a helpful assistant that condenses lecture transcripts without losing facts."
+    user = f"{DIGEST_PROMPT}\nSection {index + 1} of {total}:\n{section}"
+    digest, _ = get_model_router().complete(
+        client,
+        [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ],
+        count_tokens(system + user),
+        'digest',
+        transcript_tokens=count_tokens(section),
+        temperature=0.3,
+        job_id=f"section {index + 1}/{total}"
+    )
+    store.put_artifact(key, digest)
+    return digest
+
+
+def max_digest_tokens(sections):
+    """Most tokens the digests of these sections can take (the router's output cap per call)"""
+    fraction, low, high = OUTPUT_BUDGETS['digest']
+    return sum(min(high, max(low, round(fraction * count_tokens(section)))) for section in sections)
+
+
+def section_digests(client, transcript_text, max_tokens=None):
+    """
+    Digest every section of a transcript (cached sections are reused)
+    Args:
+        client: OpenAI client
+        transcript_text: Full transcript
+        max_tokens: Prompt budget the joined digests must fit in; if they
+                    could exceed it no digests are made
+    Returns:
+        List of digests in transcript order, or None if the transcript fits
+        in one section or the digests might not fit max_tokens (derive
+        styles from the transcript itself then)
+    """
+    sections = split_sections(transcript_text)
+    if len(sections) < 2:
+        return None
+    if max_tokens is not None and max_digest_tokens(sections) > max_tokens:
+        print(f"📑 Skipping digests: {len(sections)} sections could need {max_digest_tokens(sections)} "
+              f"tokens, over the {max_tokens} token budget")
+        return None
+
+    with stage('section_digests'):
+        with ThreadPoolExecutor(max_workers=min(PARALLELISM, len(sections))) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, _digest_section, client, section, i, len(sections))
+                for i, section in enumerate(sections)
+            ]
+            digests = [f.result() for f in futures]
+
+    print(f"📑 Digested {len(sections)} sections: {count_tokens(transcript_text)} -> "
+          f"{sum(count_tokens(d) for d in digests)} tokens")
+    return digests
@@ -0,0 +1,241 @@
+"""
+Player Client Strategy
+yt-dlp can extract a YouTube video through several player clients
+(android, ios, web, ...) and which one is fast or working changes over
+time. This module records each client's success rate and latency, tries
+the historically best client first and, if it is still running past a
+latency threshold, races the next client in parallel. The first extraction
+that returns usable audio formats wins. Extractions that finish or fail
+before the threshold never start a second request.
+
+Environment:
+    EXTRACT_CLIENTS          Clients to use without cookies (default android,ios,mweb)
+    EXTRACT_CLIENTS_COOKIES  Clients to use with cookies (default web,mweb,tv)
+    EXTRACT_HEDGE_SECONDS    Latency threshold before a second client is raced
+                             (default 8; stretched to 2x the leader's average
+                             latency when that is longer, at most 30 s)
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import EXTRACT_ATTEMPTS, stage
+
+
+DEFAULT_CLIENTS = 'android,ios,mweb'
+# android and ios don't support cookies
+DEFAULT_COOKIE_CLIENTS = 'web,mweb,tv'
+
+# Assumed latency for a client that has never been tried
+PRIOR_SECONDS = 4.0
+EWMA_ALPHA = 0.3
+
+HEDGE_SECONDS = 8.0
+MAX_HEDGE_SECONDS = 30.0
+
+
+def _clients_from_env(name, default):
+    return [c.strip() for c in os.getenv(name, default).split(',') if c.strip()]
+
+
+def has_audio(info):
+    """True if an info dict has at least one downloadable audio format"""
+    return any(f.get('acodec') not in (None, 'none') for f in info.get('formats') or [])
+
+
+class ClientStats:
+    """Running success rate and latency of one player client"""
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.latency = None  # EWMA of successful extraction seconds
+
+    def record(self, ok, seconds):
+        if ok:
+            self.successes += 1
+            self.latency = seconds if self.latency is None else (
+                EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.latency
+            )
+        else:
+            self.failures += 1
+
+    @property
+    def success_rate(self):
+        # Laplace smoothing so one early failure doesn't bury a client
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def expected_seconds(self):
+        """Latency scaled by how often the client fails"""
+        latency = self.latency if self.latency is not None else PRIOR_SECONDS
+        return latency / self.success_rate
+
+    def to_dict(self):
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'success_rate': round(self.success_rate, 3),
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+class PlayerClientStrategy:
+    """Hedged yt-dlp extraction with a learned client preference"""
+
+    def __init__(self, clients=None, cookie_clients=None, hedge_seconds=None, max_workers=8):
+        """
+        Args:
+            clients: Player clients for requests without cookies
+            cookie_clients: Player clients for requests with cookies
+            hedge_seconds: Least time the leader runs before a hedge is raced
+        """
+        self.clients = clients or _clients_from_env('EXTRACT_CLIENTS', DEFAULT_CLIENTS)
+        self.cookie_clients = cookie_clients or _clients_from_env('EXTRACT_CLIENTS_COOKIES', DEFAULT_COOKIE_CLIENTS)
+        self.hedge_seconds = hedge_seconds if hedge_seconds is not None else float(
+            os.getenv('EXTRACT_HEDGE_SECONDS', HEDGE_SECONDS))
+        self.stats = {}
+        self.lock = threading.Lock()
+        # Losing extractions keep running here after the winner returns
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='extract')
+
+    def ranked_clients(self, with_cookies=False):
+        """Clients ordered best first (configured order breaks ties)"""
+        clients = self.cookie_clients if with_cookies else self.clients
+        with self.lock:
+            scores = {c: self.stats.get(c, ClientStats()).expected_seconds() for c in clients}
+        return sorted(clients, key=lambda c: (scores[c], clients.index(c)))
+
+    def preferred_client(self, with_cookies=False):
+        """Best client for a download"""
+        return self.ranked_clients(with_cookies)[0]
+
+    def player_clients(self, with_cookies=False):
+        """
+        yt-dlp 'player_client' list for a download: the best client first,
+        then yt-dlp's own defaults as fallbacks if it fails
+        """
+        return [self.preferred_client(with_cookies), 'default']
+
+    def _hedge_deadline(self, client):
+        """Seconds to let a client run alone before racing another"""
+        with self.lock:
+            latency = self.stats.get(client, ClientStats()).latency
+        if latency is None:
+            return self.hedge_seconds
+        # A client that is normally slow gets longer before it counts as stuck
+        return min(MAX_HEDGE_SECONDS, max(self.hedge_seconds, 2 * latency))
+
+    def _record(self, client, result, seconds):
+        EXTRACT_ATTEMPTS.inc(client=client, result=result)
+        with self.lock:
+            self.stats.setdefault(client, ClientStats()).record(result == 'ok', seconds)
+
+    def _extract_with(self, client, url, ydl_opts):
+        """One extraction through one client (runs in the executor)"""
+        import yt_dlp
+
+        opts = dict(ydl_opts)
+        extractor_args = dict(opts.get('extractor_args') or {})
+        youtube_args = dict(extractor_args.get('youtube') or {})
+        youtube_args['player_client'] = [client]
+        extractor_args['youtube'] = youtube_args
+        opts['extractor_args'] = extractor_args
+        opts.setdefault('socket_timeout', 15)
+
+        start = time.perf_counter()
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+        except Exception:
+            self._record(client, 'error', time.perf_counter() - start)
+            raise
+
+        ok = has_audio(info)
+        self._record(client, 'ok' if ok else 'no_audio', time.perf_counter() - start)
+        return info
+
+    def extract(self, url, ydl_opts, with_cookies=False):
+        """
+        Extract video info, hedging across player clients
+        Args:
+            url: Video URL
+            ydl_opts: Base yt-dlp options (player_client is set per attempt)
+            with_cookies: Pick from the cookie-capable client list
+        Returns:
+            (info, client) - info from the first client with usable audio; if
+            none has audio (live, premiere, removed) the first info returned
+        Raises:
+            The last client's error if every client failed
+        """
+        pending_clients = self.ranked_clients(with_cookies)
+        running = {}
+        fallback, last_error = None, None
+
+        def launch():
+            client = pending_clients.pop(0)
+            ctx = contextvars.copy_context()  # Keep the trace in the worker thread
+            future = self.executor.submit(ctx.run, self._extract_with, client, url, ydl_opts)
+            running[future] = client
+            return client
+
+        with stage('ytdlp_extract'):
+            leader = launch()
+            deadline = time.monotonic() + self._hedge_deadline(leader)
+
+            while running:
+                timeout = None
+                if pending_clients and len(running) < 2:
+                    timeout = max(0.0, deadline - time.monotonic())
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    # Leader is slow: race the next client alongside it
+                    hedge = launch()
+                    print(f"🏁 Extraction via {leader} is slow, racing {hedge}")
+                    deadline = time.monotonic() + self._hedge_deadline(hedge)
+                    continue
+
+                for future in done:
+                    client = running.pop(future)
+                    try:
+                        info = future.result()
+                    except Exception as e:
+                        last_error = e
+                        print(f"⚠ Extraction via {client} failed: {str(e)[:120]}")
+                        continue
+
+                    # Live/upcoming status is the same whichever client asks
+                    if has_audio(info) or info.get('live_status') in ('is_live', 'is_upcoming'):
+                        return info, client
+                    fallback = fallback or (info, client)
+
+                # Replace failed attempts right away
+                if pending_clients and not running:
+                    leader = launch()
+                    deadline = time.monotonic() + self._hedge_deadline(leader)
+
+        if fallback:
+            return fallback
+        raise last_error
+
+    def snapshot(self):
+        """Per-client stats for /api/health"""
+        with self.lock:
+            return {client: stats.to_dict() for client, stats in self.stats.items()}
+
+
+# Global instance
+_strategy = None
+_strategy_lock = threading.Lock()
+
+
+def get_client_strategy():
+    """Get or create the global player client strategy"""
+    global _strategy
+    with _strategy_lock:
+        if _strategy is None:
+            _strategy = PlayerClientStrategy()
+        return _strategy
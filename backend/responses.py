@@ -0,0 +1,141 @@
+"""
+Response Shaping
+Keeps JSON payloads small for mobile clients: field selection
+(fields=flashcards,count), weak ETags for conditional GETs and gzip or
+brotli compression negotiated from Accept-Encoding. Brotli is used when
+the brotli package is installed.
+
+ETags are only set on GET responses; the pipelines are POSTs, so a
+finished result is revalidated through GET /api/jobs/<job_id>.
+
+Environment:
+    COMPRESS_MIN_BYTES  Smaller responses are sent uncompressed (default 1024)
+    COMPRESS_LEVEL      gzip level 1-9; brotli uses a matching quality (default 6)
+"""
+
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+# Always kept so a trimmed response still explains a failure
+ALWAYS_FIELDS = ('error',)
+
+
+def parse_fields(value):
+    """
+    Requested fields from a query value ("a,b.c") or a JSON list
+    Returns:
+        List of field paths, or None if no selection was asked for
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = [str(f).strip() for f in value if str(f).strip()]
+    return fields or None
+
+
+def select_fields(data, fields):
+    """
+    Keep only the requested top-level fields of a JSON object
+    Dotted paths select inside nested objects, e.g. "result.flashcards"
+    for a job from /api/jobs/<job_id>.
+    Args:
+        data: Decoded JSON object
+        fields: Field paths from parse_fields()
+    Returns:
+        The trimmed object (data itself if it isn't a dict)
+    """
+    if not isinstance(data, dict):
+        return data
+
+    nested = {}
+    selected = {}
+    for field in list(fields) + [f for f in ALWAYS_FIELDS if f in data]:
+        name, _, rest = field.partition('.')
+        if name not in data:
+            continue
+        if rest and isinstance(data[name], dict):
+            nested.setdefault(name, []).append(rest)
+        else:
+            selected[name] = data[name]
+    for name, paths in nested.items():
+        if name not in selected:
+            selected[name] = select_fields(data[name], paths)
+    return selected
+
+
+def etag_for(body):
+    """Content hash of a response body, for a weak ETag"""
+    return hashlib.sha1(body).hexdigest()[:27]
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Weak comparison of an ETag against an If-None-Match header
+    Args:
+        etag: Unquoted tag from etag_for()
+        if_none_match: Header value, e.g. 'W/"abc", "def"' or '*'
+    Returns:
+        True if the client's copy is current (answer 304)
+    """
+    for tag in (if_none_match or '').split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag[:2] in ('W/', 'w/'):
+            tag = tag[2:]
+        if tag.strip('"') == etag:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding):
+    """
+    Best supported encoding from an Accept-Encoding header
+    Returns:
+        'br', 'gzip' or None
+    """
+    accepted = {}
+    for item in (accept_encoding or '').lower().split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    def ok(name):
+        return accepted.get(name, accepted.get('*', 0)) > 0
+
+    if brotli is not None and ok('br'):
+        return 'br'
+    if ok('gzip'):
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    """Compress a body with 'br' or 'gzip'"""
+    if encoding == 'br':
+        # Quality 11 is too slow for per-request use; scale from the gzip level
+        return brotli.compress(body, quality=min(11, COMPRESS_LEVEL - 1))
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+
+
+def should_compress(mimetype, size):
+    return size >= COMPRESS_MIN_BYTES and (mimetype or '').startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,194 @@
+"""
+Transcript Segments
+Keeps the timestamped segments Whisper returns instead of collapsing them
+into a plain string. Segment times live in parallel float arrays and the
+text in one string with offsets, so a 3-hour transcript (thousands of
+segments) stays small in memory and in the job store. Later stages can
+re-process a time range, chunk by time or link a flashcard back to the
+moment in the video it came from without another ASR pass.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from transcript_compactor import STOPWORDS, WORD_RE
+
+
+def _field(segment, name):
+    """Segment field from a dict (local engines) or an object (OpenAI verbose_json)"""
+    if isinstance(segment, dict):
+        return segment.get(name)
+    return getattr(segment, name, None)
+
+
+class SegmentStore:
+    """Timestamped transcript segments in array-backed storage"""
+
+    def __init__(self, starts=(), ends=(), texts=(), language=None):
+        """
+        Args:
+            starts: Segment start times in seconds
+            ends: Segment end times in seconds
+            texts: Segment texts
+            language: Detected language code
+        """
+        self.starts = array('d', starts)
+        self.ends = array('d', ends)
+        self.offsets = array('L', [0])
+        parts = []
+        for text in texts:
+            text = (text or '').strip()
+            parts.append(text)
+            self.offsets.append(self.offsets[-1] + len(text) + 1)
+        self.joined = ' '.join(parts)
+        self.language = language
+        self._index = None
+
+    @classmethod
+    def from_segments(cls, segments, language=None):
+        """Build from Whisper segments (dicts or OpenAI segment objects)"""
+        segments = segments or []
+        return cls(
+            [float(_field(s, 'start') or 0) for s in segments],
+            [float(_field(s, 'end') or 0) for s in segments],
+            [_field(s, 'text') for s in segments],
+            language
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict()"""
+        store = cls(data.get('starts', ()), data.get('ends', ()), (), data.get('language'))
+        store.offsets = array('L', data.get('offsets') or [0])
+        store.joined = data.get('text', '')
+        return store
+
+    def to_dict(self):
+        """Compact JSON-serializable form (times rounded to 10 ms)"""
+        return {
+            'language': self.language,
+            'starts': [round(t, 2) for t in self.starts],
+            'ends': [round(t, 2) for t in self.ends],
+            'offsets': list(self.offsets),
+            'text': self.joined,
+        }
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return {'start': self.starts[i], 'end': self.ends[i], 'text': self.segment_text(i)}
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def segment_text(self, i):
+        return self.joined[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    @property
+    def text(self):
+        """Full transcript text"""
+        return self.joined
+
+    @property
+    def duration(self):
+        return self.ends[-1] if len(self) else 0.0
+
+    def index_at(self, seconds):
+        """Index of the segment playing at a time (the last one started before it)"""
+        return max(bisect_right(self.starts, seconds) - 1, 0)
+
+    def range_indices(self, start, end):
+        """Indices of segments overlapping [start, end) seconds"""
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        return range(first, max(first, last))
+
+    def between(self, start, end):
+        """New store with only the segments overlapping [start, end) seconds"""
+        indices = self.range_indices(start, end)
+        return SegmentStore(
+            [self.starts[i] for i in indices],
+            [self.ends[i] for i in indices],
+            [self.segment_text(i) for i in indices],
+            self.language
+        )
+
+    def text_between(self, start, end):
+        """Transcript text of the segments overlapping [start, end) seconds"""
+        indices = self.range_indices(start, end)
+        if not indices:
+            return ''
+        return self.joined[self.offsets[indices[0]]:self.offsets[indices[-1] + 1] - 1]
+
+    def chunks(self, seconds):
+        """
+        Split into consecutive time windows (e.g. for parallel LLM calls)
+        Args:
+            seconds: Window length
+        Returns:
+            [(start, end, text), ...] with segment-aligned boundaries
+        """
+        result = []
+        i = 0
+        while i < len(self):
+            window_end = self.starts[i] + seconds
+            j = max(bisect_left(self.starts, window_end), i + 1)
+            text = self.joined[self.offsets[i]:self.offsets[j] - 1]
+            result.append((self.starts[i], self.ends[j - 1], text))
+            i = j
+        return result
+
+    def locate(self, text):
+        """
+        Segment that best matches a piece of text (e.g. a flashcard answer)
+        Scores each segment and its neighbours by shared content words
+        Returns:
+            (start, end) seconds, or None if nothing matches
+        """
+        words = {w for w in WORD_RE.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS}
+        if not words or not len(self):
+            return None
+
+        if self._index is None:
+            self._index = {}
+            for i in range(len(self)):
+                for w in set(WORD_RE.findall(self.segment_text(i).lower())):
+                    self._index.setdefault(w, []).append(i)
+
+        scores = {}
+        for w in words:
+            postings = self._index.get(w, ())
+            weight = 1.0 / len(postings) if postings else 0  # Rare words identify the moment
+            for i in postings:
+                # A sentence often spans two segments: credit the neighbours too
+                for j, share in ((i - 1, 0.5), (i, 1.0), (i + 1, 0.5)):
+                    if 0 <= j < len(self):
+                        scores[j] = scores.get(j, 0.0) + weight * share
+        if not scores:
+            return None
+        best = max(scores, key=lambda i: (scores[i], -i))
+        return self.starts[best], self.ends[best]
+
+
+def link_cards(cards, segments):
+    """
+    Add a 'timestamp' (seconds) to each flashcard from the segment it came from
+    Args:
+        cards: Flashcard dicts ('question'/'answer' or 'front'/'back')
+        segments: SegmentStore, or its to_dict() form
+    Returns:
+        The same cards
+    """
+    if isinstance(segments, dict):
+        segments = SegmentStore.from_dict(segments)
+    if not segments:
+        return cards
+    for card in cards:
+        text = ' '.join(str(card.get(k) or '') for k in ('question', 'answer', 'front', 'back'))
+        match = segments.locate(text)
+        if match:
+            card['timestamp'] = round(match[0], 1)
+    return cards
@@ -0,0 +1,73 @@
+"""
+Single-Flight Request Coalescing
+Concurrent calls with the same key share one execution: the first caller
+runs the work, later callers wait for it and receive the same result
+"""
+
+import threading
+
+from metrics import COALESCED_REQUESTS
+
+
+class _Call:
+    """An in-flight execution that followers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Thread-safe in-flight deduplication keyed by arbitrary hashable keys"""
+
+    def __init__(self, name):
+        """
+        Args:
+            name: Label used in metrics (e.g. 'process-complete')
+        """
+        self.name = name
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) once per key at a time
+        Returns:
+            (result, shared) - shared is True if this caller joined another's call
+        Raises:
+            Whatever fn raised, for the leader and every follower
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.followers += 1
+                leader = False
+            else:
+                call = self.calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            COALESCED_REQUESTS.inc(endpoint=self.name)
+            print(f"🔗 Joined in-flight {self.name} job {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """Number of distinct keys currently running"""
+        with self.lock:
+            return len(self.calls)
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+import admission
+from admission import ConcurrencyLimit, Overloaded, RateLimiter
+from single_flight import SingleFlight
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, 'monotonic', clock)
+    return clock
+
+
+def test_rate_limiter_burst_then_429(clock):
+    limiter = RateLimiter('test', per_minute=60, burst=3)
+    for _ in range(3):
+        limiter.check('10.0.0.1')
+
+    with pytest.raises(Overloaded) as exc:
+        limiter.check('10.0.0.1')
+    assert exc.value.status == 429
+    assert exc.value.reason == 'rate_limited'
+    assert exc.value.retry_after == 1
+
+    # Other clients have their own bucket
+    limiter.check('10.0.0.2')
+
+
+def test_rate_limiter_refills_over_time(clock):
+    limiter = RateLimiter('test', per_minute=30, burst=2)
+    limiter.check('client')
+    limiter.check('client')
+    with pytest.raises(Overloaded):
+        limiter.check('client')
+
+    clock.now += 2  # One token every 2 s
+    limiter.check('client')
+    with pytest.raises(Overloaded):
+        limiter.check('client')
+
+    clock.now += 60  # Refill stops at the burst size
+    limiter.check('client')
+    limiter.check('client')
+    with pytest.raises(Overloaded):
+        limiter.check('client')
+
+
+def test_rate_limiter_disabled():
+    limiter = RateLimiter('test', per_minute=0, burst=1)
+    for _ in range(100):
+        limiter.check('client')
+
+
+def test_concurrency_limit_rejects_when_queue_full():
+    limit = ConcurrencyLimit('test', 1, queue_size=0, wait_seconds=1)
+    with limit.slot():
+        with pytest.raises(Overloaded) as exc:
+            with limit.slot():
+                pass
+    assert exc.value.status == 503
+    assert exc.value.reason == 'queue_full'
+    with limit.slot():
+        assert limit.snapshot()['running'] == 1
+
+
+def test_single_flight_follower_gets_leader_result():
+    flights = SingleFlight('test')
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    results = {}
+
+    def leader():
+        results['leader'] = flights.do('key', work, 21)
+
+    def follower():
+        results['follower'] = flights.do('key', work, 99)
+
+    threads = [threading.Thread(target=leader)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=follower))
+    threads[1].start()
+    while flights.calls['key'].followers == 0:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [21]
+    assert results == {'leader': (42, False), 'follower': (42, True)}
+    assert flights.in_flight() == 0
@@ -0,0 +1,49 @@
+from cloze_generator import BLANK, generate_cloze_cards
+
+
+TRANSCRIPT = (
+    "Today we look at how engineers test metal parts in the lab. "
+    "A tensile test is a measurement where a rod that is 5 mm thick gets pulled until it breaks. "
+    "Pre- and post-processing of the samples take most of the lab time. "
+    "The tensile test tells us the yield strength of the metal sample. "
+    "Yield strength is the stress where the metal starts to deform permanently. "
+    "Um, the machine records force and elongation, uh, many times per second. "
+    "Heat treatment changes the yield strength of many steels quite a lot. "
+    "Heat treatment means heating the part in a furnace and cooling it slowly. "
+    "Engineers compare the results with the values in the material standard. "
+    "We had had problems with cracked samples in the past. "
+    "A cracked sample is thrown away and the test is repeated with a new one. "
+    "Bye bye for now and see you next week in the lab."
+)
+
+
+def _cards(**kwargs):
+    return generate_cloze_cards(TRANSCRIPT, **kwargs)
+
+
+def test_cloze_cards_blank_their_answer():
+    cards = _cards()
+    assert cards
+    for card in cards:
+        assert BLANK in card['question']
+        assert card['answer'] not in card['question'].lower()
+
+
+def test_cloze_cards_prefer_definitions():
+    answers = {card['answer']: card['question'] for card in _cards()}
+    assert answers['tensile test'] == (
+        f"Fill in the blank: A {BLANK} is a measurement where a rod that is 5 mm thick gets pulled until it breaks."
+    )
+    assert answers['yield strength'].startswith(f"Fill in the blank: {BLANK} is the stress")
+
+
+def test_cloze_cards_keep_sentence_content():
+    questions = [card['question'] for card in _cards()]
+    assert any('5 mm thick' in q for q in questions)
+    assert any('We had had problems' in q for q in questions)
+
+
+def test_cloze_cards_front_back_keys():
+    cards = _cards(max_cards=1, keys=('front', 'back'))
+    assert len(cards) == 1
+    assert set(cards[0]) == {'front', 'back'}
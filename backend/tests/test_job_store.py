@@ -0,0 +1,85 @@
+import pytest
+
+from admission import Overloaded
+from job_store import JobStore, job_id_for
+
+
+class OtherWorker(JobStore):
+    """The same store as seen from another process"""
+
+    @property
+    def owner(self):
+        return 'other-host:1'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.db'))
+
+
+def test_job_resumes_from_last_checkpoint(store):
+    calls = []
+
+    def transcript():
+        calls.append('transcript')
+        return {'text': 'hello'}
+
+    def notes():
+        calls.append('notes')
+        raise RuntimeError('LLM down')
+
+    with pytest.raises(RuntimeError):
+        with store.open('process-complete', {'video_id': 'abc'}) as job:
+            job.stage('transcript', transcript)
+            job.stage('notes', notes)
+    assert store.get(job.job_id)['status'] == 'failed'
+
+    with store.open('process-complete', {'video_id': 'abc'}) as job:
+        assert job.checkpoints == {'transcript': {'text': 'hello'}}
+        assert job.stage('transcript', transcript) == {'text': 'hello'}
+        job.finish({'notes': 'ok'})
+
+    assert calls == ['transcript', 'notes']
+    info = store.get(job.job_id)
+    assert info['status'] == 'done'
+    assert info['attempts'] == 2
+    assert info['stages'] == ['transcript']
+
+
+def test_finished_result_is_reused(store):
+    with store.open('transcribe', {'video_id': 'abc'}) as job:
+        job.finish({'text': 'done'})
+
+    with store.open('transcribe', {'video_id': 'abc'}) as job:
+        assert job.result == {'text': 'done'}
+
+
+def test_stale_heartbeat_hands_job_to_new_owner(store):
+    with store.open('process-free', {'video_id': 'abc'}) as job:
+        job.stage('audio', lambda: '/tmp/abc.m4a')
+        job_id = job.job_id
+
+        # The first owner stops sending heartbeats
+        with store._transaction() as conn:
+            conn.execute('UPDATE jobs SET heartbeat = heartbeat - 1000 WHERE job_id = ?', (job_id,))
+
+        other = OtherWorker(store.path)
+        taken = other.open('process-free', {'video_id': 'abc'})
+        assert taken.checkpoints == {'audio': '/tmp/abc.m4a'}
+        assert store._conn().execute('SELECT owner FROM jobs WHERE job_id = ?', (job_id,)).fetchone()[0] == other.owner
+        other.release(job_id)
+
+
+def test_live_owner_keeps_job_until_wait_deadline(store):
+    with store.open('process-free', {'video_id': 'abc'}):
+        other = OtherWorker(store.path)
+        other.wait_seconds = 0
+        with pytest.raises(Overloaded) as exc:
+            other.open('process-free', {'video_id': 'abc'})
+    assert exc.value.status == 503
+    assert exc.value.reason == 'job_busy'
+
+
+def test_job_id_is_stable_for_the_same_request():
+    assert job_id_for('transcribe', {'a': 1, 'b': 2}) == job_id_for('transcribe', {'b': 2, 'a': 1})
+    assert job_id_for('transcribe', {'a': 1}) != job_id_for('process-free', {'a': 1})
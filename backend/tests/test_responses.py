@@ -0,0 +1,78 @@
+import gzip
+
+import responses
+
+
+def test_parse_fields_from_query_and_json():
+    assert responses.parse_fields('flashcards, count,') == ['flashcards', 'count']
+    assert responses.parse_fields(['flashcards', ' count ']) == ['flashcards', 'count']
+    assert responses.parse_fields('') is None
+    assert responses.parse_fields(None) is None
+    assert responses.parse_fields(' , ') is None
+
+
+def test_select_fields_top_level_and_nested():
+    data = {
+        'status': 'done',
+        'stages': ['audio', 'transcript'],
+        'result': {'flashcards': [{'question': 'q', 'answer': 'a'}], 'count': 1, 'transcript': 'long'},
+    }
+    assert responses.select_fields(data, ['status', 'result.flashcards']) == {
+        'status': 'done',
+        'result': {'flashcards': [{'question': 'q', 'answer': 'a'}]},
+    }
+    # A whole object wins over a path inside it
+    assert responses.select_fields(data, ['result', 'result.count']) == {'result': data['result']}
+
+
+def test_select_fields_keeps_error_and_ignores_unknown():
+    data = {'error': 'boom', 'flashcards': [], 'count': 0}
+    assert responses.select_fields(data, ['count', 'missing']) == {'count': 0, 'error': 'boom'}
+
+
+def test_select_fields_leaves_non_objects_alone():
+    assert responses.select_fields([1, 2], ['a']) == [1, 2]
+    assert responses.select_fields('text', ['a']) == 'text'
+
+
+def test_etag_is_stable_per_body():
+    assert responses.etag_for(b'{"a": 1}') == responses.etag_for(b'{"a": 1}')
+    assert responses.etag_for(b'{"a": 1}') != responses.etag_for(b'{"a": 2}')
+
+
+def test_etag_matches_if_none_match():
+    etag = responses.etag_for(b'body')
+    assert responses.etag_matches(etag, f'W/"{etag}"')
+    assert responses.etag_matches(etag, f'"{etag}"')
+    assert responses.etag_matches(etag, f'"other", W/"{etag}"')
+    assert responses.etag_matches(etag, '*')
+    assert not responses.etag_matches(etag, '"other"')
+    assert not responses.etag_matches(etag, '')
+    assert not responses.etag_matches(etag, None)
+
+
+def test_choose_encoding_prefers_brotli_when_available(monkeypatch):
+    monkeypatch.setattr(responses, 'brotli', object())
+    assert responses.choose_encoding('gzip, deflate, br') == 'br'
+    assert responses.choose_encoding('br;q=0, gzip') == 'gzip'
+
+    monkeypatch.setattr(responses, 'brotli', None)
+    assert responses.choose_encoding('gzip, deflate, br') == 'gzip'
+
+
+def test_choose_encoding_honours_q_values(monkeypatch):
+    monkeypatch.setattr(responses, 'brotli', None)
+    assert responses.choose_encoding('gzip;q=0') is None
+    assert responses.choose_encoding('identity') is None
+    assert responses.choose_encoding('*') == 'gzip'
+    assert responses.choose_encoding('*;q=0, gzip;q=0.5') == 'gzip'
+    assert responses.choose_encoding('gzip;q=bogus') is None
+    assert responses.choose_encoding(None) is None
+
+
+def test_should_compress_and_round_trip():
+    body = b'{"transcript": "' + b'word ' * 400 + b'"}'
+    assert responses.should_compress('application/json', len(body))
+    assert not responses.should_compress('application/json', 10)
+    assert not responses.should_compress('image/png', len(body))
+    assert gzip.decompress(responses.compress(body, 'gzip')) == body
@@ -0,0 +1,41 @@
+import pytest
+
+from transcript_compactor import compact_transcript, split_sentences, strip_disfluencies
+
+
+@pytest.mark.parametrize('text', [
+    "The rod is 5 mm long.",
+    "We had had enough by then.",
+    "Pre- and post-processing take most of the time.",
+    "Bye bye for now.",
+    "I like, apples more than pears.",
+    "It was an uh-oh moment.",
+])
+def test_strip_disfluencies_keeps_real_content(text):
+    assert strip_disfluencies(text) == text
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("Um, so the cell, uh, divides.", "so the cell divides."),
+    ("So, erm, this is, you know, the key.", "So this is the key."),
+    ("The the the mitochondria makes energy.", "The mitochondria makes energy."),
+    ("I, I think it works.", "I think it works."),
+    ("We went, we went home early.", "We went home early."),
+    ("And we need-- we want more data.", "And we want more data."),
+])
+def test_strip_disfluencies_removes_disfluencies(text, expected):
+    assert strip_disfluencies(text) == expected
+
+
+def test_split_sentences_breaks_long_runs():
+    text = ' '.join(['word'] * 100)
+    assert [len(s.split()) for s in split_sentences(text)] == [40, 40, 20]
+
+
+def test_compact_transcript_fits_budget_in_order():
+    text = ' '.join(f"Sentence {i} talks about topic{i} and detail{i}." for i in range(200))
+    result = compact_transcript(text, 300, consumer='test')
+    assert result['selected']
+    assert result['tokens'] <= 300
+    numbers = [int(s.split()[1]) for s in split_sentences(result['text'])]
+    assert numbers == sorted(numbers)
@@ -0,0 +1,267 @@
+"""
+Request Tracing
+Assigns a trace id per request, records span timings and propagates the
+trace to other services (home Whisper servers) with the W3C traceparent header
+
+Export with TRACE_EXPORT:
+    json - append finished spans as JSON lines to TRACE_FILE (default traces.jsonl)
+    otlp - send spans to an OTLP/HTTP collector at TRACE_OTLP_ENDPOINT
+           (default http://localhost:4318/v1/traces)
+Recent traces are also kept in memory and can be dumped with get_trace()
+"""
+
+import contextvars
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+# Traces kept in memory for get_trace()
+MAX_TRACES = int(os.getenv('TRACE_BUFFER_SIZE', 200))
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_service_name = os.getenv('TRACE_SERVICE_NAME', 'fastscribe-api')
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.service = _service_name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _exporter.export(self)
+
+    @property
+    def duration_ms(self):
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'service': self.service,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class _Exporter:
+    """Keeps recent traces in memory and ships finished spans to the configured sink"""
+
+    def __init__(self):
+        self.mode = os.getenv('TRACE_EXPORT', '').lower()
+        self.traces = OrderedDict()
+        self.lock = threading.Lock()
+        self.queue = None
+        self.pid = None
+
+    def _sink_queue(self):
+        """
+        Queue drained by this process's export thread, started on first use
+        The thread is per process: a worker forked from a preloaded master
+        inherits the master's queue but not its thread, so it starts its own
+        """
+        if self.mode not in ('json', 'otlp'):
+            return None
+        if self.pid != os.getpid():
+            self.queue = queue.Queue(maxsize=10000)
+            self.pid = os.getpid()
+            threading.Thread(target=self._run, args=(self.queue,), daemon=True).start()
+        return self.queue
+
+    def export(self, span):
+        with self.lock:
+            spans = self.traces.setdefault(span.trace_id, [])
+            spans.append(span.to_dict())
+            self.traces.move_to_end(span.trace_id)
+            while len(self.traces) > MAX_TRACES:
+                self.traces.popitem(last=False)
+            sink = self._sink_queue()
+
+        if sink is not None:
+            try:
+                sink.put_nowait(span)
+            except queue.Full:
+                pass  # Never block a request on tracing
+
+    def get_trace(self, trace_id):
+        with self.lock:
+            return list(self.traces.get(trace_id, []))
+
+    def _run(self, spans):
+        """Batch spans and flush every couple of seconds"""
+        while True:
+            batch = [spans.get()]
+            deadline = time.monotonic() + 2
+            while len(batch) < 200:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(spans.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                if self.mode == 'json':
+                    self._write_json(batch)
+                else:
+                    self._send_otlp(batch)
+            except Exception as e:
+                print(f"⚠ Trace export failed: {e}")
+
+    def _write_json(self, batch):
+        with open(os.getenv('TRACE_FILE', 'traces.jsonl'), 'a', encoding='utf-8') as f:
+            for span in batch:
+                f.write(json.dumps(span.to_dict()) + '\n')
+
+    def _send_otlp(self, batch):
+        by_service = {}
+        for span in batch:
+            by_service.setdefault(span.service, []).append(_otlp_span(span))
+
+        payload = {'resourceSpans': [
+            {
+                'resource': {'attributes': [_otlp_attr('service.name', service)]},
+                'scopeSpans': [{'scope': {'name': 'fastscribe'}, 'spans': spans}]
+            }
+            for service, spans in by_service.items()
+        ]}
+
+        endpoint = os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+        request = urllib.request.Request(
+            endpoint,
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+
+
+def _otlp_attr(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def _otlp_span(span):
+    data = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': 1,
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns),
+        'attributes': [_otlp_attr(k, v) for k, v in span.attributes.items()],
+    }
+    if span.parent_id:
+        data['parentSpanId'] = span.parent_id
+    if span.error:
+        data['status'] = {'code': 2, 'message': span.error}
+    return data
+
+
+_exporter = _Exporter()
+
+
+def configure(service_name):
+    """Set the service name recorded on spans from this process"""
+    global _service_name
+    _service_name = service_name
+
+
+def start_trace(name, headers=None, **attributes):
+    """
+    Start the root span for an incoming request
+    Args:
+        name: Span name (e.g. 'POST /api/process-complete')
+        headers: Incoming request headers; a valid traceparent continues that trace
+    Returns:
+        (span, token) - pass the token to end_trace()
+    """
+    trace_id, parent_id = None, None
+    traceparent = (headers or {}).get('traceparent', '')
+    match = TRACEPARENT_RE.match(traceparent.strip().lower())
+    if match:
+        trace_id, parent_id = match.groups()
+
+    span = Span(name, trace_id or secrets.token_hex(16), parent_id, attributes)
+    return span, _current_span.set(span)
+
+
+def end_trace(span, token, **attributes):
+    """Finish a root span started with start_trace()"""
+    span.attributes.update(attributes)
+    span.finish()
+    _current_span.reset(token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Record a child span of the current span (no-op outside a trace)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, parent.trace_id, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+
+def current_trace_id():
+    """Trace id of the active span, or None"""
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+def inject_headers(headers=None):
+    """Add a traceparent header for the current span to an outgoing request"""
+    headers = dict(headers or {})
+    current = _current_span.get()
+    if current is not None:
+        headers['traceparent'] = f"00-{current.trace_id}-{current.span_id}-01"
+    return headers
+
+
+def get_trace(trace_id):
+    """Spans recorded in this process for a trace (most recent traces only)"""
+    return _exporter.get_trace(trace_id)
@@ -4,11 +4,15 @@ Downloads audio and transcribes using OpenAI's Whisper API
 """
 
 import os
-import tempfile
-import yt_dlp
-from openai import OpenAI
 from urlScraper import YouTubeURLScraper
 from apiKeyCycler import get_next_api_key
+from metrics import DownloadTimer, stage
+from audio_cache import get_audio_cache
+from video_metadata import get_metadata_service
+from download_manager import get_download_manager
+from player_clients import get_client_strategy
+from concurrency import get_openai_client
+from segments import SegmentStore
 
 
 class YouTubeTranscriber:
@@ -17,10 +21,11 @@ class YouTubeTranscriber:
     def __init__(self, api_key=None):
         self.transcript = None
         self.formatted_text = None
+        self.segments = None
         self.video_id = None
         # Use provided key or get next from cycler
         self.api_key = api_key or get_next_api_key()
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = get_openai_client(self.api_key)
     
     def get_transcript(self, url_or_video_id, language=None, cookies_from_browser=None, cookies_file=None):
         """
@@ -38,152 +43,190 @@ class YouTubeTranscriber:
         if url_or_video_id.startswith('http'):
             scraper = YouTubeURLScraper()
             self.video_id = scraper.extract_video_id(url_or_video_id)
-            url = scraper.get_standard_url()
         else:
             self.video_id = url_or_video_id
-            url = f"https://www.youtube.com/watch?v={url_or_video_id}"
         
-        # Create temporary directory for audio file
-        temp_dir = tempfile.mkdtemp()
-        audio_file = os.path.join(temp_dir, f"{self.video_id}.mp3")
+        try:
+            audio_file = self.download_audio(self.video_id, cookies_from_browser, cookies_file)
+            return self.transcribe_file(audio_file, language)
+        
+        except Exception as e:
+            raise Exception(f"Error transcribing video: {str(e)}")
+    
+    def download_audio(self, video_id, cookies_from_browser=None, cookies_file=None):
+        """
+        Download a video's audio as MP3, or reuse it from the audio cache
+        Args:
+            video_id: YouTube video ID
+            cookies_from_browser: Browser to extract cookies from
+            cookies_file: Path to cookies.txt file in Netscape format
+        Returns:
+            Path to the cached MP3 file (do not delete it)
+        """
+        return get_audio_cache().get_or_download(
+            video_id,
+            'mp3',
+            lambda temp_dir: self._download_to(video_id, temp_dir, cookies_from_browser, cookies_file)
+        )
+    
+    def _download_to(self, video_id, temp_dir, cookies_from_browser=None, cookies_file=None):
+        """Check availability and download the audio into temp_dir"""
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        audio_file = os.path.join(temp_dir, f"{video_id}.mp3")
+        
+        # Download audio using yt-dlp
+        print(f"Downloading audio from video: {video_id}")
+        
+        # Determine if using cookies
+        using_cookies = cookies_from_browser or (cookies_file and os.path.exists(cookies_file)) or os.path.exists('cookies.txt')
+        
+        ydl_opts = {
+            'format': 'bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio/best',
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }],
+            'outtmpl': os.path.join(temp_dir, f"{video_id}.%(ext)s"),
+            'quiet': False,
+            'no_warnings': False,
+            'extract_flat': False,
+            'nocheckcertificate': True,
+            'http_headers': {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-us,en;q=0.5',
+                'Sec-Fetch-Mode': 'navigate',
+            },
+        }
+        
+        # Try the player client that has been fastest lately, then yt-dlp's defaults
+        # Android/iOS clients don't support cookies, so cookie requests pick from the web-style clients
+        clients = get_client_strategy().player_clients(bool(using_cookies))
+        client = clients[0]
+        ydl_opts['extractor_args'] = {'youtube': {'player_client': clients}}
+        if not using_cookies:
+            print(f"Using {client} client (no cookies)")
+        else:
+            # Web-style clients may need a JavaScript runtime for YouTube's JS challenges
+            print(f"WARNING: Using {client} client with cookies - may require JavaScript runtime")
+            print("If this fails, remove cookies to use android client instead")
+        
+        # Add cookie options if provided
+        if cookies_from_browser:
+            ydl_opts['cookiesfrombrowser'] = (cookies_from_browser,)
+            print(f"Using cookies from browser: {cookies_from_browser}")
+        elif cookies_file and os.path.exists(cookies_file):
+            ydl_opts['cookiefile'] = cookies_file
+            print(f"Using cookies from file: {cookies_file}")
+        elif os.path.exists('cookies.txt'):
+            # Check for default cookies.txt in current directory
+            ydl_opts['cookiefile'] = 'cookies.txt'
+            print("Using cookies from cookies.txt")
+        
+        # Check the video is accessible before downloading. The metadata service
+        # caches this (and the API already ran it as a pre-flight check); browser
+        # cookies aren't supported there, so those requests extract here
+        if cookies_from_browser:
+            self._check_available(url, ydl_opts)
+        else:
+            get_metadata_service().check(video_id, ydl_opts.get('cookiefile'))
+        
+        # Now download the audio
+        print("Downloading audio...")
+        get_download_manager().download(
+            url, ydl_opts, lambda ydl: ydl.download([url]), key=f"{video_id}-mp3", timer=DownloadTimer()
+        )
         
+        return audio_file
+    
+    def _check_available(self, url, ydl_opts):
+        """Extract video info with the download options to check it's accessible"""
+        import yt_dlp
+        
+        print("Checking video availability...")
         try:
-            # Download audio using yt-dlp
-            print(f"Downloading audio from video: {self.video_id}")
-            
-            # Determine if using cookies
-            using_cookies = cookies_from_browser or (cookies_file and os.path.exists(cookies_file)) or os.path.exists('cookies.txt')
-            
-            ydl_opts = {
-                'format': 'bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'outtmpl': os.path.join(temp_dir, f"{self.video_id}.%(ext)s"),
-                'quiet': False,
-                'no_warnings': False,
-                'extract_flat': False,
-                'nocheckcertificate': True,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-us,en;q=0.5',
-                    'Sec-Fetch-Mode': 'navigate',
-                },
-            }
+            info, _ = get_client_strategy().extract(url, ydl_opts, with_cookies=True)
             
-            # Android client works best without JavaScript runtime
-            # BUT android doesn't support cookies, so only use it when we DON'T have cookies
-            if not using_cookies:
-                # No cookies: android is best choice (fast, no JS needed)
-                ydl_opts['extractor_args'] = {'youtube': {'player_client': ['android']}}
-                print("Using android client (no cookies)")
-            else:
-                # With cookies: we MUST skip android and accept that web client needs JS runtime
-                # This will only work in environments with Node.js or where videos don't trigger JS challenges
-                print("WARNING: Using web client with cookies - requires JavaScript runtime")
-                print("If this fails, remove cookies to use android client instead")
-                # Don't set player_client at all - let yt-dlp use default with cookies
-                # ydl_opts['extractor_args'] = {'youtube': {'player_client': ['web']}}
-            
-            # Add cookie options if provided
-            if cookies_from_browser:
-                ydl_opts['cookiesfrombrowser'] = (cookies_from_browser,)
-                print(f"Using cookies from browser: {cookies_from_browser}")
-            elif cookies_file and os.path.exists(cookies_file):
-                ydl_opts['cookiefile'] = cookies_file
-                print(f"Using cookies from file: {cookies_file}")
-            elif os.path.exists('cookies.txt'):
-                # Check for default cookies.txt in current directory
-                ydl_opts['cookiefile'] = 'cookies.txt'
-                print("Using cookies from cookies.txt")
-            
-            # First, try to get video info to check if it's accessible
-            print("Checking video availability...")
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                try:
-                    info = ydl.extract_info(url, download=False)
-                    
-                    # Check if video has any audio/video formats
-                    formats = info.get('formats', [])
-                    audio_formats = [f for f in formats if f.get('acodec') != 'none']
-                    
-                    if not audio_formats:
-                        # Check if it's a live stream, premiere, or unavailable
-                        if info.get('is_live'):
-                            raise Exception("Cannot transcribe live streams. Please wait until the stream is finished.")
-                        elif info.get('live_status') == 'is_upcoming':
-                            raise Exception("This video is a scheduled premiere that hasn't started yet. Please try again after it airs.")
-                        elif info.get('availability') in ['private', 'premium_only', 'subscriber_only']:
-                            raise Exception(f"This video is {info.get('availability')} and cannot be downloaded.")
-                        else:
-                            raise Exception("No audio formats available for this video. It may be restricted, deleted, or region-locked.")
-                    
-                    print(f"Video is accessible. Found {len(audio_formats)} audio formats.")
-                    
-                except yt_dlp.utils.DownloadError as e:
-                    error_msg = str(e)
-                    if "Private video" in error_msg:
-                        raise Exception("This is a private video and cannot be accessed.")
-                    elif "Video unavailable" in error_msg:
-                        raise Exception("This video is unavailable. It may have been deleted or restricted.")
-                    elif "Sign in" in error_msg or "not a bot" in error_msg:
-                        raise Exception("YouTube is blocking this request. Please configure cookies authentication. See COOKIES.md for setup instructions.")
-                    else:
-                        raise Exception(f"Cannot access video: {error_msg}")
+            # Check if video has any audio/video formats
+            formats = info.get('formats', [])
+            audio_formats = [f for f in formats if f.get('acodec') != 'none']
             
-            # Now download the audio
-            print("Downloading audio...")
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            if not audio_formats:
+                # Check if it's a live stream, premiere, or unavailable
+                if info.get('is_live'):
+                    raise Exception("Cannot transcribe live streams. Please wait until the stream is finished.")
+                elif info.get('live_status') == 'is_upcoming':
+                    raise Exception("This video is a scheduled premiere that hasn't started yet. Please try again after it airs.")
+                elif info.get('availability') in ['private', 'premium_only', 'subscriber_only']:
+                    raise Exception(f"This video is {info.get('availability')} and cannot be downloaded.")
+                else:
+                    raise Exception("No audio formats available for this video. It may be restricted, deleted, or region-locked.")
             
-            lang_msg = f" ({language})" if language else " (auto-detect)"
-            print(f"Audio downloaded. Transcribing with Whisper{lang_msg}...")
+            print(f"Video is accessible. Found {len(audio_formats)} audio formats.")
             
-            # Transcribe using OpenAI Whisper API
+        except yt_dlp.utils.DownloadError as e:
+            error_msg = str(e)
+            if "Private video" in error_msg:
+                raise Exception("This is a private video and cannot be accessed.")
+            elif "Video unavailable" in error_msg:
+                raise Exception("This video is unavailable. It may have been deleted or restricted.")
+            elif "Sign in" in error_msg or "not a bot" in error_msg:
+                raise Exception("YouTube is blocking this request. Please configure cookies authentication. See COOKIES.md for setup instructions.")
+            else:
+                raise Exception(f"Cannot access video: {error_msg}")
+    
+    def transcribe_file(self, audio_file, language=None):
+        """
+        Transcribe a local audio file with the Whisper API
+        Args:
+            audio_file: Path to the audio file
+            language: Optional ISO-639-1 language code (None = auto-detect)
+        Returns:
+            Transcript text (timestamped segments are kept in self.segments)
+        """
+        lang_msg = f" ({language})" if language else " (auto-detect)"
+        print(f"Transcribing with Whisper{lang_msg}...")
+        
+        with open(audio_file, 'rb') as f:
             whisper_params = {
                 "model": "whisper-1",
-                "file": open(audio_file, 'rb'),
-                "response_format": "text"
+                "file": f,
+                "response_format": "verbose_json"  # Text plus timestamped segments
             }
             
             # Add language parameter if specified
             if language:
                 whisper_params["language"] = language
             
-            transcript_response = self.client.audio.transcriptions.create(**whisper_params)
-            
-            self.formatted_text = transcript_response
-            print(f"Transcription complete!")
-            
-            return self.formatted_text
+            with stage('transcription'):
+                transcript_response = self.client.audio.transcriptions.create(**whisper_params)
         
-        except Exception as e:
-            raise Exception(f"Error transcribing video: {str(e)}")
+        self.formatted_text = transcript_response.text
+        self.segments = SegmentStore.from_segments(
+            getattr(transcript_response, 'segments', None),
+            getattr(transcript_response, 'language', None)
+        )
+        print(f"Transcription complete!")
         
-        finally:
-            # Clean up temporary files
-            try:
-                if os.path.exists(audio_file):
-                    os.remove(audio_file)
-                os.rmdir(temp_dir)
-            except:
-                pass
+        return self.formatted_text
     
     def format_transcript(self, include_timestamps=False):
         """
         Format transcript into readable text
-        Note: Whisper API doesn't provide timestamps in basic mode
         Args:
-            include_timestamps: Not supported in this version
+            include_timestamps: Prefix each segment with its [mm:ss] start time
         Returns:
             Formatted transcript string
         """
         if not self.formatted_text:
             raise ValueError("No transcript available. Call get_transcript first.")
         
+        if include_timestamps and self.segments:
+            return '\n'.join(
+                f"[{int(seg['start'] // 60):02d}:{int(seg['start'] % 60):02d}] {seg['text']}"
+                for seg in self.segments
+            )
         return self.formatted_text
     
     def save_transcript(self, filename):
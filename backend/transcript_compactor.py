@@ -0,0 +1,260 @@
+"""
+Transcript Compaction
+Shrinks a transcript to a token budget before it is sent to an LLM:
+1. strip disfluencies: standalone um/uh/erm, "you know,", stutters
+   ("the the the", "I, I"), "--" false starts and comma-separated repeats
+   ("we went, we went"); ordinary doubles such as "had had" are kept
+2. drop sentences that repeat earlier ones
+3. if still over budget, keep the most salient chunks (NumPy TF-IDF, see
+   chunk_ranker.py) or, without NumPy, the most information-dense
+   sentences - in their original order, so the prompt covers the whole
+   video rather than the first N characters
+
+Tokens are counted with tiktoken when it is installed, otherwise estimated
+at ~4 characters per token. Tokens saved are logged and exported as
+fastscribe_prompt_tokens_total.
+
+Environment:
+    NOTES_PROMPT_TOKENS    Transcript token budget for GPT notes (default 4500)
+    COPILOT_PROMPT_TOKENS  Transcript token budget for copilot-api flashcards (default 750)
+"""
+
+import heapq
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+from metrics import PROMPT_TOKENS, stage
+
+
+NOTES_PROMPT_TOKENS = int(os.getenv('NOTES_PROMPT_TOKENS', 4500))
+COPILOT_PROMPT_TOKENS = int(os.getenv('COPILOT_PROMPT_TOKENS', 750))
+
+# Unpunctuated transcripts are split into pseudo-sentences of this many words
+MAX_SENTENCE_WORDS = 40
+
+# Weight kept by a word once a selected sentence covers it (favors coverage)
+REDUNDANCY_DECAY = 0.5
+
+# Only standalone tokens: "5 mm", "uh-oh" and "Erm-Hotel" stay
+FILLER_RE = re.compile(r"(?:,\s*)?(?<![\w-])(?:u+h*m+|u+h+|e+r+m+)(?![\w-])(?:\s*,)?", re.IGNORECASE)
+FILLER_PHRASE_RE = re.compile(r"(?:,\s*)?\b(?:you know|i mean|basically|literally)\s*,", re.IGNORECASE)
+# "we need-- we want": the abandoned word goes, and so does the restarted one before it
+FALSE_START_RE = re.compile(r"\b(?:(\w+)\s+)?\w+--\s*(?=(\w+))")
+# A word said three or more times in a row, or a phrase repeated after a comma;
+# a plain double ("had had", "bye bye") is usually meant
+STUTTER_RE = re.compile(r"\b(\w+)(?:\s+\1\b){2,}", re.IGNORECASE)
+REPEAT_RE = re.compile(r"\b(\w+(?:\s+\w+){0,3})(?:,\s*\1\b)+", re.IGNORECASE)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further get got had has have having he her
+here hers him his how i if in into is it its itself just let me more most my no nor not now of off on once
+only or other our out over own really same she should so some such than that the their them then there these
+they this those through to too under until up very was we were what when where which while who whom why will
+with would you your going gonna want wanna thing things okay yeah right well one two lot kind sort
+""".split())
+
+
+@lru_cache(maxsize=8)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def count_tokens(text, model='gpt-4'):
+    """Prompt tokens for text (tiktoken if installed, else an estimate)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, round(len(text) / 4)) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def strip_disfluencies(text):
+    """Remove fillers, stutters ("the the the"), false starts and repeated phrases"""
+    text = FILLER_RE.sub(' ', text)
+    text = FILLER_PHRASE_RE.sub(' ', text)
+    text = FALSE_START_RE.sub(_drop_false_start, text)
+    text = STUTTER_RE.sub(r'\1', text)
+    text = REPEAT_RE.sub(r'\1', text)
+    text = re.sub(r"\s+([,.!?])", r"\1", text)
+    text = re.sub(r"([,.!?])[,.]+", r"\1", text)
+    text = re.sub(r"^[\s,.]+", '', text)
+    return re.sub(r"\s+", ' ', text).strip()
+
+
+def _drop_false_start(match):
+    before, after = match.group(1), match.group(2)
+    if before is None or before.lower() == after.lower():
+        return ''
+    return before + ' '
+
+
+def split_sentences(text):
+    """Sentences, with long unpunctuated runs split into fixed-size pieces"""
+    sentences = []
+    for sentence in SENTENCE_RE.split(text):
+        words = sentence.split()
+        for i in range(0, len(words), MAX_SENTENCE_WORDS):
+            piece = ' '.join(words[i:i + MAX_SENTENCE_WORDS])
+            if piece:
+                sentences.append(piece[0].upper() + piece[1:])
+    return sentences
+
+
+def dedupe_sentences(sentences):
+    """Drop sentences whose words repeat an earlier sentence"""
+    seen = set()
+    unique = []
+    for sentence in sentences:
+        key = ' '.join(WORD_RE.findall(sentence.lower()))
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(sentence)
+    return unique
+
+
+def _content_words(sentence):
+    return [w for w in WORD_RE.findall(sentence.lower()) if len(w) > 2 and w not in STOPWORDS]
+
+
+def select_sentences(sentences, token_counts, max_tokens):
+    """
+    Pick the most information-dense sentences that fit the budget
+    A word's weight is log(1 + frequency) x idf, so topic terms count more
+    than one-off words or words in every sentence. A sentence's score is the
+    weight of its distinct words per token; once a sentence is picked its
+    words lose weight so later picks cover other parts of the video.
+    Args:
+        sentences: Sentences in transcript order
+        token_counts: Tokens per sentence
+        max_tokens: Budget
+    Returns:
+        Indices of the kept sentences, in transcript order
+    """
+    words = [set(_content_words(s)) for s in sentences]
+    frequency = Counter(w for s in sentences for w in _content_words(s))
+    document_frequency = Counter(w for ws in words for w in ws)
+    n = len(sentences)
+    weight = {
+        w: math.log1p(frequency[w]) * math.log(1 + n / document_frequency[w])
+        for w in document_frequency
+    }
+
+    def score(i):
+        return sum(weight[w] for w in words[i]) / max(token_counts[i], 1)
+
+    # Lazy greedy: scores only drop as words get covered, so a popped entry
+    # whose refreshed score still beats the next best is the true maximum
+    heap = [(-score(i), i) for i in range(n)]
+    heapq.heapify(heap)
+    kept = []
+    used = 0
+    while heap:
+        _, i = heapq.heappop(heap)
+        current = score(i)
+        if heap and current < -heap[0][0]:
+            heapq.heappush(heap, (-current, i))
+            continue
+        if current <= 0:
+            break  # Only filler left
+        if used + token_counts[i] > max_tokens:
+            continue
+        kept.append(i)
+        used += token_counts[i]
+        for w in words[i]:
+            weight[w] *= REDUNDANCY_DECAY
+    return sorted(kept)
+
+
+def _rank_chunks(sentences, token_counts, max_tokens):
+    """
+    Chunk-level selection with the NumPy ranker
+    Returns:
+        (kept sentence indices, ranking) or (None, None) without NumPy
+    """
+    try:
+        from chunk_ranker import group_chunks, rank_chunks
+    except ImportError:
+        return None, None
+
+    chunks = group_chunks(token_counts)
+    texts = [' '.join(sentences[first:end]) for first, end in chunks]
+    ranking = rank_chunks(
+        texts,
+        [sum(token_counts[first:end]) for first, end in chunks],
+        max_tokens,
+        stopwords=STOPWORDS
+    )
+    for entry, (first, end), chunk_text in zip(ranking['chunks'], chunks, texts):
+        entry['sentences'] = [first, end]
+        entry['preview'] = chunk_text[:80]
+    kept = [i for c in ranking['selected'] for i in range(*chunks[c])]
+    return kept, ranking
+
+
+def compact_transcript(text, max_tokens, model='gpt-4', consumer='notes'):
+    """
+    Compact a transcript to fit a prompt token budget
+    Args:
+        text: Transcript text
+        max_tokens: Token budget for the transcript part of the prompt
+        model: Model whose tokenizer counts tokens
+        consumer: Label for logs and metrics (e.g. 'notes', 'copilot')
+    Returns:
+        Dict with text, original_tokens, tokens, tokens_saved,
+        sentences_kept, sentences_total, selected (True if sentences
+        had to be dropped to fit the budget) and ranking (the chunk ranking
+        behind the selection, None if not ranked with NumPy)
+    """
+    with stage('compact_transcript'):
+        original_tokens = count_tokens(text, model)
+
+        sentences = dedupe_sentences(split_sentences(strip_disfluencies(text)))
+        compacted = ' '.join(sentences)
+        tokens = count_tokens(compacted, model)
+        total = len(sentences)
+
+        selected = tokens > max_tokens
+        ranking = None
+        if selected:
+            # Leading space: sentences are joined with one, which tokenizers fold in
+            token_counts = [count_tokens(' ' + s, model) for s in sentences]
+            kept, ranking = _rank_chunks(sentences, token_counts, max_tokens)
+            if kept is None:
+                kept = select_sentences(sentences, token_counts, max_tokens)
+            sentences = [sentences[i] for i in kept]
+            compacted = ' '.join(sentences)
+            tokens = count_tokens(compacted, model)
+
+    saved = original_tokens - tokens
+    PROMPT_TOKENS.inc(original_tokens, consumer=consumer, kind='original')
+    PROMPT_TOKENS.inc(tokens, consumer=consumer, kind='sent')
+    if saved > 0:
+        percent = 100 * saved / max(original_tokens, 1)
+        detail = f", kept {len(sentences)}/{total} sentences" if selected else ''
+        if ranking and ranking['keyphrases']:
+            detail += f", key: {', '.join(ranking['keyphrases'][:5])}"
+        print(f"✂️  Compacted transcript for {consumer}: {original_tokens} -> {tokens} tokens "
+              f"({saved} saved, {percent:.0f}%{detail})")
+
+    return {
+        'text': compacted,
+        'original_tokens': original_tokens,
+        'tokens': tokens,
+        'tokens_saved': saved,
+        'sentences_kept': len(sentences),
+        'sentences_total': total,
+        'selected': selected,
+        'ranking': ranking,
+    }
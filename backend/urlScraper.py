@@ -3,8 +3,11 @@ YouTube URL Scraper
 Extracts and validates YouTube video IDs from URLs for transcription
 """
 
+import os
 import re
 from urllib.parse import urlparse, parse_qs
+from metrics import DownloadTimer, timed
+from player_clients import get_client_strategy
 
 
 class YouTubeURLScraper:
@@ -14,6 +17,7 @@ class YouTubeURLScraper:
         self.video_id = None
         self.url = None
     
+    @timed('url_parse')
     def extract_video_id(self, url):
         """
         Extract video ID from various YouTube URL formats
@@ -76,6 +80,83 @@ class YouTubeURLScraper:
             return False
 
 
+def _ydl_base_opts(cookies_file=None):
+    """Shared yt-dlp options for metadata and audio downloads"""
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'nocheckcertificate': True,
+    }
+    
+    # Try the player client that has been fastest lately, then yt-dlp's defaults
+    # (android/ios don't support cookies)
+    with_cookies = bool(cookies_file and os.path.exists(cookies_file))
+    if with_cookies:
+        ydl_opts['cookiefile'] = cookies_file
+    ydl_opts['extractor_args'] = {'youtube': {'player_client': get_client_strategy().player_clients(with_cookies)}}
+    
+    return ydl_opts
+
+
+def get_video_info(url, cookies_file=None):
+    """
+    Fetch video metadata without downloading
+    Args:
+        url: YouTube URL
+        cookies_file: Optional path to cookies.txt file
+    Returns:
+        yt-dlp info dict (includes 'duration', 'title', 'live_status', ...)
+    """
+    with_cookies = bool(cookies_file and os.path.exists(cookies_file))
+    info, _ = get_client_strategy().extract(url, _ydl_base_opts(cookies_file), with_cookies)
+    return info
+
+
+def download_audio(url, output_dir=None, cookies_file=None):
+    """
+    Download the best audio stream of a video
+    Args:
+        url: YouTube URL
+        output_dir: Directory to save into; if None the shared audio cache is used
+                    and the returned file must not be deleted
+        cookies_file: Optional path to cookies.txt file
+    Returns:
+        Path to the downloaded audio file
+    """
+    if output_dir is None:
+        from audio_cache import get_audio_cache
+        video_id = YouTubeURLScraper().extract_video_id(url)
+        return get_audio_cache().get_or_download(
+            video_id, 'bestaudio', lambda temp_dir: _download_audio_to(url, temp_dir, cookies_file, video_id)
+        )
+    
+    return _download_audio_to(url, output_dir, cookies_file)
+
+
+def _download_audio_to(url, output_dir, cookies_file=None, video_id=None):
+    """Download the best audio stream into output_dir"""
+    from download_manager import get_download_manager
+    
+    ydl_opts = _ydl_base_opts(cookies_file)
+    ydl_opts.update({
+        'format': 'bestaudio[ext=m4a]/bestaudio/best',
+        'outtmpl': os.path.join(output_dir, '%(id)s.%(ext)s'),
+    })
+    
+    def fetch(ydl):
+        info = ydl.extract_info(url, download=True)
+        return ydl.prepare_filename(info)
+    
+    audio_path = get_download_manager().download(
+        url, ydl_opts, fetch, key=video_id and f"{video_id}-bestaudio", timer=DownloadTimer()
+    )
+    
+    if not os.path.exists(audio_path):
+        raise Exception("Failed to download audio")
+    
+    return audio_path
+
+
 def main():
     """Example usage"""
     scraper = YouTubeURLScraper()
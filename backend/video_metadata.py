@@ -0,0 +1,191 @@
+"""
+Video Metadata Service
+Caches yt-dlp info for each video (duration, title, captions, live status)
+so that validation and pre-flight checks don't repeat the extraction, and
+rejects videos the pipelines can't handle before anything is downloaded
+
+Environment:
+    METADATA_CACHE_TTL   Seconds a video's metadata stays cached (default 3600)
+    METADATA_CACHE_SIZE  Videos kept in the cache (default 1000)
+    MAX_VIDEO_SECONDS    Longest video accepted by the pipelines (default 10800, 0 = no limit)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import record_cache
+from single_flight import SingleFlight
+
+
+# Availability values yt-dlp reports for videos we can't download
+BLOCKED_AVAILABILITY = ('private', 'premium_only', 'subscriber_only', 'needs_auth')
+
+
+class VideoRejected(Exception):
+    """A video failed the pre-flight check"""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+def summarize_info(info):
+    """Reduce a yt-dlp info dict to the fields the API and pipelines use"""
+    subtitles = info.get('subtitles') or {}
+    automatic = info.get('automatic_captions') or {}
+    live_status = info.get('live_status') or ('is_live' if info.get('is_live') else None)
+
+    return {
+        'video_id': info.get('id'),
+        'title': info.get('title'),
+        'channel': info.get('channel') or info.get('uploader'),
+        'duration': info.get('duration'),
+        'live_status': live_status,
+        'is_live': live_status == 'is_live',
+        'is_upcoming': live_status == 'is_upcoming',
+        'availability': info.get('availability'),
+        'captions_available': bool(subtitles),
+        'auto_captions_available': bool(automatic),
+        'caption_languages': sorted(subtitles.keys()),
+    }
+
+
+class VideoMetadataService:
+    """TTL cache of video metadata with pre-flight checks"""
+
+    def __init__(self, ttl=None, max_entries=None, max_duration=None):
+        """
+        Args:
+            ttl: Seconds metadata stays valid (default from METADATA_CACHE_TTL)
+            max_entries: Cache size (default from METADATA_CACHE_SIZE)
+            max_duration: Longest accepted video in seconds (default from MAX_VIDEO_SECONDS)
+        """
+        self.ttl = float(ttl if ttl is not None else os.getenv('METADATA_CACHE_TTL', 3600))
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv('METADATA_CACHE_SIZE', 1000))
+        self.max_duration = float(max_duration if max_duration is not None else os.getenv('MAX_VIDEO_SECONDS', 10800))
+        self.cache = OrderedDict()  # video_id -> (expires_at, metadata)
+        self.lock = threading.Lock()
+        self.flights = SingleFlight('video-metadata')
+
+    def _cached(self, video_id):
+        with self.lock:
+            entry = self.cache.get(video_id)
+            if entry is None:
+                return None
+            expires_at, metadata = entry
+            if expires_at < time.monotonic():
+                del self.cache[video_id]
+                return None
+            self.cache.move_to_end(video_id)
+            return metadata
+
+    def _store(self, video_id, metadata):
+        with self.lock:
+            self.cache[video_id] = (time.monotonic() + self.ttl, metadata)
+            self.cache.move_to_end(video_id)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def get(self, video_id, cookies_file=None, admit=None, charge=None):
+        """
+        Metadata for a video, extracted with yt-dlp on a cache miss
+        Args:
+            video_id: YouTube video ID
+            cookies_file: Optional path to cookies.txt file
+            admit: Optional callable returning a context manager (e.g. a
+                   concurrency slot) entered only around an actual extraction
+            charge: Optional callable run by every caller on a cache miss,
+                    before joining a shared extraction (e.g. the caller's rate
+                    limit); its errors are the caller's own, never a follower's
+        Returns:
+            Dict from summarize_info()
+        """
+        metadata = self._cached(video_id)
+        record_cache('video_metadata', metadata is not None)
+        if metadata is not None:
+            return metadata
+        if charge is not None:
+            charge()
+
+        # Concurrent lookups of the same video share one extraction
+        metadata, _ = self.flights.do(video_id, self._extract, video_id, cookies_file, admit)
+        return metadata
+
+    def _extract(self, video_id, cookies_file, admit=None):
+        if admit is not None:
+            with admit():
+                return self._extract(video_id, cookies_file)
+
+        from urlScraper import get_video_info
+
+        try:
+            info = get_video_info(f"https://www.youtube.com/watch?v={video_id}", cookies_file=cookies_file)
+        except Exception as e:
+            error_msg = str(e)
+            if "Private video" in error_msg:
+                raise VideoRejected("This is a private video and cannot be accessed.", 'private')
+            if "Video unavailable" in error_msg:
+                raise VideoRejected("This video is unavailable. It may have been deleted or restricted.", 'unavailable')
+            if "Sign in" in error_msg or "not a bot" in error_msg:
+                raise Exception("YouTube is blocking this request. Please configure cookies authentication. See COOKIES.md for setup instructions.")
+            raise
+
+        metadata = summarize_info(info)
+        self._store(video_id, metadata)
+        return metadata
+
+    def check(self, video_id, cookies_file=None, admit=None, charge=None):
+        """
+        Pre-flight check run before a pipeline downloads anything
+        Args:
+            admit, charge: See get()
+        Returns:
+            The video's metadata
+        Raises:
+            VideoRejected: live, upcoming, private or over the duration limit
+        """
+        metadata = self.get(video_id, cookies_file, admit, charge)
+        self.rejection(metadata, raise_error=True)
+        return metadata
+
+    def rejection(self, metadata, raise_error=False):
+        """
+        Why the pipelines would reject a video
+        Returns:
+            (reason, message), or (None, None) if the video is accepted
+        """
+        reason, message = None, None
+        duration = metadata.get('duration')
+
+        if metadata.get('is_live'):
+            reason, message = 'live', "Cannot transcribe live streams. Please wait until the stream is finished."
+        elif metadata.get('is_upcoming'):
+            reason, message = 'upcoming', "This video is a scheduled premiere that hasn't started yet. Please try again after it airs."
+        elif metadata.get('availability') in BLOCKED_AVAILABILITY:
+            reason, message = metadata['availability'], f"This video is {metadata['availability']} and cannot be downloaded."
+        elif self.max_duration and duration and duration > self.max_duration:
+            reason, message = 'too_long', (
+                f"This video is {duration / 60:.0f} minutes long; "
+                f"the limit is {self.max_duration / 60:.0f} minutes."
+            )
+
+        if reason and raise_error:
+            print(f"⛔ Rejected {metadata.get('video_id')}: {reason}")
+            raise VideoRejected(message, reason)
+        return reason, message
+
+
+# Global instance
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_metadata_service():
+    """Get or create the global video metadata service"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = VideoMetadataService()
+        return _service
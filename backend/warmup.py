@@ -0,0 +1,148 @@
+"""
+Startup Preload and Warmup
+- preload_imports(): import the heavy libraries the app defers (yt-dlp,
+  openai, requests) so the first request doesn't pay for them
+- preload_models(): load PyTorch Whisper weights in the gunicorn master
+  before workers fork, so every worker shares them copy-on-write
+- start_warmup(): per worker, run a transcription on a couple of seconds of
+  silence so the first real request doesn't pay for lazy init and kernel
+  selection; /api/ready reports ready once this has finished
+
+Environment:
+    WHISPER_PRELOAD_MODELS  Comma-separated models to preload and warm
+                            (default: the policy's pick for English, e.g. base.en)
+    WHISPER_WARMUP          Set to 0 to skip the warmup transcription
+"""
+
+import os
+import threading
+import time
+
+from metrics import record_stage
+
+
+WARMUP_SECONDS = 2  # Length of the silent clip
+
+# Imported lazily by the app; loaded here ahead of the first request
+HEAVY_MODULES = ('yt_dlp', 'openai', 'httpx', 'requests')
+
+_lock = threading.Lock()
+_state = {'status': 'cold', 'ready': False, 'models': [], 'seconds': None, 'error': None}
+
+
+def _set_state(**changes):
+    with _lock:
+        _state.update(changes)
+
+
+def _whisper_available():
+    try:
+        from whisper_engines import engine_available
+        return engine_available()
+    except (ImportError, ValueError):
+        return False
+
+
+def preload_model_sizes():
+    """Models to preload and warm"""
+    configured = os.getenv('WHISPER_PRELOAD_MODELS')
+    if configured:
+        return [m.strip() for m in configured.split(',') if m.strip()]
+
+    # process-free defaults to English, so warm what the policy picks for it
+    from model_policy import get_model_policy
+    return [get_model_policy().select(language='en', job_id='preload')]
+
+
+def preload_imports():
+    """
+    Import the libraries the app imports lazily
+    Returns:
+        {module: seconds} for the modules that were imported
+    """
+    import importlib
+    import sys
+
+    timings = {}
+    for name in HEAVY_MODULES:
+        if name in sys.modules:
+            continue
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        timings[name] = round(time.perf_counter() - start, 3)
+    if timings:
+        print(f"✓ Preloaded {', '.join(f'{m} ({s:.2f}s)' for m, s in timings.items())}")
+    return timings
+
+
+def preload_models():
+    """
+    Load Whisper weights before forking (called from the gunicorn master)
+    Only the PyTorch engine is preloaded: CTranslate2 starts native threads
+    that don't survive fork, so faster-whisper loads in each worker instead
+    Returns:
+        List of preloaded model names
+    """
+    if not _whisper_available():
+        return []
+
+    from whisper_engines import get_engine, get_engine_name
+    if get_engine_name() != 'whisper':
+        print(f"ℹ️  Not preloading {get_engine_name()} models in the master (loaded per worker)")
+        return []
+
+    start = time.perf_counter()
+    sizes = preload_model_sizes()
+    for size in sizes:
+        get_engine(size)
+    print(f"✓ Preloaded Whisper {', '.join(sizes)} in {time.perf_counter() - start:.1f}s (shared with workers)")
+    return sizes
+
+
+def _warm():
+    start = time.perf_counter()
+    models = []
+    try:
+        preload_imports()
+
+        if _whisper_available() and os.getenv('WHISPER_WARMUP', '1') != '0':
+            import numpy as np
+            from concurrency import run_cpu_bound
+            from whisper_engines import SAMPLE_RATE, get_engine
+
+            silence = np.zeros(SAMPLE_RATE * WARMUP_SECONDS, dtype=np.float32)
+            for size in preload_model_sizes():
+                engine = get_engine(size)
+                run_cpu_bound(engine.transcribe, silence, language='en')
+                models.append(size)
+
+        seconds = time.perf_counter() - start
+        record_stage('warmup', seconds)
+        _set_state(status='ready', ready=True, models=models, seconds=round(seconds, 2))
+        print(f"✅ Worker {os.getpid()} warm in {seconds:.1f}s")
+    except Exception as e:
+        # The OpenAI-backed endpoints still work, so serve traffic anyway
+        _set_state(status='degraded', ready=True, models=models, error=str(e))
+        print(f"⚠️  Warmup failed in worker {os.getpid()}: {e}")
+
+
+def start_warmup():
+    """
+    Start warming this worker in the background (no-op if already started)
+    Returns:
+        Current readiness state
+    """
+    with _lock:
+        if _state['status'] == 'cold':
+            _state['status'] = 'warming'
+            threading.Thread(target=_warm, name='warmup', daemon=True).start()
+    return readiness()
+
+
+def readiness():
+    """Copy of the readiness state for /api/ready"""
+    with _lock:
+        return dict(_state, pid=os.getpid())
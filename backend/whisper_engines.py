@@ -0,0 +1,257 @@
+"""
+Whisper Inference Engines
+Common interface over the reference PyTorch whisper package and
+faster-whisper (CTranslate2), selectable per deployment with WHISPER_ENGINE
+"""
+
+import importlib.util
+import os
+import threading
+from metrics import record_cache
+
+
+SAMPLE_RATE = 16000
+
+DEFAULT_ENGINE = 'whisper'
+
+
+class WhisperEngine:
+    """
+    Base class for Whisper backends
+    Every engine returns the same result dict:
+        {'text': str, 'language': str, 'segments': [{'id', 'start', 'end', 'text', ...}]}
+    """
+
+    name = None
+    module = None
+
+    def __init__(self, model_size='base'):
+        self.model_size = model_size
+
+    def load_audio(self, audio_file):
+        """Decode an audio file to a 16 kHz mono float32 array"""
+        raise NotImplementedError
+
+    def transcribe(self, audio, **options):
+        """
+        Transcribe audio
+        Args:
+            audio: Path to audio file or 16 kHz float32 array
+            **options: Reference whisper options (language, task, beam_size,
+                       best_of, condition_on_previous_text, fp16, verbose)
+        Returns:
+            Result dict with 'text', 'language' and 'segments'
+        """
+        raise NotImplementedError
+
+
+class PyTorchWhisperEngine(WhisperEngine):
+    """
+    Reference openai-whisper implementation (PyTorch)
+    Set WHISPER_QUANTIZE=int8 to run the linear layers with dynamic int8
+    quantization on CPU; the quantized model is cached on disk
+    """
+
+    name = 'whisper'
+    module = 'whisper'
+
+    def __init__(self, model_size='base', quantize=None):
+        super().__init__(model_size)
+        import whisper
+
+        self._whisper = whisper
+        self.quantize = quantize if quantize is not None else os.getenv('WHISPER_QUANTIZE') or None
+
+        if self.quantize == 'int8':
+            self.model = self._load_quantized(model_size)
+        elif self.quantize:
+            raise ValueError(f"Unsupported WHISPER_QUANTIZE '{self.quantize}'. Only 'int8' is supported")
+        else:
+            self.model = whisper.load_model(model_size, device=os.getenv('WHISPER_DEVICE'))
+
+    def _load_quantized(self, model_size):
+        """Load the int8 model from the disk cache, quantizing it on first use"""
+        import torch
+
+        cache_dir = os.getenv(
+            'WHISPER_QUANTIZED_CACHE',
+            os.path.join(os.path.expanduser('~'), '.cache', 'fastscribe')
+        )
+        # Pickled modules are tied to the torch and whisper versions that wrote them
+        filename = f"whisper-{model_size}-int8-torch{torch.__version__}-{self._whisper.__version__}.pt"
+        path = os.path.join(cache_dir, filename.replace('+', '_'))
+
+        if os.path.exists(path):
+            print(f"Loading quantized Whisper {model_size} model from {path}")
+            return torch.load(path, map_location='cpu', weights_only=False)
+
+        print(f"Quantizing Whisper {model_size} model to int8 (first run only)...")
+        model = quantize_linear_int8(self._whisper.load_model(model_size, device='cpu'))
+
+        # Write to a temp file and rename so concurrent starts never read a partial file
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(model, temp_path)
+        os.replace(temp_path, path)
+        print(f"✓ Quantized model cached at {path}")
+
+        return model
+
+    def load_audio(self, audio_file):
+        return self._whisper.load_audio(audio_file)
+
+    def transcribe(self, audio, **options):
+        options.setdefault('fp16', False)
+        result = self.model.transcribe(audio, **options)
+        return {
+            'text': result['text'],
+            'language': result.get('language'),
+            'segments': [_segment_dict(s) for s in result.get('segments', [])]
+        }
+
+
+class FasterWhisperEngine(WhisperEngine):
+    """CTranslate2 implementation via faster-whisper (int8 on CPU by default)"""
+
+    name = 'faster-whisper'
+    module = 'faster_whisper'
+
+    def __init__(self, model_size='base'):
+        super().__init__(model_size)
+        from faster_whisper import WhisperModel, decode_audio
+
+        self._decode_audio = decode_audio
+        self.compute_type = os.getenv('FASTER_WHISPER_COMPUTE_TYPE', 'int8')
+        self.model = WhisperModel(
+            model_size,
+            device=os.getenv('WHISPER_DEVICE', 'cpu'),
+            compute_type=self.compute_type,
+            cpu_threads=int(os.getenv('FASTER_WHISPER_CPU_THREADS', 0))
+        )
+
+    def load_audio(self, audio_file):
+        return self._decode_audio(audio_file, sampling_rate=SAMPLE_RATE)
+
+    def transcribe(self, audio, **options):
+        # Reference whisper decodes greedily unless beam_size is given
+        segments, info = self.model.transcribe(
+            audio,
+            language=options.get('language'),
+            task=options.get('task', 'transcribe'),
+            beam_size=options.get('beam_size') or 1,
+            best_of=options.get('best_of') or 5,
+            condition_on_previous_text=options.get('condition_on_previous_text', True)
+        )
+
+        # Segments are generated lazily as decoding progresses
+        segment_list = [
+            _segment_dict({
+                'id': s.id,
+                'start': s.start,
+                'end': s.end,
+                'text': s.text,
+                'avg_logprob': s.avg_logprob,
+                'no_speech_prob': s.no_speech_prob,
+            })
+            for s in segments
+        ]
+
+        return {
+            'text': ''.join(s['text'] for s in segment_list),
+            'language': info.language,
+            'segments': segment_list
+        }
+
+
+def quantize_linear_int8(model):
+    """
+    Apply dynamic int8 quantization to every linear layer of a Whisper model
+    Weights are stored as int8 and activations are quantized on the fly,
+    so CPU matmuls run in int8 instead of fp32
+    """
+    import torch
+
+    # whisper.model.Linear only casts its weight to the input dtype; turn it
+    # back into a plain nn.Linear so quantize_dynamic swaps it
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+def _segment_dict(segment):
+    """Normalize a segment to the fields shared by every engine"""
+    return {
+        'id': segment['id'],
+        'start': float(segment['start']),
+        'end': float(segment['end']),
+        'text': segment['text'],
+        'avg_logprob': segment.get('avg_logprob'),
+        'no_speech_prob': segment.get('no_speech_prob'),
+    }
+
+
+ENGINES = {
+    PyTorchWhisperEngine.name: PyTorchWhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+# Loaded engines by (engine name, model size); each model loads under its own
+# lock so a cold load doesn't block requests for models already in memory
+_engines = {}
+_engine_locks = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine_name():
+    """Engine configured for this deployment (WHISPER_ENGINE)"""
+    name = os.getenv('WHISPER_ENGINE', DEFAULT_ENGINE)
+    if name not in ENGINES:
+        raise ValueError(f"Unknown WHISPER_ENGINE '{name}'. Choose from {sorted(ENGINES)}")
+    return name
+
+
+def engine_available(engine=None):
+    """Check if the package behind an engine is installed (without importing it)"""
+    engine = engine or get_engine_name()
+    return importlib.util.find_spec(ENGINES[engine].module) is not None
+
+
+def get_engine(model_size='base', engine=None):
+    """
+    Get or load a Whisper engine (loaded models are kept in memory)
+    Args:
+        model_size: Whisper model name ('tiny', 'base.en', ...)
+        engine: Engine name, defaults to WHISPER_ENGINE
+    Returns:
+        WhisperEngine instance
+    """
+    engine = engine or get_engine_name()
+    key = (engine, model_size)
+
+    with _engines_lock:
+        loaded = _engines.get(key)
+        load_lock = _engine_locks.setdefault(key, threading.Lock())
+    record_cache('whisper_model', loaded is not None)
+    if loaded is not None:
+        return loaded
+
+    with load_lock:
+        with _engines_lock:
+            loaded = _engines.get(key)
+        if loaded is None:
+            print(f"Loading Whisper {model_size} model ({engine})...")
+            loaded = ENGINES[engine](model_size)
+            with _engines_lock:
+                _engines[key] = loaded
+            print(f"✓ Whisper {model_size} model loaded ({engine})")
+        return loaded
+
+
+def loaded_engines():
+    """Names of loaded models, e.g. ['faster-whisper:base']"""
+    with _engines_lock:
+        return sorted(f"{engine}:{size}" for engine, size in _engines)
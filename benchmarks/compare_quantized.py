@@ -0,0 +1,122 @@
+"""
+Accuracy/Speed Comparison: fp32 vs dynamic int8 PyTorch Whisper
+Transcribes every fixture with both models and reports word error rate
+against the reference text and wall-clock speedup
+
+Usage: python compare_quantized.py [model_size] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'backend'))
+sys.path.insert(0, os.path.join(BENCH_DIR, 'fixtures'))
+
+from whisper_engines import PyTorchWhisperEngine
+from make_fixtures import fixture_path, load_manifest, make_fixtures
+
+
+def normalize_words(text):
+    """Lowercase and strip punctuation for WER"""
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by reference length"""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+
+    return previous[-1] / max(len(ref), 1)
+
+
+def run_engine(engine, audio, language):
+    """Transcribe once, returning (text, seconds)"""
+    start = time.perf_counter()
+    result = engine.transcribe(audio, language=language, fp16=False)
+    return result['text'], time.perf_counter() - start
+
+
+def compare(model_size='base'):
+    """
+    Run the comparison over all fixtures
+    Returns:
+        Dict with per-fixture rows and totals
+    """
+    make_fixtures()
+    manifest = load_manifest()
+
+    engines = {
+        'fp32': PyTorchWhisperEngine(model_size, quantize=False),
+        'int8': PyTorchWhisperEngine(model_size, quantize='int8'),
+    }
+
+    rows = []
+    for fixture in manifest['fixtures']:
+        audio = engines['fp32'].load_audio(fixture_path(fixture['id']))
+        row = {'id': fixture['id'], 'audio_seconds': len(audio) / manifest['sample_rate']}
+
+        for label, engine in engines.items():
+            # Warm run so one-off allocation costs don't skew the first fixture
+            if not rows:
+                run_engine(engine, audio, fixture['language'])
+            text, seconds = run_engine(engine, audio, fixture['language'])
+            row[f'{label}_seconds'] = seconds
+            row[f'{label}_wer'] = word_error_rate(fixture['text'], text)
+            row[f'{label}_text'] = text.strip()
+
+        rows.append(row)
+
+    totals = {
+        'fp32_seconds': sum(r['fp32_seconds'] for r in rows),
+        'int8_seconds': sum(r['int8_seconds'] for r in rows),
+        'fp32_wer': sum(r['fp32_wer'] for r in rows) / len(rows),
+        'int8_wer': sum(r['int8_wer'] for r in rows) / len(rows),
+    }
+    totals['speedup'] = totals['fp32_seconds'] / totals['int8_seconds']
+
+    return {'model_size': model_size, 'fixtures': rows, 'totals': totals}
+
+
+def print_report(report):
+    """Print a comparison table"""
+    print(f"\nWhisper {report['model_size']}: fp32 vs int8\n")
+    print(f"{'fixture':<18}{'audio':>8}{'fp32 s':>9}{'int8 s':>9}{'fp32 WER':>10}{'int8 WER':>10}")
+    for row in report['fixtures']:
+        print(f"{row['id']:<18}{row['audio_seconds']:>7.1f}s"
+              f"{row['fp32_seconds']:>9.2f}{row['int8_seconds']:>9.2f}"
+              f"{row['fp32_wer']:>10.1%}{row['int8_wer']:>10.1%}")
+
+    totals = report['totals']
+    print(f"\nTotal: fp32 {totals['fp32_seconds']:.2f}s, int8 {totals['int8_seconds']:.2f}s "
+          f"({totals['speedup']:.2f}x), mean WER {totals['fp32_wer']:.1%} -> {totals['int8_wer']:.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('model_size', nargs='?', default='base')
+    parser.add_argument('--json', help='Save the full report to this file')
+    args = parser.parse_args()
+
+    report = compare(args.model_size)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to: {args.json}")
@@ -0,0 +1,87 @@
+"""
+Compare Two Benchmark Result Files
+Prints per-endpoint and per-stage p50/p90 changes and flags regressions
+
+Usage: python compare_results.py results/<old>.json results/<new>.json [--threshold 0.10]
+Exits with status 1 if any p50/p90 got slower (or throughput dropped) by more than the threshold
+"""
+
+import argparse
+import json
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def change(old, new):
+    """Relative change, None if either side is missing"""
+    if not old or new is None:
+        return None
+    return (new - old) / old
+
+
+def compare(old, new, threshold):
+    """
+    Print a comparison table
+    Returns:
+        List of regression descriptions
+    """
+    regressions = []
+    print(f"Comparing {old['commit']} -> {new['commit']}\n")
+
+    for endpoint, new_result in new['endpoints'].items():
+        old_result = old['endpoints'].get(endpoint)
+        if not old_result or old_result.get('skipped') or new_result.get('skipped'):
+            print(f"{endpoint}: not comparable (missing or skipped)\n")
+            continue
+
+        delta = change(old_result['throughput_rpm'], new_result['throughput_rpm'])
+        delta_msg = f"{delta:+.1%}" if delta is not None else "n/a"
+        print(f"{endpoint}: throughput {old_result['throughput_rpm']:.1f} -> "
+              f"{new_result['throughput_rpm']:.1f} req/min ({delta_msg})")
+        if delta is not None and delta < -threshold:
+            regressions.append(f"{endpoint} throughput {delta:+.1%}")
+
+        stages = dict(new_result['stages'])
+        if new_result.get('total'):
+            stages['TOTAL'] = new_result['total']
+        old_stages = dict(old_result['stages'])
+        if old_result.get('total'):
+            old_stages['TOTAL'] = old_result['total']
+
+        for stage, stats in stages.items():
+            old_stats = old_stages.get(stage)
+            if not old_stats:
+                print(f"  {stage:<16} new stage")
+                continue
+            cells = []
+            for pct in ('p50', 'p90'):
+                pct_change = change(old_stats[pct], stats[pct])
+                flag = ''
+                if pct_change is not None and pct_change > threshold:
+                    flag = ' ⚠'
+                    regressions.append(f"{endpoint}/{stage} {pct} {pct_change:+.1%}")
+                change_msg = f"{pct_change:+.1%}" if pct_change is not None else "n/a"
+                cells.append(f"{pct} {old_stats[pct]:.3f}s -> {stats[pct]:.3f}s ({change_msg}){flag}")
+            print(f"  {stage:<16} " + '   '.join(cells))
+        print()
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare benchmark results')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown fraction')
+    args = parser.parse_args()
+
+    regressions = compare(load(args.old), load(args.new), args.threshold)
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        raise SystemExit(1)
+    print("No regressions above threshold")
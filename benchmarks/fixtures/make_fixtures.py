@@ -0,0 +1,87 @@
+"""
+Generate fixture audio for benchmarks
+Synthesizes every entry in manifest.json to a 16 kHz mono WAV with a
+local text-to-speech engine (espeak-ng, espeak or macOS say) and ffmpeg
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import wave
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_manifest():
+    """Load fixture definitions"""
+    with open(os.path.join(FIXTURES_DIR, 'manifest.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def fixture_path(fixture_id):
+    """Path of the generated WAV for a fixture"""
+    return os.path.join(FIXTURES_DIR, f"{fixture_id}.wav")
+
+
+def _tts_command(text, output_path):
+    """Build a TTS command for the first engine found on this machine"""
+    for engine in ('espeak-ng', 'espeak'):
+        if shutil.which(engine):
+            return [engine, '-s', '150', '-w', output_path, text]
+    if shutil.which('say'):
+        return ['say', '-o', output_path, '--data-format=LEI16@22050', text]
+    return None
+
+
+def make_fixtures(force=False):
+    """
+    Generate missing fixture WAVs
+    Args:
+        force: Regenerate files that already exist
+    Returns:
+        List of generated file paths
+    """
+    if not shutil.which('ffmpeg'):
+        raise RuntimeError("ffmpeg is required to generate fixtures")
+
+    manifest = load_manifest()
+    generated = []
+
+    for fixture in manifest['fixtures']:
+        output_path = fixture_path(fixture['id'])
+        if os.path.exists(output_path) and not force:
+            continue
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            raw_path = os.path.join(temp_dir, 'raw.wav')
+            command = _tts_command(fixture['text'], raw_path)
+            if command is None:
+                raise RuntimeError("No text-to-speech engine found. Install espeak-ng (or use macOS 'say')")
+
+            subprocess.run(command, check=True, capture_output=True)
+            subprocess.run([
+                'ffmpeg', '-y', '-loglevel', 'error', '-i', raw_path,
+                '-ac', '1', '-ar', str(manifest['sample_rate']), output_path
+            ], check=True)
+
+        print(f"✓ {output_path}")
+        generated.append(output_path)
+
+    return generated
+
+
+def make_silence(output_path, seconds, sample_rate=16000):
+    """Write a silent 16-bit mono WAV (no external tools needed)"""
+    with wave.open(output_path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(b'\x00\x00' * int(seconds * sample_rate))
+    return output_path
+
+
+if __name__ == '__main__':
+    make_fixtures(force='--force' in sys.argv)
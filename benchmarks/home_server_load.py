@@ -0,0 +1,63 @@
+"""
+Home Server Load Test
+Sends concurrent /transcribe requests with fixture audio and reports
+aggregate throughput, for comparing WHISPER_BATCHING on and off
+
+Usage: python home_server_load.py [--url http://localhost:8000] [--concurrency 8] [--rounds 2]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, 'fixtures'))
+
+from make_fixtures import fixture_path, load_manifest, make_fixtures
+
+
+def send(url, fixture, model):
+    """Post one fixture, returning request latency in seconds"""
+    data = {'language': fixture['language']}
+    if model:
+        data['model'] = model
+
+    start = time.perf_counter()
+    with open(fixture_path(fixture['id']), 'rb') as f:
+        response = requests.post(f"{url.rstrip('/')}/transcribe", files={'file': f}, data=data, timeout=600)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def run(url, concurrency, rounds, model=None):
+    """Run the load test and print throughput"""
+    make_fixtures()
+    fixtures = load_manifest()['fixtures']
+    jobs = [fixtures[i % len(fixtures)] for i in range(concurrency * rounds)]
+
+    health = requests.get(f"{url.rstrip('/')}/health", timeout=10).json()
+    print(f"Server: engine={health.get('engine')} batching={health.get('batching')}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(lambda fixture: send(url, fixture, model), jobs))
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(jobs)} jobs at concurrency {concurrency} in {elapsed:.1f}s")
+    print(f"Throughput: {len(jobs) / elapsed * 60:.1f} jobs/min")
+    print(f"Latency p50 {latencies[len(latencies) // 2]:.1f}s, max {latencies[-1]:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Home server load test')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--model', help='Force a model instead of the size policy')
+    args = parser.parse_args()
+
+    run(args.url, args.concurrency, args.rounds, args.model)
@@ -0,0 +1,106 @@
+"""
+Import-Time Profile
+Imports a backend module in a fresh interpreter with `python -X importtime`
+and reports the total time and the slowest imports, so startup regressions
+(e.g. a heavy library imported at module level again) are easy to spot
+
+Usage: python import_profile.py [--module app] [--top 15] [--budget 1.5] [--json out.json]
+Exits non-zero if the total import time exceeds --budget seconds
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, '..', 'backend')
+
+LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def profile_imports(module, runs=3):
+    """
+    Import a module with -X importtime (best of several runs)
+    Returns:
+        (total_seconds, [(name, self_seconds, cumulative_seconds, depth), ...])
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error'
+            raise RuntimeError(f"import {module} failed: {error}")
+
+        entries = []
+        for line in result.stderr.splitlines():
+            match = LINE_RE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                entries.append((name, int(self_us) / 1e6, int(cumulative_us) / 1e6, (len(indent) - 1) // 2))
+
+        total = next((cumulative for name, _, cumulative, depth in entries if name == module and depth == 0), None)
+        if total is None:
+            total = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    return best
+
+
+def top_level_packages(entries):
+    """Cumulative time per top-level package (first import of each)"""
+    packages = {}
+    for name, _, cumulative, depth in entries:
+        root = name.split('.')[0]
+        if depth <= 1 and root not in packages:
+            packages[root] = cumulative
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time profile of a backend module')
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--runs', type=int, default=3, help='Best of N fresh interpreters')
+    parser.add_argument('--budget', type=float, help='Fail if total import time exceeds this many seconds')
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+
+    try:
+        total, entries = profile_imports(args.module, args.runs)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    packages = sorted(top_level_packages(entries).items(), key=lambda item: -item[1])
+    slowest_self = sorted(entries, key=lambda e: -e[1])[:args.top]
+
+    print(f"import {args.module}: {total:.3f}s ({len(entries)} modules)\n")
+    print(f"  {'package':<32}{'cumulative':>12}")
+    for name, cumulative in packages[:args.top]:
+        print(f"  {name:<32}{cumulative:>11.3f}s")
+    print(f"\n  {'module (self time)':<32}{'self':>12}")
+    for name, self_seconds, _, _ in slowest_self:
+        print(f"  {name:<32}{self_seconds:>11.3f}s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'module': args.module,
+                'total': total,
+                'packages': dict(packages),
+                'modules': [{'name': n, 'self': s, 'cumulative': c} for n, s, c, _ in entries],
+            }, f, indent=2)
+
+    if args.budget is not None and total > args.budget:
+        print(f"\n❌ Import time {total:.3f}s exceeds budget {args.budget:.3f}s")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+End-to-End Pipeline Benchmark
+Runs the real backend/app.py endpoints in-process against offline
+stand-ins (fixture audio, mock OpenAI, mock copilot-api) and reports
+per-stage latency percentiles and throughput for each endpoint
+
+Usage: python pipeline_bench.py [--requests 20] [--concurrency 4] [--endpoints process-complete,transcribe]
+Results are saved to benchmarks/results/<commit>.json; compare two runs with compare_results.py
+"""
+
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, '..', 'backend')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stand_ins import Latency, fixture_texts, install_fake_yt_dlp, start_mock_server
+
+# (module, attribute path, stage name) wrapped with timers; times are inclusive
+STAGES = [
+    ('urlScraper', 'YouTubeURLScraper.extract_video_id', 'url_parse'),
+    ('transcriber', 'YouTubeTranscriber.transcribe_file', 'transcribe'),
+    ('local_whisper', 'LocalWhisperTranscriber.transcribe', 'local_whisper'),
+    ('createNotes', 'NotesCreator.create_notes', 'llm'),
+    ('copilot_flashcard_generator', 'CopilotFlashcardGenerator.generate_flashcards', 'copilot'),
+    ('formatNotes', 'NotesFormatter.parse_flashcards', 'parse'),
+]
+
+ENDPOINTS = ['process-complete', 'transcribe', 'create-flashcards', 'process-free']
+
+_current = threading.local()
+
+
+def _record(stage, seconds):
+    """Add a stage time to the request running on this thread"""
+    timings = getattr(_current, 'timings', None)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def _timed(stage, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _record(stage, time.perf_counter() - start)
+    return wrapper
+
+
+def instrument(fake_yt_dlp):
+    """Wrap pipeline stages (and the fake yt-dlp) with timers"""
+    import importlib
+
+    for module_name, attr_path, stage in STAGES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        owner_name, method_name = attr_path.split('.')
+        owner = getattr(module, owner_name)
+        setattr(owner, method_name, _timed(stage, getattr(owner, method_name)))
+
+    ydl = fake_yt_dlp.YoutubeDL
+    original_extract = ydl.extract_info
+
+    def extract_info(self, url, download=True):
+        stage = 'download' if download else 'extract'
+        start = time.perf_counter()
+        try:
+            return original_extract(self, url, download)
+        finally:
+            _record(stage, time.perf_counter() - start)
+
+    ydl.extract_info = extract_info
+    ydl.download = _timed('download', ydl.download)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """p50/p90/p99/mean of a list of seconds"""
+    return {
+        'count': len(samples),
+        'mean': sum(samples) / len(samples),
+        'p50': percentile(samples, 50),
+        'p90': percentile(samples, 90),
+        'p99': percentile(samples, 99),
+    }
+
+
+def _request_body(endpoint, index, transcript):
+    """Build a request; every request gets its own video id"""
+    url = f"https://www.youtube.com/watch?v=bn{index:09d}"
+    if endpoint == 'create-flashcards':
+        return {'transcript': transcript, 'style': 'flashcards'}
+    if endpoint == 'process-free':
+        return {'url': url, 'language': 'English'}
+    return {'url': url, 'style': 'flashcards'}
+
+
+def bench_endpoint(client, endpoint, requests_count, concurrency, transcript, offset):
+    """Run one endpoint and return its summary"""
+
+    def one(index):
+        _current.timings = {}
+        start = time.perf_counter()
+        response = client.post(f'/api/{endpoint}', json=_request_body(endpoint, offset + index, transcript))
+        total = time.perf_counter() - start
+        timings = _current.timings
+        _current.timings = None
+        return response.status_code, total, timings, response.get_json()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests_count)))
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r[0] == 200]
+    errors = [r for r in results if r[0] != 200]
+    if errors:
+        print(f"  ⚠ {len(errors)} errors, first: {errors[0][0]} {errors[0][3]}")
+
+    stages = {}
+    for _, _, timings, _ in ok:
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+
+    return {
+        'requests': requests_count,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'elapsed': elapsed,
+        'throughput_rpm': len(ok) / elapsed * 60,
+        'total': summarize([r[1] for r in ok]) if ok else None,
+        'stages': {stage: summarize(samples) for stage, samples in sorted(stages.items())},
+    }
+
+
+def git_commit():
+    """Short commit hash of the working tree (with -dirty suffix)"""
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BENCH_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_report(report):
+    """Print per-endpoint tables"""
+    for endpoint, result in report['endpoints'].items():
+        if result.get('skipped'):
+            print(f"\n{endpoint}: skipped ({result['skipped']})")
+            continue
+        total = result['total'] or {}
+        print(f"\n{endpoint}: {result['throughput_rpm']:.1f} req/min, {result['errors']} errors")
+        print(f"  {'stage':<16}{'p50':>9}{'p90':>9}{'p99':>9}")
+        rows = list(result['stages'].items()) + ([('TOTAL', total)] if total else [])
+        for stage, stats in rows:
+            print(f"  {stage:<16}{stats['p50']:>8.3f}s{stats['p90']:>8.3f}s{stats['p99']:>8.3f}s")
+
+
+def run(args):
+    latency = Latency(
+        whisper=args.whisper_latency,
+        chat=args.chat_latency,
+        copilot=args.copilot_latency,
+        extract=args.extract_latency,
+        download=args.download_latency
+    )
+    fake_yt_dlp = install_fake_yt_dlp(latency)
+    server, base_url = start_mock_server(latency)
+
+    os.environ['OPENAI_BASE_URL'] = f"{base_url}/v1"
+    os.environ['OPENAI_API_KEYS'] = 'bench-key-1,bench-key-2'
+    os.environ['COPILOT_API_URL'] = f"{base_url}/api"
+    # Fresh audio cache so every run measures real (fake) downloads
+    os.environ['AUDIO_CACHE_DIR'] = tempfile.mkdtemp(prefix='fastscribe-bench-audio-')
+    os.environ['DOWNLOAD_STATE_DIR'] = tempfile.mkdtemp(prefix='fastscribe-bench-downloads-')
+    # Fresh job store too, or finished results from the last run are served from it
+    os.environ['JOB_STORE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='fastscribe-bench-jobs-'), 'jobs.db')
+    os.environ.setdefault('DOWNLOAD_HOST_INTERVAL', '0')  # Measure the pipeline, not the pacing policy
+    os.environ.setdefault('RATE_LIMIT_PER_MINUTE', '0')   # Every test-client request comes from 127.0.0.1
+    os.chdir(BACKEND_DIR)
+
+    import app as app_module
+    instrument(fake_yt_dlp)
+    client = app_module.app.test_client()
+
+    transcript = ' '.join(fixture_texts()) * args.transcript_repeat
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': vars(args),
+        'endpoints': {},
+    }
+
+    for offset, endpoint in enumerate(args.endpoints.split(',')):
+        if endpoint == 'process-free' and not app_module.COPILOT_AVAILABLE:
+            report['endpoints'][endpoint] = {'skipped': 'local Whisper engine not installed'}
+            continue
+        print(f"Benchmarking /api/{endpoint} ({args.requests} requests, concurrency {args.concurrency})...")
+        report['endpoints'][endpoint] = bench_endpoint(
+            client, endpoint, args.requests, args.concurrency, transcript, offset * 100000
+        )
+
+    server.shutdown()
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FastScribe pipeline benchmark')
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--whisper-latency', type=float, default=1.0, help='Mock Whisper API seconds')
+    parser.add_argument('--chat-latency', type=float, default=3.0, help='Mock chat completion seconds')
+    parser.add_argument('--copilot-latency', type=float, default=0.5, help='Mock copilot-api seconds')
+    parser.add_argument('--extract-latency', type=float, default=0.5, help='Fake yt-dlp info extraction seconds')
+    parser.add_argument('--download-latency', type=float, default=1.0, help='Fake yt-dlp download seconds')
+    parser.add_argument('--transcript-repeat', type=int, default=5, help='Repeat fixture text for create-flashcards')
+    parser.add_argument('--output', help='Results file (default: results/<commit>.json)')
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to: {output}")
@@ -0,0 +1,240 @@
+"""
+Offline Stand-ins for Benchmarks
+- Mock OpenAI server (Whisper transcriptions + chat completions)
+- Mock copilot-api server
+- Fake yt_dlp module that serves fixture audio instead of YouTube
+
+Every stand-in sleeps for a configurable latency so pipeline numbers
+reflect realistic waiting without touching the network
+"""
+
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, 'fixtures'))
+
+from make_fixtures import FIXTURES_DIR, fixture_path, load_manifest, make_fixtures, make_silence
+
+
+class Latency:
+    """Latency settings in seconds, with +/- jitter as a fraction"""
+
+    def __init__(self, whisper=1.0, chat=3.0, copilot=0.5, extract=0.5, download=1.0, jitter=0.2):
+        self.whisper = whisper
+        self.chat = chat
+        self.copilot = copilot
+        self.extract = extract
+        self.download = download
+        self.jitter = jitter
+
+    def sleep(self, seconds):
+        """Sleep for a jittered latency"""
+        if seconds > 0:
+            time.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+def _fake_cards(count=12):
+    """Flashcard text in the Q:/A: format both generators parse"""
+    return '\n\n'.join(
+        f"Q: What is benchmark concept {i}?\nA: Concept {i} is a placeholder answer used for timing."
+        for i in range(1, count + 1)
+    )
+
+
+def fixture_texts():
+    """Reference texts used as fake transcripts"""
+    return [f['text'] for f in load_manifest()['fixtures']]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes for the mock OpenAI and copilot-api servers"""
+
+    latency = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+
+        if self.path.endswith('/audio/transcriptions'):
+            self.latency.sleep(self.latency.whisper)
+            text = random.choice(fixture_texts())
+            match = re.search(rb'name="response_format"\r\n\r\n(\w+)', body)
+            response_format = match.group(1).decode() if match else 'json'
+            if response_format == 'text':
+                return self._send(200, text, 'text/plain')
+            duration = len(text.split()) / 2.5
+            return self._send(200, json.dumps({
+                'text': text,
+                'language': 'english',
+                'duration': duration,
+                'segments': [{'id': 0, 'start': 0.0, 'end': duration, 'text': text}]
+            }))
+
+        if self.path.endswith('/chat/completions'):
+            self.latency.sleep(self.latency.chat)
+            request_body = json.loads(body or b'{}')
+            content = _fake_cards()
+            return self._send(200, json.dumps({
+                'id': 'chatcmpl-bench',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request_body.get('model', 'gpt-4'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {
+                    'prompt_tokens': length // 4,
+                    'completion_tokens': len(content) // 4,
+                    'total_tokens': (length + len(content)) // 4
+                }
+            }))
+
+        if self.path.rstrip('/').endswith('/api'):
+            self.latency.sleep(self.latency.copilot)
+            return self._send(200, _fake_cards(), 'text/plain')
+
+        self._send(404, json.dumps({'error': f'Unknown path {self.path}'}))
+
+
+def start_mock_server(latency, port=0):
+    """
+    Start the mock OpenAI + copilot-api server in a background thread
+    Returns:
+        (server, base_url)
+    """
+    handler = type('BenchHandler', (_Handler,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def fixture_audio_files():
+    """Speech fixtures if they can be generated, otherwise silent clips"""
+    try:
+        make_fixtures()
+        return [fixture_path(f['id']) for f in load_manifest()['fixtures']]
+    except (RuntimeError, OSError):
+        print("⚠ No TTS/ffmpeg available, using silent fixture audio")
+        return [
+            make_silence(os.path.join(FIXTURES_DIR, f'silence_{seconds}s.wav'), seconds)
+            for seconds in (20, 40)
+        ]
+
+
+class DownloadError(Exception):
+    """Stand-in for yt_dlp.utils.DownloadError"""
+
+
+class FakeYoutubeDL:
+    """Serves fixture audio for any video id, honoring outtmpl and progress hooks"""
+
+    files = []
+    latency = None
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def _video_id(self, url):
+        match = re.search(r'(?:v=|youtu\.be/|embed/)([\w-]+)', url)
+        return match.group(1) if match else url
+
+    def _fixture(self, video_id):
+        return self.files[sum(map(ord, video_id)) % len(self.files)]
+
+    def _info(self, url):
+        video_id = self._video_id(url)
+        path = self._fixture(video_id)
+        duration = os.path.getsize(path) / 32000  # 16 kHz 16-bit mono
+        return {
+            'id': video_id,
+            'title': f'Benchmark video {video_id}',
+            'duration': duration,
+            'live_status': 'not_live',
+            'availability': 'public',
+            'is_live': False,
+            'ext': 'wav',
+            'formats': [{'format_id': 'bench', 'acodec': 'pcm', 'ext': 'wav'}],
+            'subtitles': {},
+            'automatic_captions': {},
+        }
+
+    def prepare_filename(self, info):
+        template = self.params.get('outtmpl', '%(id)s.%(ext)s')
+        if isinstance(template, dict):
+            template = template.get('default')
+        filename = template % {'id': info['id'], 'ext': info['ext'], 'title': info['title']}
+        return os.path.join(self.params.get('paths', {}).get('home', ''), filename)
+
+    def extract_info(self, url, download=True):
+        self.latency.sleep(self.latency.extract)
+        info = self._info(url)
+        if download:
+            self._download(info)
+        return info
+
+    def download(self, urls):
+        for url in urls:
+            self._download(self._info(url))
+        return 0
+
+    def _download(self, info):
+        self.latency.sleep(self.latency.download)
+
+        # Name the file the way FFmpegExtractAudio would
+        for pp in self.params.get('postprocessors', []):
+            if pp.get('key') == 'FFmpegExtractAudio':
+                info['ext'] = pp.get('preferredcodec', info['ext'])
+
+        filename = self.prepare_filename(info)
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        shutil.copyfile(self._fixture(info['id']), filename)
+
+        info['filepath'] = filename
+        for hook in self.params.get('progress_hooks', []):
+            hook({'status': 'finished', 'filename': filename, 'info_dict': info})
+        for hook in self.params.get('postprocessor_hooks', []):
+            hook({'status': 'started', 'postprocessor': 'FFmpegExtractAudio', 'info_dict': info})
+            hook({'status': 'finished', 'postprocessor': 'FFmpegExtractAudio', 'info_dict': info})
+
+
+def install_fake_yt_dlp(latency):
+    """Replace the yt_dlp module with the fixture-backed stand-in"""
+    FakeYoutubeDL.files = fixture_audio_files()
+    FakeYoutubeDL.latency = latency
+
+    module = types.ModuleType('yt_dlp')
+    module.YoutubeDL = FakeYoutubeDL
+    module.utils = types.SimpleNamespace(DownloadError=DownloadError)
+    sys.modules['yt_dlp'] = module
+    sys.modules['yt_dlp.utils'] = module.utils
+    return module
@@ -0,0 +1,264 @@
+"""
+Cross-Request Batched Whisper Inference
+Collects 30-second audio windows from every in-flight /transcribe job and
+runs them through the encoder and decoder together, so concurrent jobs
+share each forward pass instead of queuing behind each other
+
+Windows overlap by WHISPER_BATCH_OVERLAP seconds (default 5) and are
+decoded with timestamps. Segments cut off at a window edge are dropped and
+taken from the next window instead, so words at the edges survive and
+segment times keep Whisper's 20 ms resolution.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import torch
+import whisper
+
+# Whisper's silence rule (same defaults as whisper.transcribe)
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+# Seconds per timestamp token
+TIME_PRECISION = 0.02
+
+OVERLAP_SECONDS = float(os.getenv('WHISPER_BATCH_OVERLAP', 5))
+
+# A segment ending this close to a window's end may be cut mid-word
+EDGE_SECONDS = 1.0
+
+
+class _Window:
+    """One 30-second slice of a job's audio waiting to be decoded"""
+
+    def __init__(self, audio, offset, options_key):
+        self.audio = audio
+        self.offset = offset
+        self.options_key = options_key
+        self.future = Future()
+
+
+class BatchScheduler:
+    """
+    Batch decoding scheduler for a PyTorch Whisper model
+
+    Windows are taken round-robin across jobs, so a long video can't starve
+    a short one, and each job's windows are decoded in order. A batch is
+    sent as soon as it is full or max_delay has passed since work arrived.
+
+    Windows are decoded independently, without conditioning on previous
+    text. Fast requests decode greedily, the rest with beam search.
+
+    Every forward pass, including language detection, runs on the worker
+    thread: whisper.decode installs kv-cache hooks on the shared decoder, so
+    two passes on the model at once would corrupt each other.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_delay=0.05):
+        """
+        Initialize scheduler
+        Args:
+            model: Loaded whisper model (whisper.model.Whisper)
+            max_batch_size: Maximum windows per forward pass
+            max_delay: Seconds to wait for more windows before sending a partial batch
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        # job id -> deque of pending windows (insertion order = round-robin order)
+        self.jobs = OrderedDict()
+        self.pending = 0
+        self.detections = deque()  # (first window audio, Future) for language detection
+        self.cond = threading.Condition()
+        self.next_job_id = 0
+
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def transcribe(self, audio, language=None, task='transcribe', fast=False):
+        """
+        Transcribe a 16 kHz float32 audio array through the shared batches
+        Args:
+            audio: 16 kHz float32 audio
+            language: Language code (detected from the first window if None)
+            task: 'transcribe' or 'translate'
+            fast: Greedy decoding instead of beam search (5 beams)
+        Returns:
+            Result dict with 'text', 'language' and 'segments'
+        """
+        sample_rate = whisper.audio.SAMPLE_RATE
+        n_samples = whisper.audio.N_SAMPLES
+        stride = n_samples - int(min(OVERLAP_SECONDS, whisper.audio.CHUNK_LENGTH / 2) * sample_rate)
+        duration = len(audio) / sample_rate
+        offsets = list(range(0, max(len(audio) - n_samples, 0) + stride, stride)) if len(audio) else []
+        if not offsets:
+            return {'text': '', 'language': language, 'segments': []}
+
+        if not self.model.is_multilingual:
+            language = 'en'
+        elif not language:
+            language = self._detect_language(audio[:n_samples])
+
+        options_key = (language, task, None if fast else 5)
+        windows = [_Window(audio[o:o + n_samples], o / sample_rate, options_key) for o in offsets]
+        with self.cond:
+            job_id = self.next_job_id
+            self.next_job_id += 1
+            self.jobs[job_id] = deque(windows)
+            self.pending += len(windows)
+            self.cond.notify()
+
+        tokenizer = whisper.tokenizer.get_tokenizer(
+            self.model.is_multilingual,
+            num_languages=self.model.num_languages,
+            language=language,
+            task=task
+        )
+
+        # Stitch: keep each window's complete segments that start after the last kept one
+        segments = []
+        last_end = 0.0
+        for index, window in enumerate(windows):
+            result = window.future.result()
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                continue
+            window_end = min(window.offset + whisper.audio.CHUNK_LENGTH, duration)
+            next_offset = windows[index + 1].offset if index + 1 < len(windows) else None
+            for start, end, text, complete in self._window_segments(result.tokens, tokenizer, window.offset, window_end):
+                if start < last_end - TIME_PRECISION:
+                    continue
+                cut = not complete or end > window_end - EDGE_SECONDS
+                if cut and next_offset is not None and start >= next_offset:
+                    break  # The next window has this segment whole
+                segments.append({
+                    'id': len(segments),
+                    'start': start,
+                    'end': end,
+                    'text': text,
+                    'avg_logprob': result.avg_logprob,
+                    'no_speech_prob': result.no_speech_prob,
+                })
+                last_end = end
+
+        return {
+            'text': ''.join(s['text'] for s in segments),
+            'language': language,
+            'segments': segments
+        }
+
+    @staticmethod
+    def _window_segments(tokens, tokenizer, offset, window_end):
+        """
+        Split a window's decoded tokens into timestamped segments
+        Returns:
+            [(start, end, text, complete), ...] in seconds from the start of the
+            audio; complete is False for trailing text without a closing timestamp
+        """
+        segments = []
+        start = None
+        text_tokens = []
+        for token in tokens:
+            if token >= tokenizer.timestamp_begin:
+                time_ = offset + (token - tokenizer.timestamp_begin) * TIME_PRECISION
+                if start is not None and text_tokens:
+                    segments.append((round(start, 2), round(min(time_, window_end), 2),
+                                     tokenizer.decode(text_tokens), True))
+                    start, text_tokens = None, []
+                else:
+                    start = time_
+            elif token < tokenizer.eot:
+                text_tokens.append(token)
+        if text_tokens:
+            start = offset if start is None else start
+            segments.append((round(start, 2), round(window_end, 2), tokenizer.decode(text_tokens), False))
+        return segments
+
+    def _mel(self, audio):
+        """Log-mel spectrogram of one window, padded to 30 seconds"""
+        return whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=self.model.dims.n_mels)
+
+    def _detect_language(self, audio):
+        """Detect the language from a job's first window (on the worker thread)"""
+        future = Future()
+        with self.cond:
+            self.detections.append((audio, future))
+            self.cond.notify()
+        return future.result()
+
+    def _run_detections(self, detections):
+        for audio, future in detections:
+            try:
+                with torch.no_grad():
+                    _, probs = self.model.detect_language(self._mel(audio).to(self.model.device))
+                future.set_result(max(probs, key=probs.get))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _next_batch(self):
+        """
+        Block until work arrives, then collect up to max_batch_size windows
+        Returns:
+            (language detections, windows)
+        """
+        with self.cond:
+            while not self.pending and not self.detections:
+                self.cond.wait()
+
+            detections = list(self.detections)
+            self.detections.clear()
+            if detections:
+                # Don't hold a waiting request back to fill the batch
+                deadline = time.monotonic()
+            else:
+                deadline = time.monotonic() + self.max_delay
+            while self.pending < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+
+            batch = []
+            while self.jobs and len(batch) < self.max_batch_size:
+                for job_id in list(self.jobs):
+                    windows = self.jobs[job_id]
+                    batch.append(windows.popleft())
+                    if not windows:
+                        del self.jobs[job_id]
+                    if len(batch) == self.max_batch_size:
+                        break
+
+            self.pending -= len(batch)
+            return detections, batch
+
+    def _run(self):
+        """Worker loop: decode batches grouped by decoding options"""
+        while True:
+            detections, batch = self._next_batch()
+            self._run_detections(detections)
+
+            groups = {}
+            for window in batch:
+                groups.setdefault(window.options_key, []).append(window)
+
+            for (language, task, beam_size), windows in groups.items():
+                try:
+                    mel = torch.stack([self._mel(w.audio) for w in windows]).to(self.model.device)
+                    options = whisper.DecodingOptions(
+                        language=language,
+                        task=task,
+                        beam_size=beam_size,
+                        fp16=False,
+                        without_timestamps=False
+                    )
+                    with torch.no_grad():
+                        results = whisper.decode(self.model, mel, options)
+                    for window, result in zip(windows, results):
+                        window.future.set_result(result)
+                except Exception as e:
+                    for window in windows:
+                        window.future.set_exception(e)
@@ -4,10 +4,14 @@ Falls back to OpenAI API if home server not available
 """
 
 import os
-import tempfile
-import yt_dlp
-import requests
 from urlScraper import YouTubeURLScraper
+from metrics import DownloadTimer, stage
+from audio_cache import get_audio_cache
+from download_manager import get_download_manager
+from player_clients import get_client_strategy
+from concurrency import get_http_session
+from segments import SegmentStore
+import tracing
 
 
 class YouTubeTranscriber:
@@ -15,7 +19,9 @@ class YouTubeTranscriber:
     
     def __init__(self):
         self.transcript = None
+        self.segments = None
         self.video_id = None
+        self.audio_duration = None
         # Check if home Whisper server is configured
         self.home_whisper_url = os.getenv('WHISPER_API_URL')
         
@@ -36,35 +42,34 @@ class YouTubeTranscriber:
         
         self.video_id = video_id
         
-        # Download audio
+        # Download audio (or reuse it from the audio cache)
         audio_path = self._download_audio(video_id, cookies_from_browser, cookies_file)
         
-        try:
-            # Try home Whisper server first
-            if self.home_whisper_url:
-                try:
-                    transcript = self._transcribe_with_home_server(audio_path, language)
-                    print("✅ Transcribed with home Whisper server")
-                    return transcript
-                except Exception as e:
-                    print(f"⚠️  Home server failed: {e}")
-                    print("Falling back to OpenAI API...")
-            
-            # Fallback to OpenAI API
-            transcript = self._transcribe_with_openai(audio_path, language)
-            print("✅ Transcribed with OpenAI API")
-            return transcript
-        
-        finally:
-            # Cleanup audio file
+        # Try home Whisper server first
+        if self.home_whisper_url:
             try:
-                os.remove(audio_path)
-            except:
-                pass
+                transcript = self._transcribe_with_home_server(audio_path, language)
+                print("✅ Transcribed with home Whisper server")
+                return transcript
+            except Exception as e:
+                print(f"⚠️  Home server failed: {e}")
+                print("Falling back to OpenAI API...")
+        
+        # Fallback to OpenAI API
+        transcript = self._transcribe_with_openai(audio_path, language)
+        print("✅ Transcribed with OpenAI API")
+        return transcript
     
     def _download_audio(self, video_id, cookies_from_browser=None, cookies_file=None):
-        """Download audio from YouTube"""
-        temp_dir = tempfile.mkdtemp()
+        """Get audio from the shared audio cache, downloading it on a miss"""
+        return get_audio_cache().get_or_download(
+            video_id,
+            'bestaudio',
+            lambda temp_dir: self._download_to(video_id, temp_dir, cookies_from_browser, cookies_file)
+        )
+    
+    def _download_to(self, video_id, temp_dir, cookies_from_browser=None, cookies_file=None):
+        """Download audio from YouTube into temp_dir"""
         output_template = os.path.join(temp_dir, 'audio.%(ext)s')
         
         ydl_opts = {
@@ -74,14 +79,15 @@ class YouTubeTranscriber:
             'no_warnings': True,
         }
         
-        # Use android client if no cookies (avoids JS runtime requirement)
-        if not cookies_file and not cookies_from_browser:
-            ydl_opts['extractor_args'] = {
-                'youtube': {
-                    'player_client': ['android'],
-                    'skip': ['hls', 'dash']
-                }
+        # Try the player client that has been fastest lately (android/ios if no cookies),
+        # then yt-dlp's defaults
+        with_cookies = bool(cookies_file or cookies_from_browser)
+        ydl_opts['extractor_args'] = {
+            'youtube': {
+                'player_client': get_client_strategy().player_clients(with_cookies),
+                'skip': ['hls', 'dash']
             }
+        }
         
         # Add cookies if provided
         if cookies_file and os.path.exists(cookies_file):
@@ -91,8 +97,14 @@ class YouTubeTranscriber:
         
         url = f'https://www.youtube.com/watch?v={video_id}'
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        info = get_download_manager().download(
+            url,
+            ydl_opts,
+            lambda ydl: ydl.extract_info(url, download=True),
+            key=f"{video_id}-bestaudio",
+            timer=DownloadTimer()
+        )
+        self.audio_duration = info.get('duration')
         
         # Find downloaded file
         for file in os.listdir(temp_dir):
@@ -110,30 +122,39 @@ class YouTubeTranscriber:
             data = {}
             if language:
                 data['language'] = language
+            if self.audio_duration:
+                data['duration'] = str(self.audio_duration)
             
-            response = requests.post(url, files=files, data=data, timeout=300)
+            with stage('transcription'):
+                response = get_http_session().post(url, files=files, data=data, timeout=300,
+                                         headers=tracing.inject_headers())
         
         if response.status_code != 200:
             raise Exception(f"Home server error: {response.text}")
         
         result = response.json()
+        self.segments = SegmentStore.from_segments(result.get('segments'), result.get('language'))
         return result['text']
     
     def _transcribe_with_openai(self, audio_path, language=None):
         """Transcribe using OpenAI Whisper API"""
-        from openai import OpenAI
         from apiKeyCycler import get_next_api_key
+        from concurrency import get_openai_client
         
-        api_key = get_next_api_key()
-        client = OpenAI(api_key=api_key)
+        client = get_openai_client(get_next_api_key())
         
         with open(audio_path, 'rb') as audio_file:
-            params = {'file': audio_file, 'model': 'whisper-1'}
+            params = {'file': audio_file, 'model': 'whisper-1', 'response_format': 'verbose_json'}
             if language:
                 params['language'] = language
             
-            transcript = client.audio.transcriptions.create(**params)
+            with stage('transcription'):
+                transcript = client.audio.transcriptions.create(**params)
         
+        self.segments = SegmentStore.from_segments(
+            getattr(transcript, 'segments', None),
+            getattr(transcript, 'language', None)
+        )
         return transcript.text
 
 
@@ -3,19 +3,81 @@ Local Whisper API Server
 Run this on your home computer to provide free transcription service
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
-import whisper
 import tempfile
+import threading
 import os
+import sys
+
+# Shared policy and engine code lives in the backend package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from model_policy import get_model_policy
+from whisper_engines import SAMPLE_RATE, get_engine, get_engine_name, loaded_engines
+import tracing
 
 app = Flask(__name__)
 CORS(app)
+tracing.configure('whisper-home-server')
+
+DEFAULT_MODEL = os.getenv('WHISPER_MODEL', 'base')  # 74MB - good balance of speed/quality
+
+# Transcriptions currently running (queue depth for the model size policy)
+jobs_lock = threading.Lock()
+jobs_in_flight = 0
+
+# Cross-request batching of 30 s windows (PyTorch engine only)
+BATCHING = os.getenv('WHISPER_BATCHING', 'false').lower() == 'true'
+if BATCHING and get_engine_name() != 'whisper':
+    print("⚠️  WHISPER_BATCHING needs WHISPER_ENGINE=whisper, batching disabled")
+    BATCHING = False
+
+schedulers = {}
+schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model_name):
+    """Batch scheduler for a model, created on first use"""
+    with schedulers_lock:
+        if model_name not in schedulers:
+            from batch_scheduler import BatchScheduler
+            schedulers[model_name] = BatchScheduler(
+                get_engine(model_name).model,
+                max_batch_size=int(os.getenv('WHISPER_BATCH_SIZE', 8)),
+                max_delay=float(os.getenv('WHISPER_BATCH_DELAY_MS', 50)) / 1000
+            )
+        return schedulers[model_name]
+
+
+# Default model loaded once at startup, others on first use
+get_engine(DEFAULT_MODEL)
+
 
-# Load Whisper model once at startup
-print("Loading Whisper model (this takes a moment)...")
-model = whisper.load_model("base")  # 74MB - good balance of speed/quality
-print("✅ Whisper model loaded and ready!")
+@app.before_request
+def start_trace():
+    """Continue the caller's trace (traceparent header) or start a new one"""
+    g.trace_span, g.trace_token = tracing.start_trace(f"{request.method} {request.path}", request.headers)
+
+
+@app.after_request
+def add_trace_header(response):
+    """Return the trace id so callers can correlate logs"""
+    if g.get('trace_span'):
+        response.headers['X-Trace-Id'] = g.trace_span.trace_id
+    return response
+
+
+@app.teardown_request
+def end_trace(exc):
+    """Finish the request's root span"""
+    if g.get('trace_span'):
+        tracing.end_trace(g.pop('trace_span'), g.pop('trace_token'))
+
+
+@app.route('/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """Spans this server recorded for a trace"""
+    return jsonify({'trace_id': trace_id, 'spans': tracing.get_trace(trace_id)})
 
 
 @app.route('/health', methods=['GET'])
@@ -24,7 +86,11 @@ def health():
     return jsonify({
         'status': 'healthy',
         'service': 'Local Whisper API',
-        'model': 'base'
+        'model': DEFAULT_MODEL,
+        'engine': get_engine_name(),
+        'loaded_models': loaded_engines(),
+        'jobs_in_flight': jobs_in_flight,
+        'batching': BATCHING
     })
 
 
@@ -37,10 +103,14 @@ def transcribe():
     - file: audio file (mp3, m4a, wav, etc.)
     - language: optional language code (en, es, fr, etc.)
     - fast: optional bool to use faster settings (default: false)
+    - model: optional model name from WHISPER_MODEL_TIERS, overrides the size policy
+    - duration: optional audio duration in seconds
     
     Returns:
     - text: transcribed text
     """
+    global jobs_in_flight
+    
     try:
         # Check if file was uploaded
         if 'file' not in request.files:
@@ -49,12 +119,22 @@ def transcribe():
         file = request.files['file']
         language = request.form.get('language', None)
         use_fast = request.form.get('fast', 'false').lower() == 'true'
+        model_name = request.form.get('model')
+        
+        # Only configured sizes: whisper.load_model also takes file paths and downloads any size
+        if model_name and not get_model_policy().is_allowed(model_name):
+            return jsonify({'error': f"Unsupported model '{model_name}'. Allowed: {', '.join(get_model_policy().tiers)}"}), 400
         
         # Save to temp file
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
             file.save(temp_audio.name)
             temp_path = temp_audio.name
         
+        # Decode once; the duration feeds the model size policy
+        with tracing.span('decode_audio'):
+            audio = get_engine(DEFAULT_MODEL).load_audio(temp_path)
+        duration = float(request.form.get('duration') or len(audio) / SAMPLE_RATE)
+        
         print(f"Transcribing audio file: {temp_path} (fast mode: {use_fast})")
         
         # Build transcription options
@@ -72,7 +152,25 @@ def transcribe():
             })
         
         # Transcribe
-        result = model.transcribe(temp_path, **transcribe_opts)
+        with jobs_lock:
+            queue_depth = jobs_in_flight
+            jobs_in_flight += 1
+        try:
+            if not model_name:
+                model_name = get_model_policy().select(
+                    duration=duration,
+                    language=language,
+                    queue_depth=queue_depth,
+                    job_id=os.path.basename(temp_path)
+                )
+            with tracing.span('whisper_transcribe', model=model_name, batched=BATCHING, audio_seconds=duration):
+                if BATCHING:
+                    result = get_scheduler(model_name).transcribe(audio, language=language, fast=use_fast)
+                else:
+                    result = get_engine(model_name).transcribe(audio, **transcribe_opts)
+        finally:
+            with jobs_lock:
+                jobs_in_flight -= 1
         
         # Cleanup
         os.remove(temp_path)
@@ -81,7 +179,9 @@ def transcribe():
         
         return jsonify({
             'text': result['text'],
-            'language': result['language']
+            'language': result['language'],
+            'segments': result['segments'],
+            'model': model_name
         })
     
     except Exception as e:
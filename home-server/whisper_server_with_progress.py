@@ -3,23 +3,30 @@ Enhanced Whisper Server with WebSocket Progress Updates
 Real-time transcription progress for better UX
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-import whisper
 import tempfile
 import os
 import time
 import threading
+import sys
+
+# Shared policy and engine code lives in the backend package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from model_policy import get_model_policy
+from whisper_engines import SAMPLE_RATE, get_engine, get_engine_name, loaded_engines
+import tracing
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 socketio = SocketIO(app, cors_allowed_origins="*")
+tracing.configure('whisper-home-server-progress')
+
+DEFAULT_MODEL = os.getenv('WHISPER_MODEL', 'base')
 
-# Load Whisper model once at startup
-print("Loading Whisper model (this takes a moment)...")
-model = whisper.load_model("base")
-print("✅ Whisper model loaded and ready!")
+# Default model loaded once at startup, others on first use
+get_engine(DEFAULT_MODEL)
 
 # Track active transcriptions
 active_jobs = {}
@@ -77,13 +84,42 @@ class ProgressCallback:
             return "🎉 Finishing up!"
 
 
+@app.before_request
+def start_trace():
+    """Continue the caller's trace (traceparent header) or start a new one"""
+    g.trace_span, g.trace_token = tracing.start_trace(f"{request.method} {request.path}", request.headers)
+
+
+@app.after_request
+def add_trace_header(response):
+    """Return the trace id so callers can correlate logs"""
+    if g.get('trace_span'):
+        response.headers['X-Trace-Id'] = g.trace_span.trace_id
+    return response
+
+
+@app.teardown_request
+def end_trace(exc):
+    """Finish the request's root span"""
+    if g.get('trace_span'):
+        tracing.end_trace(g.pop('trace_span'), g.pop('trace_token'))
+
+
+@app.route('/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """Spans this server recorded for a trace"""
+    return jsonify({'trace_id': trace_id, 'spans': tracing.get_trace(trace_id)})
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'service': 'Whisper API with Progress',
-        'model': 'base',
+        'model': DEFAULT_MODEL,
+        'engine': get_engine_name(),
+        'loaded_models': loaded_engines(),
         'active_jobs': len(active_jobs)
     })
 
@@ -98,6 +134,8 @@ def transcribe():
     - language: optional language code (en, es, fr, etc.)
     - fast: optional bool to use faster settings (default: false)
     - job_id: optional job identifier for progress tracking
+    - model: optional model name from WHISPER_MODEL_TIERS, overrides the size policy
+    - duration: optional audio duration in seconds
     
     Returns:
     - text: transcribed text
@@ -112,13 +150,29 @@ def transcribe():
         language = request.form.get('language', None)
         use_fast = request.form.get('fast', 'false').lower() == 'true'
         job_id = request.form.get('job_id', str(int(time.time())))
+        model_name = request.form.get('model')
+        
+        # Only configured sizes: whisper.load_model also takes file paths and downloads any size
+        if model_name and not get_model_policy().is_allowed(model_name):
+            return jsonify({'error': f"Unsupported model '{model_name}'. Allowed: {', '.join(get_model_policy().tiers)}"}), 400
         
         # Save to temp file
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
             file.save(temp_audio.name)
             temp_path = temp_audio.name
         
-        print(f"[{job_id}] Transcribing: {temp_path} (fast mode: {use_fast})")
+        # Decode once; the duration feeds the model size policy
+        with tracing.span('decode_audio'):
+            audio = get_engine(DEFAULT_MODEL).load_audio(temp_path)
+        duration = float(request.form.get('duration') or len(audio) / SAMPLE_RATE)
+        model_name = model_name or get_model_policy().select(
+            duration=duration,
+            language=language,
+            queue_depth=len(active_jobs),
+            job_id=job_id
+        )
+        
+        print(f"[{job_id}] Transcribing: {temp_path} (model: {model_name}, fast mode: {use_fast})")
         
         # Track job
         active_jobs[job_id] = {
@@ -148,7 +202,8 @@ def transcribe():
             })
         
         # Transcribe
-        result = model.transcribe(temp_path, **transcribe_opts)
+        with tracing.span('whisper_transcribe', model=model_name, audio_seconds=duration):
+            result = get_engine(model_name).transcribe(audio, **transcribe_opts)
         
         # Cleanup
         os.remove(temp_path)
@@ -169,7 +224,9 @@ def transcribe():
         return jsonify({
             'job_id': job_id,
             'text': result['text'],
-            'language': result['language']
+            'language': result['language'],
+            'segments': result['segments'],
+            'model': model_name
         })
     
     except Exception as e:
@@ -52,10 +52,12 @@ fi
 
 echo "✅ Copilot API is running (PID: $COPILOT_PID)"
 
-# Start Flask app with Gunicorn
+# Start Flask app with Gunicorn (worker layout, preload and warmup in gunicorn.conf.py)
+# gevent workers: each request is a greenlet, so requests waiting on OpenAI /
+# copilot-api don't tie up an OS thread (local Whisper runs on native threads)
 echo "🌐 Starting Flask app with Gunicorn..."
 cd backend
-gunicorn --bind 0.0.0.0:$PORT --workers 2 --timeout 120 app:app
+gunicorn -c gunicorn.conf.py app:app
 
 # If Flask crashes, kill copilot-api
 kill $COPILOT_PID 2>/dev/null || true